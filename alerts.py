@@ -0,0 +1,322 @@
+# ========================================
+# ALERT RULE ENGINE (ประเมินฝั่ง SERVER ทุก TICK)
+# ========================================
+import bisect
+import json
+import math
+import os
+import threading
+import uuid
+from collections import defaultdict, deque
+
+from http_client import get_session, submit
+from price_store import format_epoch
+
+ALERT_RULES_FILE = os.environ.get('ALERT_RULES_FILE', 'alert_rules.json')
+ALERT_LOG_FILE = os.environ.get('ALERT_LOG_FILE', 'alerts.jsonl')
+ALERT_WEBHOOK_URL = os.environ.get('ALERT_WEBHOOK_URL')   # เช่น http://127.0.0.1:9000/alerts
+ALERT_HISTORY = 200   # จำนวนการแจ้งเตือนล่าสุดที่เก็บไว้แสดงบนหน้าเว็บ
+
+RULE_KINDS = {
+    'rsi_cross': 'RSI ตัดระดับ',
+    'ma_cross': 'ราคาตัดเส้น MA20',
+    'signal_change': 'สัญญาณ TIER 1 เปลี่ยน',
+}
+DIRECTIONS = {'both': 'ทั้งสองทาง', 'up': 'ตัดขึ้น', 'down': 'ตัดลง'}
+
+
+class AlertRule:
+    """
+    กฎแจ้งเตือน 1 ข้อของผู้ใช้ 1 คน
+    - rsi_cross: RSI ข้าม threshold (เช่น 30 / 70) ตาม direction
+    - ma_cross: ราคาข้ามเส้น MA20 ตาม direction
+    - signal_change: class ของ get_signal() เปลี่ยน (target = class ปลายทาง เช่น 'signal-green', None = ทุกครั้ง)
+    """
+
+    def __init__(self, owner, asset, kind, threshold=None, direction='both', target=None, rule_id=None):
+        if kind not in RULE_KINDS:
+            raise ValueError(f'unknown alert kind: {kind}')
+        if direction not in DIRECTIONS:
+            raise ValueError(f'unknown direction: {direction}')
+        if kind == 'rsi_cross' and threshold is None:
+            raise ValueError('rsi_cross needs a threshold')
+        self.rule_id = rule_id or uuid.uuid4().hex   # ไม่ซ้ำข้าม restart / replica (กฎที่บันทึกไว้ไม่ถูกทับ)
+        self.owner = owner
+        self.asset = asset   # symbol ใน watchlist เช่น 'BTC'
+        self.kind = kind
+        self.threshold = None if threshold is None else float(threshold)
+        self.direction = direction
+        self.target = target
+
+    def matches(self, direction):
+        return self.direction in ('both', direction)
+
+    def describe(self):
+        if self.kind == 'rsi_cross':
+            return f'{self.asset}: RSI {DIRECTIONS[self.direction]} {self.threshold:g}'
+        if self.kind == 'ma_cross':
+            return f'{self.asset}: ราคา{DIRECTIONS[self.direction]} MA20'
+        return f'{self.asset}: สัญญาณเปลี่ยน' + (f' เป็น {self.target}' if self.target else '')
+
+    def to_dict(self):
+        return {'id': self.rule_id, 'owner': self.owner, 'asset': self.asset, 'kind': self.kind,
+                'threshold': self.threshold, 'direction': self.direction, 'target': self.target}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['owner'], d['asset'], d['kind'], d.get('threshold'), d.get('direction', 'both'),
+                   d.get('target'), d.get('id'))
+
+
+def default_rules(symbols, owner='default'):
+    """กฎพื้นฐานของทุกสินทรัพย์: RSI ตัด 30 / 70, ราคาตัด MA20, สัญญาณ TIER 1 เปลี่ยน"""
+    rules = []
+    for symbol in symbols:
+        rules += [
+            AlertRule(owner, symbol, 'rsi_cross', 30, 'down', rule_id=f'{owner}-{symbol}-rsi30'),
+            AlertRule(owner, symbol, 'rsi_cross', 70, 'up', rule_id=f'{owner}-{symbol}-rsi70'),
+            AlertRule(owner, symbol, 'ma_cross', rule_id=f'{owner}-{symbol}-ma'),
+            AlertRule(owner, symbol, 'signal_change', rule_id=f'{owner}-{symbol}-signal'),
+        ]
+    return rules
+
+
+def load_rules(path=ALERT_RULES_FILE, symbols=()):
+    """อ่านกฎจากไฟล์ JSON (list ของ AlertRule.to_dict()) - ไม่มีไฟล์ / ไฟล์เสีย -> default_rules (DON'T CRASH!)"""
+    if not os.path.exists(path):
+        return default_rules(symbols)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return [AlertRule.from_dict(d) for d in json.load(f)]
+    except (OSError, ValueError, KeyError, TypeError):
+        return default_rules(symbols)
+
+
+def save_rules(rules, path=ALERT_RULES_FILE):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump([r.to_dict() for r in rules], f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+# ========================================
+# SINKS (ปลายทางของการแจ้งเตือน)
+# ========================================
+class FileSink:
+    """ต่อท้ายทุกการแจ้งเตือนลงไฟล์ JSON Lines (1 บรรทัดต่อ event)"""
+
+    def __init__(self, path=ALERT_LOG_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, events):
+        lines = ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in events)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+class WebhookSink:
+    """POST JSON {'alerts': [...]} ไปยัง webhook (บน thread pool กลาง: collector ไม่ต้องรอ network)"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self.metrics = {'sent': 0, 'errors': 0}
+
+    def send(self, events):
+        submit(self._post, list(events))
+
+    def _post(self, events):
+        try:
+            response = get_session().post(self.url, json={'alerts': events}, timeout=self.timeout)
+            response.raise_for_status()
+            self.metrics['sent'] += len(events)
+        except Exception:
+            self.metrics['errors'] += 1
+
+
+def default_sinks(log_path=ALERT_LOG_FILE):
+    sinks = [FileSink(log_path)]
+    if ALERT_WEBHOOK_URL:
+        sinks.append(WebhookSink(ALERT_WEBHOOK_URL))
+    return sinks
+
+
+# ========================================
+# ENGINE
+# ========================================
+class LevelIndex:
+    """กฎ rsi_cross ของสินทรัพย์เดียวเรียงตาม threshold: หากฎที่ถูกข้ามด้วย bisect (O(log n + จำนวนที่ยิง))"""
+
+    def __init__(self):
+        self.levels = []
+        self.rules = []
+
+    def add(self, rule):
+        i = bisect.bisect_right(self.levels, rule.threshold)
+        self.levels.insert(i, rule.threshold)
+        self.rules.insert(i, rule)
+
+    def remove(self, rule):
+        i = self.rules.index(rule)
+        del self.levels[i], self.rules[i]
+
+    def crossed(self, prev, cur):
+        """ขึ้น: prev < level <= cur / ลง: cur < level <= prev -> (direction, กฎที่ถูกข้าม)"""
+        if cur > prev:
+            lo, hi, direction = bisect.bisect_right(self.levels, prev), bisect.bisect_right(self.levels, cur), 'up'
+        elif cur < prev:
+            lo, hi, direction = bisect.bisect_right(self.levels, cur), bisect.bisect_right(self.levels, prev), 'down'
+        else:
+            return None, []
+        return direction, self.rules[lo:hi]
+
+    def __len__(self):
+        return len(self.rules)
+
+
+class AlertEngine:
+    """
+    🔔 ประเมินกฎแจ้งเตือนของผู้ใช้ทุกคนแบบ incremental: collector เรียก evaluate() 1 ครั้งต่อ tick
+    - จำแค่ค่าก่อนหน้าของแต่ละสินทรัพย์ (RSI, ราคา - MA, class สัญญาณ) แล้วเทียบกับค่าใหม่
+    - กฎถูกจัดกลุ่มตามสินทรัพย์: RSI เรียงตาม threshold (bisect), MA ตามทิศ, สัญญาณตาม class ปลายทาง
+      -> ต่อ tick แตะเฉพาะกฎที่ถูกข้ามจริง กฎเป็นพันข้อก็ไม่ช้าลง
+    - ส่งผลไปทุก sink (error ของ sink ไม่ทำให้ collector ล้ม)
+    """
+
+    def __init__(self, rules=(), sinks=(), classify=None, history=ALERT_HISTORY):
+        self.sinks = list(sinks)
+        self.classify = classify   # (price, ma, rsi) -> (ข้อความ, class) แบบ get_signal
+        self._lock = threading.Lock()
+        self._rules = {}
+        self._rsi = defaultdict(LevelIndex)
+        self._ma = defaultdict(lambda: defaultdict(list))
+        self._signal = defaultdict(lambda: defaultdict(list))
+        self.state = {}
+        self.last_ts = None
+        self.recent = deque(maxlen=history)
+        self.metrics = {'ticks': 0, 'fired': 0, 'sink_errors': 0}
+        for rule in rules:
+            self.add(rule)
+
+    # ---------- rule set ----------
+    def _bucket(self, rule):
+        if rule.kind == 'ma_cross':
+            return self._ma[rule.asset][rule.direction]
+        return self._signal[rule.asset][rule.target]
+
+    def add(self, rule):
+        with self._lock:
+            self._add(rule)
+        return rule
+
+    def _add(self, rule):
+        if rule.rule_id in self._rules:
+            self._remove(self._rules[rule.rule_id])
+        self._rules[rule.rule_id] = rule
+        if rule.kind == 'rsi_cross':
+            self._rsi[rule.asset].add(rule)
+        else:
+            self._bucket(rule).append(rule)
+
+    def replace_rules(self, rules):
+        """แทนกฎทั้งชุดในครั้งเดียว (กฎในไฟล์กลางของหลาย replica เปลี่ยน) - ค่าก่อนหน้าของสินทรัพย์ยังอยู่"""
+        with self._lock:
+            for rule in list(self._rules.values()):
+                self._remove(rule)
+            for rule in rules:
+                self._add(rule)
+
+    def remove(self, rule_id):
+        with self._lock:
+            rule = self._rules.get(rule_id)
+            if rule is not None:
+                self._remove(rule)
+
+    def _remove(self, rule):
+        del self._rules[rule.rule_id]
+        if rule.kind == 'rsi_cross':
+            self._rsi[rule.asset].remove(rule)
+        else:
+            self._bucket(rule).remove(rule)
+
+    def rules(self, owner=None):
+        with self._lock:
+            return [r for r in self._rules.values() if owner is None or r.owner == owner]
+
+    def reset(self):
+        """ลืมค่าก่อนหน้า (หลังล้างข้อมูล) - tick ถัดไปเป็นจุดเริ่มใหม่ ไม่ยิงการข้ามปลอม"""
+        with self._lock:
+            self.state.clear()
+            self.last_ts = None
+
+    # ---------- per tick ----------
+    def evaluate(self, ts, values):
+        """
+        values: symbol -> (ราคา, MA, RSI) ของ tick ล่าสุด -> คืน list ของ event ที่ยิง
+        tick เดิมซ้ำ (ts ไม่ใหม่กว่าเดิม) ไม่ประเมินซ้ำ
+        """
+        with self._lock:
+            if self.last_ts is not None and ts <= self.last_ts:
+                return []
+            self.last_ts = ts
+            self.metrics['ticks'] += 1
+            fired = []
+            for asset, (price, ma, rsi) in values.items():
+                fired += self._evaluate_asset(ts, asset, price, ma, rsi)
+            self.recent.extend(fired)
+            self.metrics['fired'] += len(fired)
+        if fired:
+            self._dispatch(fired)
+        return fired
+
+    def _evaluate_asset(self, ts, asset, price, ma, rsi):
+        signal = None
+        if self.classify is not None and not any(math.isnan(v) for v in (price, ma, rsi)):
+            signal = self.classify(price, ma, rsi)
+        diff = price - ma
+        prev = self.state.get(asset)
+        self.state[asset] = (rsi, diff, signal)
+        if prev is None:
+            return []
+        prev_rsi, prev_diff, prev_signal = prev
+        fired = []
+
+        levels = self._rsi.get(asset)
+        if levels and not (math.isnan(prev_rsi) or math.isnan(rsi)):
+            direction, crossed = levels.crossed(prev_rsi, rsi)
+            for rule in crossed:
+                if rule.matches(direction):
+                    fired.append(self._event(ts, rule, direction, rsi,
+                                             f'{asset}: RSI {DIRECTIONS[direction]} {rule.threshold:g} ({rsi:.1f})'))
+
+        by_direction = self._ma.get(asset)
+        if by_direction and not (math.isnan(prev_diff) or math.isnan(diff)):
+            direction = 'up' if prev_diff <= 0 < diff else 'down' if prev_diff >= 0 > diff else None
+            if direction:
+                for rule in by_direction.get(direction, []) + by_direction.get('both', []):
+                    fired.append(self._event(ts, rule, direction, price,
+                                             f'{asset}: ราคา{DIRECTIONS[direction]} MA20 ({price:,.2f} / {ma:,.2f})'))
+
+        by_target = self._signal.get(asset)
+        if by_target and signal is not None and prev_signal is not None and signal[1] != prev_signal[1]:
+            for rule in by_target.get(signal[1], []) + by_target.get(None, []):
+                fired.append(self._event(ts, rule, None, price,
+                                         f'{asset}: {prev_signal[0]} -> {signal[0]}'))
+        return fired
+
+    @staticmethod
+    def _event(ts, rule, direction, value, message):
+        return {'ts': int(ts), 'time': format_epoch(ts), 'rule_id': rule.rule_id, 'owner': rule.owner,
+                'asset': rule.asset, 'kind': rule.kind, 'direction': direction, 'value': float(value),
+                'message': message}
+
+    def _dispatch(self, events):
+        for sink in self.sinks:
+            try:
+                sink.send(events)
+            except Exception:
+                self.metrics['sink_errors'] += 1
+
+    def __len__(self):
+        return len(self._rules)
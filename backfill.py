@@ -0,0 +1,152 @@
+# ========================================
+# HISTORICAL BACKFILL (เติมประวัติย้อนหลังเบื้องหลัง แก้กราฟแบน)
+# ========================================
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from http_client import submit
+from metrics import span
+from rate_limiter import coingecko_get, COINGECKO_API_URL, PRIORITY_BACKGROUND
+
+MARKET_CHART_RANGE_URL = COINGECKO_API_URL + '/coins/{coin_id}/market_chart/range'
+# โฟลเดอร์ไฟล์ <coin id>.json รูปแบบเดียวกับ market_chart (ใช้แทน API ตอนทดสอบ / ไม่มีเน็ต)
+BACKFILL_FIXTURE_DIR = os.environ.get('BACKFILL_FIXTURE_DIR')
+# request ต่อการเริ่ม 1 ครั้ง (ทีละตัวในคิว background ของ CoinGecko ~10 ครั้ง/นาที) - watchlist ยาวๆ
+# เติมเฉพาะสินทรัพย์ต้นรายการ (หน้าแรกของกริด) ตัวที่เหลือรอ collector สะสมราคาเอง
+BACKFILL_MAX_ASSETS = int(os.environ.get('BACKFILL_MAX_ASSETS', '12'))
+
+
+def parse_market_chart(payload):
+    """{'prices': [[ms, price], ...]} -> (ts epoch วินาที int64, ราคา float64) เรียงตามเวลา"""
+    points = np.asarray(payload.get('prices') or [], dtype='f8').reshape(-1, 2)
+    points = points[np.argsort(points[:, 0], kind='stable')]
+    return (points[:, 0] // 1000).astype('<i8'), points[:, 1]
+
+
+def coingecko_history(coin_id, start, end):
+    """ประวัติราคาช่วง [start, end] ของเหรียญเดียวด้วย 1 request (ช่วง 1 วัน CoinGecko ให้ทุก ~5 นาที)"""
+    with span('upstream_seconds', endpoint='coingecko_market_chart'):
+        response = coingecko_get(
+            MARKET_CHART_RANGE_URL.format(coin_id=coin_id),
+            params={'vs_currency': 'usd', 'from': int(start), 'to': int(end)},
+            priority=PRIORITY_BACKGROUND,   # คิวหลังราคาสดและตารางตลาดเสมอ
+            timeout=60
+        )
+    if response.status_code != 200:
+        raise Exception(f"market_chart/range {coin_id} returned {response.status_code}")
+    return parse_market_chart(response.json())
+
+
+def fixture_history(directory):
+    """แหล่งข้อมูลแทน API: อ่าน <directory>/<coin id>.json แล้วตัดเฉพาะช่วงเวลาที่ขอ"""
+    def load(coin_id, start, end):
+        with open(os.path.join(directory, f'{coin_id}.json'), encoding='utf-8') as f:
+            ts, prices = parse_market_chart(json.load(f))
+        keep = (ts >= start) & (ts <= end)
+        return ts[keep], prices[keep]
+    return load
+
+
+def default_history_source():
+    return fixture_history(BACKFILL_FIXTURE_DIR) if BACKFILL_FIXTURE_DIR else coingecko_history
+
+
+def align_histories(histories, columns, step):
+    """
+    {column: (ts, ราคา)} ของหลายสินทรัพย์ (เวลาไม่ตรงกัน) -> ตารางเดียวบน grid ทุก step วินาที
+    แต่ละช่องใช้ราคาสุดท้ายใน bucket นั้น สินทรัพย์ที่ไม่มีข้อมูลเป็น NaN
+    """
+    buckets = np.unique(np.concatenate([ts // step for ts, _ in histories.values()]))
+    matrix = np.full((len(buckets), len(columns)), np.nan)
+    for col, (ts, prices) in histories.items():
+        b = ts // step
+        last = np.append(b[1:] != b[:-1], True)   # ts เรียงแล้ว: ตัวสุดท้ายของแต่ละ bucket
+        matrix[np.searchsorted(buckets, b[last]), columns.index(col)] = prices[last]
+    return buckets * step, matrix
+
+
+def merge_history(store, ts, matrix, columns):
+    """
+    ต่อประวัติไว้หน้าข้อมูลเดิมของ store: ใช้เฉพาะแถวที่เก่ากว่า record แรก (ไม่มีเวลาซ้ำ)
+    และเท่าที่ยังมีที่ว่างใน ring buffer - คืนจำนวนแถวที่เพิ่ม
+    สลับเป็นชุดใหม่ด้วย store.rewrite() ทีเดียว: ผู้อ่านที่ไม่ lock ไม่เห็น store ว่างระหว่างรวม
+    ⚠️ ต้องเรียกภายใต้ lock ของ collector (ผู้เขียน store มีได้คนเดียว)
+    """
+    existing = np.array(store.view())
+    if len(existing):
+        keep = ts < existing['ts'][0]
+        ts, matrix = ts[keep], matrix[keep]
+    room = store.capacity - len(existing)
+    if room <= 0 or len(ts) == 0:
+        return 0
+    ts, matrix = ts[-room:], matrix[-room:]
+    history = {c: matrix[:, i] for i, c in enumerate(columns)}
+    merged = {'ts': np.concatenate([ts, existing['ts']])}
+    for c in store.columns:
+        older = history.get(c, np.full(len(ts), np.nan))
+        merged[c] = np.concatenate([older, existing[c]])
+    store.rewrite(merged)
+    return len(ts)
+
+
+class Backfiller:
+    """
+    🕰️ เติมประวัติย้อนหลังของสินทรัพย์ใน watchlist (1 request ต่อสินทรัพย์) บน thread เบื้องหลัง
+    - ไม่เกิน max_assets ตัวแรกที่มีประวัติให้ดึง (ลำดับ watchlist = ลำดับที่แสดง) ที่เหลือนับไว้ใน skipped
+    - หน้าเว็บไม่ต้องรอ: ได้ครบแล้วค่อยส่ง (ts, matrix) ให้ apply() ไปรวมเข้า store
+    - ดึงไม่สำเร็จบางตัว -> ข้ามไป (เก็บใน errors) ยังรวมตัวที่ได้ / ไม่ได้เลยสักตัว = failed
+    """
+
+    def __init__(self, assets, columns, apply, seconds, step, source=None, max_assets=BACKFILL_MAX_ASSETS):
+        # สินทรัพย์จำลองไม่มีประวัติให้ดึง
+        wanted = [a for a in assets if a.source == 'coingecko' and a.coingecko_id]
+        self.assets = wanted[:max_assets]
+        self.skipped = len(wanted) - len(self.assets)
+        self.columns = list(columns)
+        self.apply = apply
+        self.seconds = seconds
+        self.step = step
+        self.source = source or default_history_source()
+        self._lock = threading.Lock()
+        self.state = 'idle'   # idle / running / done / failed
+        self.rows_added = 0
+        self.errors = {}
+        self.finished_at = None
+
+    def start(self):
+        """เริ่มงานเบื้องหลัง (ถ้ากำลังทำอยู่แล้วไม่เริ่มซ้ำ)"""
+        with self._lock:
+            if self.state == 'running':
+                return self
+            self.state = 'running'
+            self.rows_added = 0
+            self.errors = {}
+        submit(self._run)
+        return self
+
+    def _run(self):
+        end = time.time()
+        start = end - self.seconds
+        histories = {}
+        for asset in self.assets:
+            try:
+                ts, prices = self.source(asset.coingecko_id, start, end)
+            except Exception as e:
+                self.errors[asset.symbol] = e
+                continue
+            if len(ts):
+                histories[asset.column] = (ts, prices)
+
+        try:
+            if histories:
+                ts, matrix = align_histories(histories, self.columns, self.step)
+                self.rows_added = self.apply(ts, matrix)
+            self.state = 'done' if histories or not self.errors else 'failed'
+        except Exception as e:
+            self.errors['merge'] = e
+            self.state = 'failed'
+        self.finished_at = time.time()
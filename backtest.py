@@ -0,0 +1,204 @@
+# ========================================
+# VECTORIZED BACKTEST (TIER 1 get_signal + TIER 2 24h-CHANGE RULES)
+# ========================================
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from indicators import compute_indicators, RSI_WINDOW
+
+# TIER 1 (get_signal): ลำดับเดียวกับ if/elif ใน dashboard.get_signal
+TIER1_CLASSES = ['strong_buy', 'hold', 'sell', 'wait']
+TIER1_DIRECTION = np.array([1, 1, -1, 0])     # +1 = ถือ long, -1 = ขาย/short, 0 = อยู่นอกตลาด
+# TIER 2 (คำแนะนำ AI ในตาราง Top-N): ลำดับเดียวกับ classify_advice
+TIER2_CLASSES = ['momentum', 'accumulate', 'panic_sell', 'correction']
+TIER2_DIRECTION = np.array([1, 1, -1, 0])
+
+DEFAULT_GRID = {
+    'ma_window': [10, 20, 50],
+    'buy_rsi': [40, 45, 50],
+    'sell_rsi': [50, 55, 60],
+    'change_threshold': [2.0, 3.0, 5.0],
+}
+DEFAULT_HORIZON = 12        # จำนวนแถวข้างหน้าที่ใช้ตัดสินว่าสัญญาณ "ถูก" หรือไม่
+CHANGE_LOOKBACK = 86400     # วินาที: % เปลี่ยนแปลง 24 ชม. แบบเดียวกับ price_change_percentage_24h
+PARALLEL_MIN_CELLS = 500_000  # ข้อมูลน้อยกว่านี้ (แถว × สินทรัพย์) ทำใน process เดียวเร็วกว่าเปิด worker ใหม่
+
+
+def tier1_classes(price, ma, rsi, buy_rsi=45, sell_rsi=55):
+    """
+    get_signal() ทั้ง array ทีเดียว -> index ใน TIER1_CLASSES
+    NaN แทนแบบเดียวกับ analyze_trend(): RSI -> 50, MA -> ราคา
+    """
+    rsi = np.where(np.isnan(rsi), 50.0, rsi)
+    ma = np.where(np.isnan(ma), price, ma)
+    above, below = price > ma, price < ma
+    return np.select([above & (rsi < buy_rsi), above, below & (rsi > sell_rsi)], [0, 1, 2], default=3)
+
+
+def change_over(ts, price, lookback=CHANGE_LOOKBACK):
+    """% เปลี่ยนแปลงเทียบราคาล่าสุดที่เก่ากว่า lookback วินาที (NaN ถ้าประวัติยังไม่ถึง)"""
+    idx = np.searchsorted(ts, ts - lookback, side='right') - 1
+    base = np.where(idx >= 0, price[np.maximum(idx, 0)], np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (price / base - 1) * 100
+
+
+def tier2_classes(change_pct, threshold=3.0):
+    """classify_advice() ทั้ง array -> index ใน TIER2_CLASSES (ไม่มีข้อมูล = 0%)"""
+    change = np.nan_to_num(change_pct, nan=0.0)
+    return np.select([change >= threshold, change >= 0.0, change < -threshold], [0, 1, 2], default=3)
+
+
+def forward_returns(price, horizon=DEFAULT_HORIZON):
+    """
+    คำนวณครั้งเดียวต่อสินทรัพย์ ใช้ซ้ำทุกชุดพารามิเตอร์:
+    - fwd: ผลตอบแทนอีก `horizon` แถวข้างหน้า (ท้าย series / ราคาหาย = 0 และ judgeable = False)
+    - step: log return ทีละแถว (ราคาหาย = 0)
+    """
+    fwd = np.full(len(price), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if len(price) > horizon:
+            fwd[:-horizon] = price[horizon:] / price[:-horizon] - 1
+        step = np.diff(np.log(price))
+    judgeable = np.isfinite(fwd)
+    return np.where(judgeable, fwd, 0.0), judgeable, np.where(np.isfinite(step), step, 0.0)
+
+
+def evaluate(price, classes, direction, returns):
+    """
+    วัดผลสัญญาณ 1 ชุด (classes ของแถวที่ไม่มีราคาต้องเป็นกลุ่มที่ direction = 0):
+    - hit rate: สัญญาณที่มีทิศทาง (+1 / -1) ทายทิศของผลตอบแทนข้างหน้าถูก
+    - strategy return: ถือตามทิศของสัญญาณแถวก่อนหน้า (ไม่มองอนาคต) เทียบกับซื้อแล้วถือ
+    """
+    fwd, judgeable, step = returns
+    position = direction.astype('i1')[classes]
+    signals = np.count_nonzero((position != 0) & judgeable)
+    signed = fwd * position
+    finite = price[np.isfinite(price)]
+
+    return {
+        'signals': int(signals),
+        'hit_rate': np.count_nonzero(signed > 0) / signals if signals else np.nan,
+        'avg_forward_return': float(signed.sum() / signals) if signals else np.nan,
+        'strategy_return': float(np.expm1(np.dot(position[:-1], step))) if len(step) else 0.0,
+        'buy_hold_return': float(finite[-1] / finite[0] - 1) if len(finite) > 1 else 0.0,
+        'exposure': float(np.count_nonzero(position) / len(position)) if len(position) else 0.0,
+        'trades': int(np.count_nonzero(position[1:] != position[:-1])),
+    }
+
+
+def _tier1_task(asset, ts, price, ma_window, thresholds, horizon):
+    """งานของ worker 1 ชิ้น: คำนวณ MA/RSI ครั้งเดียวต่อ ma_window แล้วกวาดทุกคู่ threshold ของ RSI"""
+    ma, rsi, _ = compute_indicators(price[:, None], ma_window, RSI_WINDOW)
+    ma, rsi = ma[:, 0], rsi[:, 0]
+    returns = forward_returns(price, horizon)
+    rows = []
+    for buy_rsi, sell_rsi in thresholds:
+        classes = tier1_classes(price, ma, rsi, buy_rsi, sell_rsi)
+        rows.append({'asset': asset, 'rule': 'tier1', 'ma_window': ma_window, 'buy_rsi': buy_rsi,
+                     'sell_rsi': sell_rsi, 'change_threshold': np.nan,
+                     **evaluate(price, classes, TIER1_DIRECTION, returns)})
+    return rows
+
+
+def _tier2_task(asset, ts, price, thresholds, horizon):
+    change = change_over(ts, price)
+    missing = ~np.isfinite(price)
+    returns = forward_returns(price, horizon)
+    rows = []
+    for threshold in thresholds:
+        classes = tier2_classes(change, threshold)
+        classes[missing] = 3   # ไม่มีราคา = ไม่ถือสถานะ (ไม่ใช่ "เก็บของ" จาก change = 0%)
+        rows.append({'asset': asset, 'rule': 'tier2', 'ma_window': np.nan, 'buy_rsi': np.nan, 'sell_rsi': np.nan,
+                     'change_threshold': threshold,
+                     **evaluate(price, classes, TIER2_DIRECTION, returns)})
+    return rows
+
+
+def run_backtest(ts, prices, columns, grid=None, horizon=DEFAULT_HORIZON, workers=None):
+    """
+    🧪 backtest ทุกสินทรัพย์ × ทุกชุดพารามิเตอร์ใน grid
+    ts: epoch วินาที (n,) / prices: (n, สินทรัพย์) -> DataFrame 1 แถวต่อ (สินทรัพย์, กฎ, พารามิเตอร์)
+    งานแบ่งตาม (สินทรัพย์, ma_window) กระจายไปหลาย process (workers=1 = ทำใน process เดียว)
+    """
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    ts = np.asarray(ts, dtype='<i8')
+    prices = np.asarray(prices, dtype='f8')
+    thresholds = list(itertools.product(grid['buy_rsi'], grid['sell_rsi']))
+
+    tasks = []
+    for i, asset in enumerate(columns):
+        price = np.ascontiguousarray(prices[:, i])
+        for ma_window in grid['ma_window']:
+            tasks.append((_tier1_task, (asset, ts, price, ma_window, thresholds, horizon)))
+        tasks.append((_tier2_task, (asset, ts, price, grid['change_threshold'], horizon)))
+
+    if workers is None:
+        workers = 1 if prices.size < PARALLEL_MIN_CELLS else min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1:
+        results = [fn(*args) for fn, args in tasks]
+    else:
+        # spawn: ปลอดภัยเมื่อเรียกจาก process ที่มีหลาย thread (เช่น Streamlit)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(fn, *args) for fn, args in tasks]
+            results = [f.result() for f in futures]
+    return pd.DataFrame([row for rows in results for row in rows])
+
+
+def best_by_asset(results, rule='tier1'):
+    """ชุดพารามิเตอร์ที่ได้ strategy return สูงสุดของแต่ละสินทรัพย์"""
+    subset = results[results['rule'] == rule]
+    return subset.loc[subset.groupby('asset')['strategy_return'].idxmax()].reset_index(drop=True)
+
+
+def synthetic_prices(n, assets, seed=0, start=1_700_000_000, step=30):
+    """ราคาจำลองแบบ random walk (ใช้วัดความเร็ว / ทดลองเมื่อไม่มีข้อมูลจริง)"""
+    rng = np.random.default_rng(seed)
+    ts = start + np.arange(n, dtype='<i8') * step
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, size=(n, assets)), axis=0))
+    return ts, prices
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest TIER 1 / TIER 2 rules over stored price history')
+    parser.add_argument('--store', default='crypto_prices.bin', help='PriceStore file (tick ดิบ)')
+    parser.add_argument('--synthetic', type=int, metavar='ROWS', help='ใช้ราคาจำลองจำนวน ROWS แถวแทน store')
+    parser.add_argument('--assets', type=int, default=3, help='จำนวนสินทรัพย์ของราคาจำลอง')
+    parser.add_argument('--horizon', type=int, default=DEFAULT_HORIZON)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--json', action='store_true', help='พิมพ์ผลเป็น JSON')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        columns = [f'SYN{i}_price' for i in range(args.assets)]
+        ts, prices = synthetic_prices(args.synthetic, args.assets)
+    else:
+        from price_store import PriceStore
+        # capacity / columns อ่านจาก header ของไฟล์เอง: ไม่มีทางเปิดผิดขนาดจนไปแตะ store ของ dashboard ที่รันอยู่
+        store = PriceStore.open_readonly(args.store)
+        columns = store.columns
+        view = store.view()
+        ts, prices = view['ts'], np.column_stack([view[c] for c in columns])
+
+    started = time.perf_counter()
+    results = run_backtest(ts, prices, columns, horizon=args.horizon, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    if args.json:
+        print(json.dumps({'rows': len(ts), 'seconds': elapsed,
+                          'results': json.loads(results.to_json(orient='records'))}, indent=2))
+    else:
+        print(f'{len(ts):,} rows x {len(columns)} assets in {elapsed:.2f}s')
+        print(best_by_asset(results, 'tier1').to_string(index=False))
+        print(best_by_asset(results, 'tier2').to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
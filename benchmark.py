@@ -0,0 +1,376 @@
+# ========================================
+# OFFLINE BENCHMARK SUITE (DATA + RENDER PIPELINE)
+# ========================================
+# วัดต้นทุนของแต่ละขั้นใน 1 รอบการทำงานของแดชบอร์ด บนราคาจำลองขนาดต่างๆ โดยไม่ออกเน็ต
+# (CoinGecko / Binance / alternative.me ถูกแทนด้วย stub server ในเครื่อง)
+#
+#   python benchmark.py --output bench.json                      # ชุดเต็ม 1k-10M แถว x 3-500 สินทรัพย์
+#   python benchmark.py --rows 1000 10000 --assets 3 --repeat 3
+#   python benchmark.py --output new.json --compare bench.json   # exit 1 ถ้าช้าลงเกิน --tolerance
+#   python benchmark.py --startup 5 --output boot.json           # cold start: import + เวลาถึงหน้าจอแรก 5 restart
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+DEFAULT_ROWS = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_ASSETS = [3, 50, 500]
+MAX_CELLS = 30_000_000     # แถว x สินทรัพย์ สูงสุดต่อ case (~240 MB ต่อ price matrix) ที่เกินจะถูกข้าม
+FULL_CHART_MAX_ROWS = 100_000   # create_chart แบบไม่ย่อข้อมูล วัดเฉพาะ case ที่ไม่ใหญ่เกินไป
+DEFAULT_REPEAT = 5
+TIME_BUDGET = 10.0         # วินาทีสูงสุดต่อ (case, ขั้นตอน) - ครบก่อนจำนวนรอบก็หยุด
+DEFAULT_TOLERANCE = 1.25   # --compare: ช้ากว่าเดิมเกินกี่เท่าถือว่า regression
+
+
+# ========================================
+# LOCAL STUB API SERVER
+# ========================================
+def stub_price(coin_id):
+    """ราคาคงที่ต่อ coin id (ผลลัพธ์เหมือนกันทุกครั้งที่รัน)"""
+    digest = hashlib.md5(coin_id.encode('utf-8')).digest()
+    return round(1 + int.from_bytes(digest[:4], 'little') / 2 ** 32 * 50_000, 2)
+
+
+def stub_market_coin(rank):
+    return {'market_cap_rank': rank, 'name': f'Coin {rank}', 'symbol': f'c{rank}',
+            'current_price': stub_price(f'coin-{rank}'), 'price_change_percentage_24h': (rank % 13) - 6.5,
+            'market_cap': 10 ** 12 / rank}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """simple/price, coins/markets (CoinGecko), ticker/price (Binance), fng (alternative.me)"""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # header กับ body ถูกเขียนแยกกัน: ปิด Nagle ไม่ให้ delayed ACK (~40 ms) ปนในเวลาที่วัด
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path.endswith('/simple/price'):
+            body = {i: {'usd': stub_price(i)} for i in query['ids'].split(',')}
+        elif url.path.endswith('/coins/markets'):
+            page, per_page = int(query.get('page', 1)), int(query.get('per_page', 100))
+            body = [stub_market_coin(r) for r in range((page - 1) * per_page + 1, page * per_page + 1)]
+        elif url.path.endswith('/ticker/price'):
+            body = [{'symbol': s, 'price': str(stub_price(s))} for s in json.loads(query['symbols'])]
+        elif url.path.endswith('/fng/'):
+            body = {'data': [{'value': '42', 'value_classification': 'Fear'}]}
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, name='benchmark-stub', daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def configure_environment(base_url, workdir):
+    """ชี้ทุก endpoint ไปที่ stub และไฟล์ทั้งหมดไปที่ workdir - ต้องเรียกก่อน import dashboard"""
+    os.environ.update({
+        'COINGECKO_API_URL': f'{base_url}/api/v3',
+        'BINANCE_API_URL': base_url,
+        'FEAR_GREED_URL': f'{base_url}/fng/?limit=1',
+        'RESPONSE_CACHE_FILE': os.path.join(workdir, 'cache.sqlite'),
+        'ALERT_RULES_FILE': os.path.join(workdir, 'alert_rules.json'),
+        'ALERT_LOG_FILE': os.path.join(workdir, 'alerts.jsonl'),
+        'WATCHLIST_FILE': os.path.join(workdir, 'watchlist.json'),
+    })
+
+
+# ========================================
+# TIMING
+# ========================================
+def measure(fn, repeat=DEFAULT_REPEAT, budget=TIME_BUDGET):
+    """เรียก fn ซ้ำ (อย่างน้อย 1 รอบ ไม่เกิน repeat รอบหรือ budget วินาที) คืนสถิติเป็น ms + ผลของรอบสุดท้าย"""
+    times, result = [], None
+    started = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t) * 1000)
+        if time.perf_counter() - started > budget:
+            break
+    return {'n': len(times), 'min_ms': min(times), 'median_ms': statistics.median(times),
+            'mean_ms': statistics.fmean(times)}, result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ========================================
+# CASES
+# ========================================
+def run_case(app, rows, assets, workdir, repeat):
+    """วัดทุกขั้นตอนของ 1 case (rows แถว x assets สินทรัพย์) คืน list ของผลลัพธ์"""
+    from backtest import synthetic_prices
+    from watchlist import Asset
+    from price_store import PriceStore
+    from indicators import IndicatorEngine, IndicatorBatch
+    from retention import RetentionEngine
+    from live_chart import TickFeed
+    from alerts import AlertEngine, default_rules
+
+    watchlist = [Asset(f'A{i}', f'Asset {i}', coingecko_id=f'coin-{i}', seed=100.0) for i in range(assets)]
+    columns = [a.column for a in watchlist]
+    # update_data() / analyze_trend() อ่าน WATCHLIST ระดับ module -> สลับเป็นชุดจำลองของ case นี้
+    app.WATCHLIST, app.PRICE_COLUMNS = watchlist, columns
+
+    ts, prices = synthetic_prices(rows, assets, start=int(time.time()) - rows * 30)
+    case_dir = tempfile.mkdtemp(prefix=f'case_{rows}_{assets}_', dir=workdir)
+    store = PriceStore(os.path.join(case_dir, 'prices.bin'), columns, capacity=rows)
+    store.extend({'ts': ts, **{c: prices[:, i] for i, c in enumerate(columns)}})
+    engine = IndicatorEngine(columns, capacity=rows)
+    engine.last_ts = int(ts[-1])   # ถือว่าตามทัน store แล้ว: วัดเฉพาะต้นทุนต่อ tick (ไม่รวม rebuild ตอนเริ่ม)
+    retention = RetentionEngine(os.path.join(case_dir, 'rollup'), columns)
+    feed = TickFeed(columns)
+    alerts = AlertEngine(default_rules([a.symbol for a in watchlist]), sinks=[], classify=app.get_signal)
+    router = app.PriceRouter([app.CoinGeckoProvider(timeout=10)], timeout=10)
+
+    results = []
+
+    def record(op, fn, **extra):
+        stats, result = measure(fn, repeat)
+        results.append({'rows': rows, 'assets': assets, 'op': op, **stats, **extra})
+        return result
+
+    record('update_data', lambda: app.update_data(store, engine, retention, feed, alerts, router))
+
+    ind = record('indicator_batch', lambda: IndicatorBatch(ts, prices, columns))
+    frame = app.PriceSnapshot(ts, prices.T, columns).to_frame()
+    record('calculate_indicators', lambda: app.calculate_indicators(frame, columns[0]))
+    record('analyze_trend', lambda: [app.analyze_trend(ind, c) for c in columns], calls=assets)
+
+    fig = record('create_chart', lambda: app.create_chart(ind, columns[0], 'bench'))
+    payload = record('chart_json', lambda: fig.to_json())
+    results[-1]['json_bytes'] = len(payload)
+    if rows <= FULL_CHART_MAX_ROWS:
+        fig = record('create_chart_full', lambda: app.create_chart(ind, columns[0], 'bench', method=None))
+        results[-1]['json_bytes'] = len(fig.to_json())
+
+    store.close()
+    return results
+
+
+def run_market(app, repeat):
+    """ตาราง Top 10 / Fear & Greed: ครั้งแรกหลังเริ่ม process (ดึงจาก stub) และครั้งถัดไป (จาก cache)"""
+    results = []
+
+    def cold_top_10():
+        app.get_market_caches.clear()
+        app.get_response_cache().clear()
+        return app.get_top_10_crypto()
+
+    for op, fn in (('get_top_10_crypto_cold', cold_top_10),
+                   ('get_top_10_crypto', app.get_top_10_crypto),
+                   ('fetch_market_page', lambda: app.fetch_market_page(1)),
+                   ('fetch_fear_greed_index', app.fetch_fear_greed_index)):
+        stats, df = measure(fn, repeat)
+        results.append({'rows': None, 'assets': None, 'op': op, **stats})
+        if op == 'get_top_10_crypto_cold' and df.attrs.get('fallback'):
+            raise RuntimeError('stub markets endpoint was not used (got backup data)')
+    return results
+
+
+def load_app():
+    """import dashboard นอก streamlit run (คำสั่ง st.* ระดับ module ไม่มีผลในโหมดนี้)"""
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    import dashboard
+    from rate_limiter import get_coingecko_scheduler, TokenBucket
+    # stub อยู่ในเครื่อง: เปิด rate limit ของ CoinGecko ไม่ให้เวลารอคิวปนกับเวลาทำงานจริง
+    get_coingecko_scheduler().bucket = TokenBucket(1e9, 1e9)
+    return dashboard
+
+
+def run_suite(rows_list, assets_list, repeat, max_cells=MAX_CELLS, log=print):
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    server, base_url = start_stub_server()
+    configure_environment(base_url, workdir)
+    app = load_app()
+
+    report = {
+        'meta': {
+            'commit': git_commit(), 'timestamp': int(time.time()), 'python': platform.python_version(),
+            'numpy': np.__version__, 'pandas': __import__('pandas').__version__,
+            'platform': platform.platform(), 'cpus': os.cpu_count(), 'repeat': repeat,
+        },
+        'results': [],
+        'skipped': [],
+    }
+    report['results'] += run_market(app, repeat)
+    for assets in assets_list:
+        for rows in rows_list:
+            if rows * assets > max_cells:
+                report['skipped'].append({'rows': rows, 'assets': assets, 'reason': f'rows x assets > {max_cells}'})
+                continue
+            started = time.perf_counter()
+            report['results'] += run_case(app, rows, assets, workdir, repeat)
+            log(f'{rows:>10,} rows x {assets:>3} assets  {time.perf_counter() - started:6.1f}s', file=sys.stderr)
+    server.shutdown()
+    return report
+
+
+# ========================================
+# COLD START (RESTART -> FIRST RENDER)
+# ========================================
+# รันใน process ลูก (1 process = 1 restart ของ server): import dashboard ผ่าน AppTest แล้วพิมพ์ span ของ startup
+STARTUP_CHILD = '''
+import json, logging, sys, time
+started = time.perf_counter()
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+wall = time.perf_counter() - started
+from metrics import get_registry
+spans = {(name, labels.get('phase')): last for name, labels, _, _, last, _ in get_registry().spans()
+         if name in ('startup_seconds', 'first_render_seconds')}
+print(json.dumps({'wall': wall, 'exceptions': [str(e.value) for e in at.exception],
+                  'phases': {f'{name}:{phase}': v for (name, phase), v in spans.items()}}))
+'''
+STARTUP_OPS = {
+    'startup_seconds:imports': 'startup_imports',
+    'first_render_seconds:header': 'first_render_header',
+    'first_render_seconds:prices': 'first_render_prices',
+    'first_render_seconds:script': 'first_render_script',
+}
+
+
+def run_startup(runs, log=print):
+    """
+    เปิด dashboard ใหม่ runs ครั้ง (process ใหม่ทุกครั้ง ไฟล์ store / cache เดิม = restart จริง)
+    รอบแรกสร้างไฟล์ใน workdir (ไม่นับ) รอบถัดไปคือ restart ที่มีข้อมูลบนดิสก์แล้ว
+    """
+    workdir = tempfile.mkdtemp(prefix='bench_boot_')
+    server, base_url = start_stub_server()
+    configure_environment(base_url, workdir)
+    repo = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, LIVE_SERVER_PORT='0', PYTHONPATH=repo)
+    samples = {op: [] for op in STARTUP_OPS.values()}
+    samples['startup_wall'] = []
+    for i in range(runs + 1):
+        done = subprocess.run([sys.executable, '-c', STARTUP_CHILD, os.path.join(repo, 'dashboard.py')],
+                              capture_output=True, text=True, cwd=workdir, env=env, timeout=300)
+        if done.returncode != 0:
+            raise RuntimeError(f'startup run failed:\n{done.stderr[-2000:]}')
+        result = json.loads(done.stdout.strip().splitlines()[-1])
+        if result['exceptions']:
+            raise RuntimeError(f'dashboard raised during startup: {result["exceptions"]}')
+        log(f'boot {i}: {result["wall"]:.2f}s {"(priming, not counted)" if i == 0 else ""}', file=sys.stderr)
+        if i == 0:
+            continue
+        samples['startup_wall'].append(result['wall'] * 1000)
+        for phase, op in STARTUP_OPS.items():
+            if phase in result['phases']:
+                samples[op].append(result['phases'][phase] * 1000)
+    server.shutdown()
+
+    report = {
+        'meta': {
+            'commit': git_commit(), 'timestamp': int(time.time()), 'python': platform.python_version(),
+            'numpy': np.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count(), 'repeat': runs,
+        },
+        'results': [{'op': op, 'rows': None, 'assets': None, 'n': len(times), 'min_ms': min(times),
+                     'median_ms': statistics.median(times), 'mean_ms': statistics.fmean(times)}
+                    for op, times in samples.items() if times],
+        'skipped': [],
+    }
+    return report
+
+
+# ========================================
+# COMPARE (REGRESSION CHECK)
+# ========================================
+def result_key(r):
+    return r['op'], r['rows'], r['assets']
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """เทียบ median ของขั้นตอนเดียวกันใน 2 รายงาน -> list ของ (key, เดิม ms, ใหม่ ms, อัตราส่วน, regression?)"""
+    old = {result_key(r): r for r in baseline['results']}
+    rows = []
+    for r in current['results']:
+        before = old.get(result_key(r))
+        if before is None:
+            continue
+        ratio = r['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+        rows.append((result_key(r), before['median_ms'], r['median_ms'], ratio, ratio > tolerance))
+    return rows
+
+
+def print_table(report, out=sys.stdout):
+    print(f"{'op':<24}{'rows':>12}{'assets':>8}{'median ms':>12}{'min ms':>12}{'json bytes':>12}", file=out)
+    for r in report['results']:
+        rows = '' if r['rows'] is None else f"{r['rows']:,}"
+        assets = '' if r['assets'] is None else r['assets']
+        print(f"{r['op']:<24}{rows:>12}{assets:>8}{r['median_ms']:>12.2f}{r['min_ms']:>12.2f}"
+              f"{r.get('json_bytes', ''):>12}", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark of the dashboard data / render pipeline')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--assets', type=int, nargs='+', default=DEFAULT_ASSETS)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--max-cells', type=int, default=MAX_CELLS)
+    parser.add_argument('--output', help='บันทึกผลเป็น JSON (ไม่ระบุ = พิมพ์ JSON ออก stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON ของรอบก่อน: รายงานอัตราส่วนเวลา')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--startup', type=int, metavar='N', help='วัด cold start แทน pipeline: restart N ครั้ง')
+    args = parser.parse_args()
+
+    if args.startup:
+        report = run_startup(args.startup)
+    else:
+        report = run_suite(args.rows, args.assets, args.repeat, args.max_cells)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print_table(report, sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = 0
+        for (op, rows, assets), before, after, ratio, slower in compare(baseline, report, args.tolerance):
+            regressions += slower
+            flag = '  <-- REGRESSION' if slower else ''
+            print(f'{op:<24}{rows or "":>12}{assets or "":>6}{before:>12.2f}{after:>12.2f}{ratio:>8.2f}x{flag}',
+                  file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# ========================================
+# BACKGROUND PRICE COLLECTOR (1 ตัวต่อ SERVER)
+# ========================================
+import threading
+import time
+
+
+class PriceCollector:
+    """
+    🛰️ ตัวเก็บราคาเบื้องหลัง: thread เดียวต่อ process เป็นเจ้าของการดึงราคาและบันทึกไฟล์
+    ทุก session แค่อ่าน snapshot ล่าสุด -> จำนวนครั้งที่เรียก API / เขียนไฟล์ไม่ขึ้นกับจำนวนผู้ชม
+    - initial: snapshot จากข้อมูลที่บันทึกไว้บนดิสก์ -> session แรกวาดราคาล่าสุดได้ทันทีโดยไม่รอ tick แรกจากเน็ต
+    - warmup: งานเตรียมข้อมูลที่ไม่ต้องรอก่อนวาดหน้าแรก (รันใน thread เบื้องหลังก่อน tick แรก)
+    - interval: วินาที หรือฟังก์ชันที่คืนวินาที (อ่านใหม่ทุกรอบ เช่น leader / follower ของหลาย replica)
+    - tick_fn คืน None = ไม่มีอะไรเปลี่ยน (ใช้ snapshot เดิมต่อ)
+    """
+
+    def __init__(self, tick_fn, interval=30, initial=None, warmup=None):
+        self.tick_fn = tick_fn
+        self.interval = interval
+        self.warmup = warmup
+
+        self._lock = threading.Lock()          # กันไม่ให้ tick กับ reset ทำงานซ้อนกัน
+        self._ready = threading.Event()        # set หลัง tick แรกสำเร็จ
+        self._wake = threading.Event()         # ปลุก thread ให้ tick ทันที
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._snapshot = initial
+        self.last_tick_at = None
+        self.last_error = None
+        self.tick_count = 0     # 0 = ยังแสดงข้อมูลจาก initial (ยังไม่มี tick สดรอบแรก)
+        if initial is not None:
+            self._ready.set()
+
+    def start(self):
+        """เริ่ม thread เบื้องหลัง (เรียกซ้ำได้ ไม่สร้าง thread ใหม่)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='price-collector', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        if self.warmup is not None:
+            with self._lock:
+                try:
+                    self.warmup()
+                except Exception as e:
+                    self.last_error = e
+        while not self._stop.is_set():
+            self.tick()
+            # รอจนครบรอบ หรือมีคนสั่งให้ tick ทันที (เช่น กด Reset)
+            self._wake.wait(self.interval() if callable(self.interval) else self.interval)
+            self._wake.clear()
+
+    def tick(self):
+        """ดึงราคา 1 รอบ + บันทึก แล้วเปลี่ยน snapshot ที่ทุก session เห็น"""
+        with self._lock:
+            try:
+                snapshot = self.tick_fn()
+            except Exception as e:
+                # ห้าม thread ตาย: เก็บ error ไว้แสดง แล้วใช้ snapshot เดิมต่อ
+                self.last_error = e
+                return self._snapshot
+            if snapshot is None:
+                snapshot = self._snapshot
+            self._snapshot = snapshot
+            self.last_tick_at = time.time()
+            self.last_error = None
+            self.tick_count += 1
+        self._ready.set()
+        return snapshot
+
+    def reset(self, reset_fn):
+        """ล้างข้อมูล (ภายใต้ lock เดียวกับ tick) แล้วปลุกให้เก็บข้อมูลใหม่ทันที"""
+        with self._lock:
+            reset_fn()
+            self._snapshot = None
+            self._ready.clear()
+        self._wake.set()
+
+    def apply(self, fn):
+        """
+        รัน fn ภายใต้ lock เดียวกับ tick (เช่น เติมประวัติย้อนหลังเข้า store)
+        fn คืน (ผลลัพธ์, snapshot ใหม่ให้ทุก session เห็นทันที หรือ None = ใช้ snapshot เดิม) -> คืนผลลัพธ์
+        """
+        with self._lock:
+            result, snapshot = fn()
+            if snapshot is not None:
+                self._snapshot = snapshot
+        return result
+
+    def snapshot(self, timeout=15):
+        """คืน snapshot ล่าสุด (รอ tick แรกได้ไม่เกิน timeout วินาที)"""
+        self._ready.wait(timeout)
+        return self._snapshot
@@ -1,11 +1,38 @@
+import time
+RUN_STARTED = time.perf_counter()   # ⏱️ เริ่มรอบนี้ของ script (วัดเวลา import / time-to-first-render)
+
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import requests
+import numpy as np
 import os
 from datetime import datetime, timedelta
-import time
 import random
+from functools import partial
+
+from collector import PriceCollector
+from price_store import PriceStore, THAI_OFFSET
+from indicators import IndicatorEngine, IndicatorBatch
+from retention import RetentionEngine
+from downsample import decimate
+from live_server import LiveServer
+from live_chart import TickFeed, handle_plotly_js, live_grid_html, LIVE_PANEL_HEIGHT
+from tick_hub import TickHub
+from render_cache import RenderCache, CachedFigure
+from watchlist import load_watchlist
+from providers import PriceRouter, CoinGeckoProvider, BinanceProvider
+from response_cache import get_response_cache
+from backfill import Backfiller, merge_history
+from alerts import AlertEngine, AlertRule, load_rules, save_rules, default_sinks, RULE_KINDS, DIRECTIONS, ALERT_LOG_FILE
+from snapshot import PriceSnapshot, process_rss_bytes, shallow_size, format_bytes
+from http_client import http_get, fan_out
+from market_cache import SWRCache
+from shared_state import (SharedState, LeaderLease, replica_path, SHARED_STATE_FILE, FOLLOW_INTERVAL, REFRESH_LEASE,
+                          REPLICA_ID)
+from metrics import get_registry, labels, span, inc, timed
+from rate_limiter import coingecko_get, get_coingecko_scheduler, COINGECKO_API_URL, PRIORITY_LIVE_PRICE, PRIORITY_MARKETS
+
+# pandas / plotly.graph_objects / requests / backtest ถูก import ในฟังก์ชันที่ใช้ (หลังวาดหน้าแรกแล้ว)
+# -> session แรกหลังเปิด server เห็น header + ราคาล่าสุดก่อน (python benchmark.py --startup วัดค่านี้)
+IMPORT_SECONDS = time.perf_counter() - RUN_STARTED
 
 # ========================================
 # PAGE CONFIG
@@ -113,106 +140,538 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ========================================
-# DATA UPDATE FUNCTION (WITH AUTO-RESET)
+# DATA UPDATE FUNCTION (WITH TIERED RETENTION)
 # ========================================
-def update_data():
-    """ดึงข้อมูลราคาล่าสุดและบันทึกลง CSV พร้อมตรวจสอบอายุข้อมูล"""
-    csv_file = 'crypto_prices.csv'
-
-    # ⚠️ AUTO-RESET - ตรวจสอบอายุข้อมูล
-    should_reset = False
-    if os.path.exists(csv_file):
+CSV_FILE = 'crypto_prices.csv'     # ไฟล์ CSV เดิม: ใช้ import ครั้งแรก + export เท่านั้น
+# ไฟล์ผู้เขียนคนเดียว: หลาย replica (SHARED_STATE_FILE) แยกโฟลเดอร์ต่อ replica ผ่าน replica_path()
+STORE_FILE = replica_path('crypto_prices.bin')   # ที่เก็บจริง: append-only ring buffer ของ tick ดิบ
+ROLLUP_PREFIX = replica_path('crypto_prices')    # แท่ง OHLC: crypto_prices_1m.bin, _5m, _1h, _1d
+WATCHLIST = load_watchlist()       # watchlist.json (ถ้าไม่มีใช้ BTC / ETH / Gold แบบเดิม)
+PRICE_COLUMNS = [a.column for a in WATCHLIST]
+MAX_ROWS = 2880        # tick ดิบล่าสุด (24 ชม. ที่รอบ 30 วินาที) ที่เก่ากว่านี้อยู่ในแท่ง OHLC
+COLLECT_INTERVAL = 30  # วินาที: รอบการดึงราคาของ collector (1 ครั้งต่อ server ไม่ใช่ต่อผู้ชม)
+PRICE_CACHE_TTL = COLLECT_INTERVAL - 5   # วินาที: ราคาบนดิสก์ที่ยังถือว่าสดพอสำหรับ tick แรกหลัง restart
+BACKFILL_SECONDS = MAX_ROWS * COLLECT_INTERVAL  # เติมประวัติย้อนหลังเท่ากับหน้าต่าง tick ดิบ (24 ชม.)
+BACKFILL_STEP = 300    # วินาที: ความละเอียดของประวัติย้อนหลัง (CoinGecko ให้ทุก ~5 นาทีสำหรับช่วง 1 วัน)
+LEADER_LEASE_SECONDS = 3 * COLLECT_INTERVAL  # leader หายไปนานเท่านี้ replica อื่นรับช่วงดึงราคาแทน
+
+def open_store():
+    """เปิด PriceStore (ครั้งแรกจะนำเข้าข้อมูลจาก CSV เดิมถ้ามี)"""
+    is_new = not os.path.exists(STORE_FILE)
+    store = PriceStore(STORE_FILE, PRICE_COLUMNS, capacity=MAX_ROWS)
+    if is_new and os.path.exists(CSV_FILE):
         try:
-            df = pd.read_csv(csv_file)
-            if len(df) > 0 and 'timestamp' in df.columns:
-                # ตรวจสอบ timestamp ล่าสุด
-                last_timestamp = pd.to_datetime(df['timestamp'].iloc[-1])
-                current_time = pd.Timestamp.now() + pd.Timedelta(hours=7)
-                time_difference = current_time - last_timestamp
-
-                # ถ้าข้อมูลเก่ากว่า 1 ชั่วโมง -> ลบไฟล์และเริ่มใหม่
-                if time_difference > timedelta(hours=1):
-                    os.remove(csv_file)
-                    should_reset = True
-                    st.sidebar.info(f"♻️ รีเซ็ตข้อมูล: ข้อมูลเก่า {time_difference.seconds // 3600} ชั่วโมง")
-            else:
-                # ไฟล์ว่าง -> ลบและเริ่มใหม่
-                should_reset = True
+            store.import_csv(CSV_FILE)
         except Exception:
-            should_reset = True
+            store.clear()  # CSV เสีย -> เริ่มใหม่ (DON'T CRASH!)
+    return store
 
-    # ตรวจสอบว่าไฟล์มีอยู่และมี columns ถูกต้องหรือไม่
-    need_recreate = False
-    if not os.path.exists(csv_file):
-        need_recreate = True
-    else:
-        try:
-            df = pd.read_csv(csv_file)
-            # ตรวจสอบว่ามี columns ที่ถูกต้องหรือไม่
-            required_cols = ['timestamp', 'BTC_price', 'ETH_price', 'Gold_price']
-            if not all(col in df.columns for col in required_cols):
-                need_recreate = True
-        except:
-            need_recreate = True
-
-    # สร้างไฟล์ใหม่ถ้าจำเป็น
-    if need_recreate or should_reset:
-        df = pd.DataFrame(columns=['timestamp', 'BTC_price', 'ETH_price', 'Gold_price'])
-        df.to_csv(csv_file, index=False)
-
-    # อ่านข้อมูลเดิม
-    df = pd.read_csv(csv_file)
+
+def round_price(price):
+    """ปัดราคาเหลือ 2 ตำแหน่ง (เหรียญราคาต่ำกว่า 1 ดอลลาร์เก็บ 4 หลักที่มีนัยสำคัญ)"""
+    return round(price, 2) if abs(price) >= 1 else float(f'{price:.4g}')
+
+
+def update_data(store, engine=None, retention=None, feed=None, alerts=None, router=None, shared=None):
+    """
+    ดึงราคาล่าสุดของทุกสินทรัพย์ใน WATCHLIST (ผ่าน PriceRouter: หลายแหล่ง + hedged) และต่อท้าย PriceStore 1 record (O(1) ต่อ tick)
+    คืน PriceSnapshot (read-only) ที่ collector แชร์ให้ทุก session
+    ถ้าส่ง IndicatorEngine / RetentionEngine มา จะอัปเดตตัวชี้วัดและแท่ง OHLC แบบ incremental ไปด้วย
+    ถ้าส่ง TickFeed มา (ต้องมี engine) จะ publish จุดใหม่ให้กราฟสดด้วย
+    ถ้าส่ง AlertEngine มา (ต้องมี engine) จะประเมินกฎแจ้งเตือนของทุกผู้ใช้กับ tick ใหม่
+    ถ้าส่ง SharedState มา (replica นี้เป็น leader) จะเขียน tick + แท่งที่ปิดลงไฟล์กลางให้ replica อื่นอ่านด้วย
+    ⚠️ เรียกจาก PriceCollector เท่านั้น (thread เบื้องหลัง) - ห้ามเรียก st.* ในฟังก์ชันนี้
+    """
+    now = int(time.time())
+    last = store.last()
 
     # ========================================================
-    # ✨ FIX 1: ปรับราคาเริ่มต้นให้ใกล้เคียงความจริง (แก้กราฟแบน)
+    # ✨ FIX 1: ปรับราคาเริ่มต้นให้ใกล้เคียงความจริง (แก้กราฟแบน) - seed ของแต่ละสินทรัพย์
     # ========================================================
-    last_btc = 90000.0 if len(df) == 0 else float(df['BTC_price'].iloc[-1]) if not df.empty else 90000.0
-    last_eth = 3000.0 if len(df) == 0 else float(df['ETH_price'].iloc[-1]) if not df.empty else 3000.0
-    last_gold = 2600.0 if len(df) == 0 else float(df['Gold_price'].iloc[-1]) if not df.empty else 2600.0
-
+    previous = {}
+    for asset in WATCHLIST:
+        value = np.nan if last is None else float(last[asset.column])
+        previous[asset.column] = asset.seed if np.isnan(value) and asset.seed is not None else value
+
+    # ดึงราคาทุกสินทรัพย์ที่มีแหล่งจริงทีเดียว: CoinGecko (batch) ก่อน ช้าเกิน p95 / ล้ม -> แหล่งสำรอง
+    router = router or get_price_router()
+    live = [a for a in WATCHLIST if a.provider_ids]
     try:
-        # ดึงราคา BTC & ETH จาก CoinGecko API (ฟรี, ไม่ต้อง API key)
-        response = requests.get(
-            'https://api.coingecko.com/api/v3/simple/price?ids=bitcoin,ethereum&vs_currencies=usd',
-            timeout=10
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-            btc_price = data.get('bitcoin', {}).get('usd', last_btc)
-            eth_price = data.get('ethereum', {}).get('usd', last_eth)
+        with span('collector_stage_seconds', stage='fetch'):
+            quotes = router.quote(live) if live else {}
+    except Exception:
+        quotes = {}
+
+    prices = {}
+    for asset in WATCHLIST:
+        quote = quotes.get(asset.symbol)
+        if quote is not None:
+            price = quote
+        elif asset.source == 'simulated':
+            # จำลองราคา (สินทรัพย์ที่ยังไม่มี feed จริง: +/- 0.2% ต่อรอบ)
+            price = previous[asset.column] * (1 + random.uniform(-0.002, 0.002))
         else:
-            # ใช้ราคาล่าสุด + สุ่มเล็กน้อย
-            btc_price = last_btc * (1 + random.uniform(-0.005, 0.005))
-            eth_price = last_eth * (1 + random.uniform(-0.005, 0.005))
-    except:
-        # ถ้า API ล้มเหลว ใช้ราคาล่าสุด + สุ่มเล็กน้อย (DON'T CRASH!)
-        btc_price = last_btc * (1 + random.uniform(-0.005, 0.005))
-        eth_price = last_eth * (1 + random.uniform(-0.005, 0.005))
+            # ถ้าทุกแหล่งล้มเหลว ใช้ราคาล่าสุด + สุ่มเล็กน้อย (DON'T CRASH!)
+            price = previous[asset.column] * (1 + random.uniform(-0.005, 0.005))
+            inc('fallback_total', kind='random_walk_price', asset=asset.symbol)
+        # กรองราคาที่ผิดปกติ (ติดลบ / 0 / ไม่มีราคา) ไม่ให้กราฟกระโดด -> เก็บเป็นช่องว่าง (NaN)
+        prices[asset.column] = round_price(price) if np.isfinite(price) and price > 0 else np.nan
+
+    # ต่อท้าย 1 record ถ้ามีราคาที่ใช้ได้อย่างน้อย 1 ตัว
+    # ring buffer เก็บแค่ MAX_ROWS แถวล่าสุดเอง ส่วนที่เก่ากว่าถูก rollup เป็นแท่ง OHLC ไว้แล้ว
+    appended = any(np.isfinite(p) for p in prices.values())
+    if appended:
+        with span('collector_stage_seconds', stage='store'):
+            store.append(now, prices)
+            closed = retention.add_tick(now, prices) if retention is not None else []
+        if shared is not None:
+            with span('collector_stage_seconds', stage='shared'):
+                try:
+                    shared.publish_tick(now, prices, shared_bars(closed))
+                except Exception:
+                    shared.metrics['errors'] += 1   # ไฟล์กลางใช้ไม่ได้ชั่วคราว: ข้อมูลในเครื่องยังครบ (DON'T CRASH!)
+
+    # 🧊 snapshot ของ tick นี้: array ล้วน 1 ชุดต่อ process ทุก session ใช้ร่วมกัน
+    with span('collector_stage_seconds', stage='snapshot'):
+        snapshot = PriceSnapshot.from_records(store.view(), PRICE_COLUMNS)
+
+    # 📐 ตัวชี้วัดฝั่ง collector: อัปเดตแค่แถวใหม่ (O(1))
+    if engine is not None:
+        with span('collector_stage_seconds', stage='indicators'):
+            engine.sync(store.view())
+            latest = {c: engine.latest(c) for c in PRICE_COLUMNS}
+        if feed is not None and appended:
+            feed.publish(now, prices, latest)
+        # 🔔 กฎแจ้งเตือนถูกประเมินที่นี่ที่เดียว (ฝั่ง server) ไม่ขึ้นกับว่ามีใครเปิดหน้าเว็บอยู่
+        if alerts is not None and appended:
+            with span('collector_stage_seconds', stage='alerts'):
+                alerts.evaluate(now, {a.symbol: (prices[a.column], latest[a.column]['MA20'], latest[a.column]['RSI'])
+                                      for a in WATCHLIST})
+
+    return snapshot
+
+
+def apply_backfill(store, engine, retention, ts, matrix, shared=None):
+    """
+    รวมประวัติย้อนหลังเข้า store (ไม่ซ้ำกับข้อมูลเดิม) แล้วคำนวณตัวชี้วัดใหม่ - เรียกผ่าน PriceCollector.apply
+    แท่ง OHLC สร้างใหม่จาก tick ดิบเฉพาะตอนที่ยังไม่มีแท่งปิดเลย (เพิ่งเริ่ม / หลัง reset) ไม่ทับประวัติยาวที่มีอยู่
+    shared: ประวัติชุดใหม่ถูกเขียนทับในไฟล์กลาง -> replica อื่น sync ใหม่ทั้งชุด
+    คืน (จำนวนแถวที่เพิ่ม, PriceSnapshot ใหม่ หรือ None ถ้าไม่มีอะไรเปลี่ยน)
+    """
+    added = merge_history(store, ts, matrix, PRICE_COLUMNS)
+    if not added:
+        return 0, None
+    records = store.view()
+    engine.rebuild(records)
+    if all(len(tier.store) == 0 for tier in retention.tiers):
+        retention.rebuild(records)
+    if shared is not None:
+        shared.publish_history(records, PRICE_COLUMNS, all_shared_bars(retention), replace=True)
+    return added, PriceSnapshot.from_records(records, PRICE_COLUMNS)
 
-    # จำลองราคาทองคำ (2600 +/- ความผันผวนเล็กน้อย)
-    gold_price = last_gold + random.uniform(-5, 5)
 
-    # เพิ่มข้อมูลใหม่ (เวลาไทย +7)
-    new_row = pd.DataFrame([{
-        'timestamp': (datetime.now() + timedelta(hours=7)).strftime('%Y-%m-%d %H:%M:%S'),
-        'BTC_price': round(btc_price, 2),
-        'ETH_price': round(eth_price, 2),
-        'Gold_price': round(gold_price, 2)
-    }])
+def history_is_short(store):
+    """ประวัติ tick ดิบสั้นกว่าช่วง BACKFILL_SECONDS (เพิ่งเริ่ม / หลัง reset) -> ควรเติมย้อนหลัง"""
+    records = store.view()
+    return len(records) == 0 or int(records['ts'][0]) > time.time() - BACKFILL_SECONDS + BACKFILL_STEP
 
-    df = pd.concat([df, new_row], ignore_index=True)
 
-    # กรองข้อมูลที่มีค่าน้อยกว่า 100 (ป้องกันกราฟกระโดด)
-    df = df[df['BTC_price'] > 100]
+def reset_all_data(store, retention, feed, alerts=None, shared=None):
+    """
+    ล้างทั้ง tick ดิบ แท่ง OHLC ทุกชั้น feed ของกราฟสด และค่าก่อนหน้าของกฎแจ้งเตือน (เรียกผ่าน PriceCollector.reset)
+    shared: ล้างประวัติกลางด้วย -> ทุก replica ล้างของตัวเองตามใน tick ถัดไป
+    """
+    if shared is not None:
+        shared.reset()
+    store.clear()
+    retention.clear()
+    feed.clear()
+    if alerts is not None:
+        alerts.reset()
 
-    # เก็บแค่ 1000 แถวล่าสุด (ประหยัดพื้นที่)
-    if len(df) > 1000:
-        df = df.tail(1000)
+# ========================================
+# MULTI-REPLICA (SHARED STATE + LEADER ELECTION)
+# ========================================
+def shared_bars(closed):
+    """(tier, เวลาเริ่ม, ohlc) ที่ RetentionEngine ปิด -> แถวของตาราง bars (+ ช่วงเวลาที่ชั้นนั้นเก็บ)"""
+    return [(tier.name, ts, ohlc, tier.seconds * tier.store.capacity) for tier, ts, ohlc in closed]
 
-    df.to_csv(csv_file, index=False)
 
-    return df
+def all_shared_bars(retention):
+    """แท่งที่ปิดแล้วทั้งหมดของทุกชั้น (ตอนเขียนประวัติทั้งชุดลงไฟล์กลาง)"""
+    closed = []
+    for tier in retention.tiers:
+        view = tier.store.view()
+        if len(view):
+            closed += zip([tier] * len(view), view['ts'], tier.records_ohlc(view))
+    return shared_bars(closed)
+
+
+def sync_shared(shared, store, engine, retention, feed, alerts=None):
+    """
+    📥 นำ tick / แท่งใหม่จากไฟล์กลางเข้า store + แท่ง OHLC ของ replica นี้ (ไม่เรียก API เลย)
+    - ปกติ: ต่อท้ายเฉพาะ tick ที่ใหม่กว่าของเรา + publish ให้กราฟสด (SSE) เหมือน collector ดึงเอง
+    - generation เปลี่ยน (reset / เติมย้อนหลังจาก replica อื่น): ล้างของเราแล้วโหลดประวัติกลางทั้งชุด
+    คืน dict จาก SharedState.pull (+ 'reset': ประวัติกลางถูกล้าง)
+    """
+    last = store.last()
+    bars_since = {}
+    for tier in retention.tiers:
+        bar = tier.store.last()
+        bars_since[tier.name] = None if bar is None else int(bar['ts'])
+    changes = shared.pull(None if last is None else int(last['ts']), bars_since)
+    changes['reset'] = changes['resync'] and not changes['ticks']
+    if changes['resync']:
+        store.clear()
+        retention.clear()
+        if changes['reset']:
+            feed.clear()
+            if alerts is not None:
+                alerts.reset()
+
+    for tier in retention.tiers:
+        for ts, blob in changes['bars'].get(tier.name, ()):
+            ohlc = np.frombuffer(blob, dtype='<f8')
+            if ohlc.size == len(tier.fields):   # watchlist ของ leader ไม่ตรงกับเรา -> ข้าม (แท่งสร้างเองจาก tick แทน)
+                tier.append_closed(ts, ohlc.reshape(-1, 4))
+    for ts, prices in changes['ticks']:
+        store.append(ts, prices)
+        if not changes['resync']:
+            engine.sync(store.view())
+            feed.publish(ts, prices, {c: engine.latest(c) for c in PRICE_COLUMNS})
+    if changes['resync'] or changes['ticks']:
+        retention.rebuild(store.view())   # แท่งที่ยังไม่ปิดของทุกชั้น (ไม่กี่แถว: ที่ปิดแล้วมาจาก leader)
+        engine.sync(store.view())
+    return changes
+
+
+def sync_alert_rules(shared, alerts):
+    """กฎในไฟล์กลางเปลี่ยน (เพิ่ม / ลบจาก replica ไหนก็ได้) -> โหลดใหม่ทั้งชุด คืน True ถ้ามีการโหลด"""
+    if shared.rules_version() == shared.rules_seen:
+        return False
+    version, rules = shared.load_rules()
+    parsed = []
+    for d in rules:
+        try:
+            parsed.append(AlertRule.from_dict(d))
+        except (ValueError, KeyError, TypeError):
+            continue   # กฎเสีย 1 ข้อไม่ทำให้กฎที่เหลือหายไปด้วย
+    alerts.replace_rules(parsed)
+    shared.rules_seen = version
+    return True
+
+
+def collect_or_follow(shared, lease, store, engine, retention, feed, alerts, router):
+    """
+    🛰️ 1 รอบของ collector เมื่อมีหลาย replica ใช้ไฟล์กลางร่วมกัน
+    - ทุกรอบ: ต่ออายุ / ขอ lease แล้วตามไฟล์กลางให้ทัน (tick ของ leader / reset จาก replica อื่น)
+    - leader: ดึงราคาจาก API + ประเมินกฎแจ้งเตือนตามปกติ แล้วเขียน tick ลงไฟล์กลาง
+    - follower: ไม่เรียก API ราคาเลย อ่านอย่างเดียวทุก FOLLOW_INTERVAL วินาที
+    คืน PriceSnapshot ใหม่ หรือ None ถ้าไม่มีอะไรเปลี่ยน
+    """
+    leader, promoted = lease.refresh()
+    first_sync = shared.generation is None
+    if alerts is not None:
+        sync_alert_rules(shared, alerts)   # leader ประเมินกฎที่เพิ่มจาก follower ได้ตั้งแต่ tick นี้
+    with span('collector_stage_seconds', stage='sync'):
+        changes = sync_shared(shared, store, engine, retention, feed, alerts)
+    if leader:
+        if promoted or first_sync:
+            # ประวัติในเครื่องที่ไฟล์กลางยังไม่มี (deploy แรก / leader เดิมตายก่อนเขียน) -> เขียนให้ทุก replica เห็น
+            shared.publish_history(store.view(), PRICE_COLUMNS, all_shared_bars(retention))
+        if (changes['reset'] or promoted) and history_is_short(store) and shared.request_backfill is not None:
+            shared.request_backfill()
+        return update_data(store, engine, retention, feed, alerts, router, shared)
+    if changes['resync'] or changes['ticks']:
+        return PriceSnapshot.from_records(store.view(), PRICE_COLUMNS)
+    return None
+
+
+@st.cache_resource
+def get_store():
+    """💾 PriceStore ตัวเดียวต่อ server (collector เขียน / ทุก session อ่าน)"""
+    return open_store()
+
+
+@st.cache_resource
+def get_retention():
+    """🗄️ RetentionEngine ตัวเดียวต่อ server (แท่งที่ยังไม่ปิดถูกสร้างคืนจาก tick ดิบใน warmup ของ collector)"""
+    return RetentionEngine(ROLLUP_PREFIX, PRICE_COLUMNS)
+
+
+@st.cache_resource
+def get_indicator_engine():
+    """📐 IndicatorEngine ของ collector (อัปเดตทีละ tick / rebuild หลังเติมประวัติย้อนหลัง)"""
+    return IndicatorEngine(PRICE_COLUMNS, capacity=MAX_ROWS)
+
+
+@st.cache_resource
+def get_collector():
+    """
+    🛰️ สร้าง PriceCollector ครั้งเดียวต่อ server แล้วแชร์ให้ทุก session
+    🚀 cold start: snapshot แรกมาจาก store บนดิสก์ (ราคาล่าสุดก่อน restart) -> หน้าแรกไม่ต้องรอ API
+    ส่วนการสร้างแท่ง OHLC คืน / ตัวชี้วัด / ราคาใหม่จากเน็ต ทำใน thread ของ collector หลังจากนั้น
+    🗃️ หลาย replica (SHARED_STATE_FILE): replica ที่ได้ lease เป็นคนดึงราคา ตัวอื่นอ่าน tick จากไฟล์กลาง
+    """
+    store = get_store()
+    engine = get_indicator_engine()
+    retention = get_retention()
+    feed = get_tick_feed()
+    alerts = get_alert_engine()
+    router = get_price_router()
+    records = store.view()
+    initial = PriceSnapshot.from_records(records, PRICE_COLUMNS) if len(records) else None
+    shared = get_shared_state()
+    if shared is None:
+        return PriceCollector(lambda: update_data(store, engine, retention, feed, alerts, router),
+                              interval=COLLECT_INTERVAL, initial=initial,
+                              warmup=lambda: retention.rebuild(store.view())).start()
+    lease = get_leader_lease()
+    lease.refresh()   # รู้บทบาทก่อน session แรกวาดเสร็จ (เติมประวัติย้อนหลังเฉพาะ leader)
+    return PriceCollector(lambda: collect_or_follow(shared, lease, store, engine, retention, feed, alerts, router),
+                          interval=lambda: COLLECT_INTERVAL if lease.is_leader else FOLLOW_INTERVAL,
+                          initial=initial, warmup=lambda: retention.rebuild(store.view())).start()
+
+
+@st.cache_resource
+def get_shared_state():
+    """🗃️ ไฟล์สถานะกลางของทุก replica (SHARED_STATE_FILE) - ไม่ได้ตั้ง = None: replica เดียวแบบเดิม"""
+    if not SHARED_STATE_FILE:
+        return None
+    return SharedState(SHARED_STATE_FILE, keep_ticks=MAX_ROWS)
+
+
+@st.cache_resource
+def get_leader_lease():
+    """👑 lease ของการดึงราคา (None เมื่อไม่มีไฟล์กลาง: process นี้ดึงเองเสมอ)"""
+    shared = get_shared_state()
+    return None if shared is None else LeaderLease(shared, ttl=LEADER_LEASE_SECONDS)
+
+
+def is_leader():
+    """replica นี้เป็นคนดึงราคา / เรียก API ประวัติย้อนหลังหรือไม่ (replica เดียว = ใช่เสมอ)"""
+    lease = get_leader_lease()
+    return lease is None or lease.is_leader
+
+
+@st.cache_resource
+def get_price_router():
+    """🛣️ แหล่งราคาตามลำดับ: CoinGecko (หลัก, ผ่าน disk cache ข้าม restart) -> Binance (สำรอง)"""
+    return PriceRouter([
+        # ราคาที่เพิ่งดึงก่อน restart (ไม่เกิน PRICE_CACHE_TTL) ใช้ซ้ำจากดิสก์ได้ ไม่ยิง API ซ้ำตอน deploy / crash
+        CoinGeckoProvider(get_response_cache(), PRICE_CACHE_TTL, priority=PRIORITY_LIVE_PRICE, timeout=10),
+        BinanceProvider(timeout=10),
+    ], timeout=10)
+
+
+@st.cache_resource
+def get_alert_engine():
+    """
+    🔔 AlertEngine ตัวเดียวต่อ server: กฎของทุกผู้ใช้จาก ALERT_RULES_FILE (ไม่มีไฟล์ = กฎพื้นฐานของทุกสินทรัพย์)
+    🗃️ หลาย replica: กฎอยู่ในไฟล์กลาง (replica แรกเอาไฟล์กฎของตัวเองไปตั้งต้น) ทุก replica โหลดชุดเดียวกัน
+    """
+    rules = load_rules(symbols=[a.symbol for a in WATCHLIST])
+    alerts = AlertEngine(rules, default_sinks(replica_path(ALERT_LOG_FILE)), classify=get_signal)
+    shared = get_shared_state()
+    if shared is not None:
+        shared.seed_rules([r.to_dict() for r in rules])
+        sync_alert_rules(shared, alerts)
+    return alerts
+
+
+@st.cache_resource
+def get_backfiller():
+    """🕰️ งานเติมประวัติย้อนหลัง 1 ตัวต่อ server: เริ่มเองตอนเปิดถ้าประวัติยังสั้น (ทำเบื้องหลัง ไม่บล็อกหน้าเว็บ)"""
+    store = get_store()
+    engine = get_indicator_engine()
+    retention = get_retention()
+    collector = get_collector()
+    shared = get_shared_state()
+    backfiller = Backfiller(
+        WATCHLIST, PRICE_COLUMNS,
+        lambda ts, matrix: collector.apply(lambda: apply_backfill(store, engine, retention, ts, matrix, shared)),
+        seconds=BACKFILL_SECONDS, step=BACKFILL_STEP,
+    )
+    if shared is not None:
+        shared.request_backfill = backfiller.start   # leader คนใหม่ / reset จาก replica อื่น
+    if history_is_short(store) and is_leader():
+        backfiller.start()
+    return backfiller
+
+
+@st.cache_resource
+def get_tick_hub():
+    """📣 fan-out ของ tick ใหม่ไปยังทุก browser ที่เปิดโหมดสตรีม (SSE บน live server)"""
+    return TickHub()
+
+
+@st.cache_resource
+def get_tick_feed():
+    """📡 tick ล่าสุดสำหรับกราฟสด (collector publish 1 ครั้งต่อ tick -> push ผ่าน TickHub ไป /stream)"""
+    return TickFeed(PRICE_COLUMNS, hub=get_tick_hub(), classify=get_signal)
+
+
+@st.cache_resource
+def get_live_server():
+    """🛰️ HTTP server ข้าง Streamlit 1 ตัวต่อ process: ส่งเฉพาะจุดใหม่ของกราฟสด"""
+    server = LiveServer()
+    server.route('/stream', get_tick_hub().handle_stream)
+    server.route('/plotly.min.js', handle_plotly_js)
+    server.route('/metrics', get_registry().handle_metrics)
+    return server.start()
+
+def page_host():
+    """host ที่ browser ใช้เปิดหน้านี้ (header Host) - ไม่มี request จริง (เช่นรันแบบ bare) คืน None"""
+    try:
+        return st.context.headers.get('Host')
+    except Exception:
+        return None
+
+# ========================================
+# METRICS (/metrics บน LIVE SERVER + DEBUG PANEL)
+# ========================================
+def active_sessions():
+    """
+    จำนวน session ที่เปิดอยู่ใน process นี้ - อ่านจาก API ภายในของ Streamlit
+    ถ้า Streamlit รุ่นใหม่เปลี่ยนชื่อไป คืน None (/metrics ข้าม gauge นี้ แทนที่จะพังทั้ง scrape)
+    """
+    from streamlit import runtime
+    if not runtime.exists():
+        return 0
+    try:
+        return runtime.get_instance()._session_mgr.num_active_sessions()
+    except AttributeError:
+        return None
+
+
+@st.cache_resource
+def get_metrics_registry():
+    """
+    📏 ลงทะเบียน gauge ของ object ที่แชร์กันทั้ง server ครั้งเดียวต่อ process
+    ค่าถูกอ่านตอน scrape /metrics เท่านั้น (ตัวนับอยู่ใน object เดิมอยู่แล้ว ไม่เพิ่มงานต่อ request)
+    """
+    registry = get_registry()
+    if not registry.enabled:
+        return registry
+    collector = get_collector()
+    router = get_price_router()
+    alerts = get_alert_engine()
+    render_cache = get_render_cache()
+    disk = get_response_cache()
+    scheduler = get_coingecko_scheduler()
+    swr = get_market_caches()
+    hub = get_tick_hub()
+
+    def cache_requests():
+        values = {labels(cache='render', result='hit'): render_cache.metrics['hits'],
+                  labels(cache='render', result='miss'): render_cache.metrics['misses'],
+                  labels(cache='coingecko_inflight', result='hit'): scheduler.metrics['coalesced'],
+                  labels(cache='coingecko_inflight', result='miss'): scheduler.metrics['requests']}
+        if disk is not None:
+            values[labels(cache='disk', result='hit')] = disk.metrics['hits']
+            values[labels(cache='disk', result='miss')] = disk.metrics['misses']
+        return values
+
+    def provider_requests():
+        return {labels(provider=name, result=result): count
+                for name, ps in router.stats().items()
+                for result, count in (('ok', ps['requests'] - ps['errors']), ('error', ps['errors']))}
+
+    def last_tick_age():
+        return time.time() - collector.last_tick_at if collector.last_tick_at else {}
+
+    def circuit_open():
+        caches = [swr['fear_greed'], *swr['markets']]
+        return {labels(endpoint=c.name): int(c.health.state != 'closed') for c in caches}
+
+    registry.describe('render_stage_seconds', 'Seconds spent per render stage of a script / fragment run')
+    registry.describe('collector_stage_seconds', 'Seconds spent per stage of a collector tick')
+    registry.describe('upstream_seconds', 'Upstream API call latency')
+    registry.describe('upstream_errors_total', 'Failed upstream API calls')
+    registry.describe('fallback_total', 'Times a fallback value was served instead of live data')
+    registry.describe('startup_seconds', 'Cold start cost of this process (phase=imports)')
+    registry.describe('first_render_seconds', 'Seconds from the first script run of a session until each phase was drawn')
+    registry.gauge('cache_requests_total', cache_requests, 'Cache lookups by cache and result', kind='counter')
+    registry.gauge('provider_requests_total', provider_requests, 'Price provider requests by result', kind='counter')
+    registry.gauge('provider_latency_p95_seconds',
+                   lambda: {labels(provider=n): ps['p95'] for n, ps in router.stats().items()},
+                   'p95 latency of each price provider')
+    registry.gauge('active_sessions', active_sessions, 'Browser sessions connected to this process')
+    registry.gauge('collector_ticks_total', lambda: collector.tick_count, 'Collector ticks since start', kind='counter')
+    registry.gauge('collector_last_tick_age_seconds', last_tick_age, 'Seconds since the last collector tick')
+    registry.gauge('alerts_fired_total', lambda: alerts.metrics['fired'], 'Alerts delivered to sinks', kind='counter')
+    registry.gauge('upstream_circuit_open', circuit_open, '1 while the circuit breaker of an endpoint is open')
+    registry.gauge('stream_subscribers', lambda: len(hub), 'Browsers connected to the /stream tick push')
+    registry.gauge('stream_messages_total',
+                   lambda: {labels(result='sent'): hub.metrics['sent'], labels(result='dropped'): hub.metrics['dropped']},
+                   'Tick messages pushed to stream subscribers (dropped = slow subscriber disconnected)', kind='counter')
+    registry.gauge('coingecko_queue_depth', scheduler.queue_depth, 'Requests waiting for a CoinGecko token')
+    shared = get_shared_state()
+    if shared is not None:
+        lease = get_leader_lease()
+        registry.describe('leader_changes_total', 'Times this replica gained (role=leader) or lost (role=follower) the collector lease')
+        registry.gauge('replica_leader', lambda: int(lease.is_leader), '1 while this replica holds the collector lease')
+        registry.gauge('shared_state_ops_total',
+                       lambda: {labels(op=op): count for op, count in shared.metrics.items()},
+                       'Shared state ticks published / pulled, full resyncs and errors', kind='counter')
+    return registry
+
+
+# ========================================
+# COLD START (IMPORT + TIME-TO-FIRST-RENDER)
+# ========================================
+STARTUP_RETRY = 2      # วินาที: ระหว่างรอราคาสดรอบแรก fragment ของราคาเช็กใหม่ถี่เท่านี้
+
+
+def collector_warming(collector):
+    """ยังไม่มีราคาสดรอบแรก (หน้าจอแสดง snapshot จากดิสก์ หรือยังว่าง) และ collector ยังไม่ error"""
+    return collector.tick_count == 0 and collector.last_error is None
+
+
+@st.cache_resource
+def get_startup_profile():
+    """
+    ⏱️ เวลา import ของ process นี้: วัดจาก script รอบแรกของ process เท่านั้น
+    (รอบถัดไป import มาจาก sys.modules แล้ว ค่าจะเหลือ ~0)
+    """
+    get_registry().observe('startup_seconds', IMPORT_SECONDS, phase='imports')
+    return {'imports': IMPORT_SECONDS}
+
+
+def mark_first_render(phase):
+    """เวลาตั้งแต่เริ่ม script รอบแรกของ session จนวาด phase นี้เสร็จ (header / prices / script) - บันทึกครั้งเดียวต่อ session"""
+    marks = st.session_state.get('first_render')
+    if marks is None or phase in marks:
+        return
+    marks[phase] = time.perf_counter() - marks['started']
+    get_registry().observe('first_render_seconds', marks[phase], phase=phase)
+
+
+def render_debug_panel(registry):
+    """🐞 เวลาของแต่ละขั้น (เฉลี่ย / ล่าสุด / สูงสุด) และตัวนับ - สร้างตารางเฉพาะตอนเปิดดูเท่านั้น"""
+    import pandas as pd
+    if not st.sidebar.checkbox('🐞 Debug: เวลาแต่ละขั้น', value=False, key='debug_panel'):
+        return
+    if not registry.enabled:
+        st.sidebar.caption('📏 metrics ถูกปิดอยู่ (METRICS_ENABLED=0)')
+        return
+    spans = pd.DataFrame(
+        [(name, ', '.join(f'{k}={v}' for k, v in lbl.items()), count, avg * 1000, last * 1000, peak * 1000)
+         for name, lbl, count, avg, last, peak in registry.spans()],
+        columns=['span', 'labels', 'ครั้ง', 'เฉลี่ย (ms)', 'ล่าสุด (ms)', 'สูงสุด (ms)'])
+    st.sidebar.dataframe(spans.sort_values(['span', 'labels']), hide_index=True, use_container_width=True,
+                         column_config={c: st.column_config.NumberColumn(format='%.1f')
+                                        for c in ['เฉลี่ย (ms)', 'ล่าสุด (ms)', 'สูงสุด (ms)']})
+    counters = [(name, ', '.join(f'{k}={v}' for k, v in key), value)
+                for name, series in sorted(registry.counters().items()) for key, value in sorted(series.items())]
+    if counters:
+        st.sidebar.dataframe(pd.DataFrame(counters, columns=['counter', 'labels', 'ค่า']),
+                             hide_index=True, use_container_width=True)
+    marks = st.session_state.get('first_render', {})
+    st.sidebar.caption(f"🚀 import ตอนเปิด process {get_startup_profile()['imports'] * 1000:.0f} ms | session นี้: "
+                       + ' / '.join(f'{phase} {marks[phase] * 1000:.0f} ms' for phase in ('header', 'prices', 'script')
+                                    if phase in marks))
+    st.sidebar.caption(f'📡 Prometheus: {get_live_server().url("/metrics")}')
 
 # ========================================
 # TIER 1 AI: SIGNAL GENERATOR FOR MAIN CHARTS
@@ -239,138 +698,213 @@ def get_signal(price, ma, rsi):
         return "⚪ ชะลอการลงทุน (Wait)", "signal-gray"
 
 # ========================================
-# FEAR & GREED INDEX (CACHED + FALLBACK)
+# FEAR & GREED INDEX (SWR CACHE + FALLBACK)
 # ========================================
-@st.cache_data(ttl=600)  # Cache 10 นาที ประหยัด API
+FEAR_GREED_FALLBACK = (50, "Neutral (50)", "😐 ไม่สามารถดึงข้อมูลได้ - แสดงค่ากลาง")
+FEAR_GREED_URL = os.environ.get('FEAR_GREED_URL', 'https://api.alternative.me/fng/?limit=1')
+
+def fetch_fear_greed_index():
+    """ดึงดัชนี Fear & Greed จาก Alternative.me API (raise ถ้าล้มเหลว ให้ cache นับ backoff)"""
+    response = http_get(FEAR_GREED_URL, timeout=5)
+    if response.status_code != 200:
+        raise Exception(f"Fear & Greed API returned {response.status_code}")
+
+    data = response.json()
+    value = int(data['data'][0]['value'])
+    classification = data['data'][0]['value_classification']
+
+    # คำแนะนำภาษาไทย
+    if value <= 25:
+        advice = "😱 ตลาดกลัวมาก! เป็นโอกาสซื้อที่ดี (Extreme Fear)"
+    elif value <= 45:
+        advice = "😟 ตลาดกลัว อาจพิจารณาซื้อเพิ่ม (Fear)"
+    elif value <= 55:
+        advice = "😐 ตลาดเป็นกลาง รอสัญญาณชัดเจน (Neutral)"
+    elif value <= 75:
+        advice = "😊 ตลาดโลภ ระวังการปรับฐาน (Greed)"
+    else:
+        advice = "🤑 ตลาดโลภมาก! พิจารณาขายทำกำไร (Extreme Greed)"
+
+    return value, classification, advice
+
+
 def get_fear_greed_index():
-    """ดึงดัชนี Fear & Greed จาก Alternative.me API พร้อม FALLBACK"""
-    try:
-        response = requests.get('https://api.alternative.me/fng/?limit=1', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            value = int(data['data'][0]['value'])
-            classification = data['data'][0]['value_classification']
-
-            # คำแนะนำภาษาไทย
-            if value <= 25:
-                advice = "😱 ตลาดกลัวมาก! เป็นโอกาสซื้อที่ดี (Extreme Fear)"
-            elif value <= 45:
-                advice = "😟 ตลาดกลัว อาจพิจารณาซื้อเพิ่ม (Fear)"
-            elif value <= 55:
-                advice = "😐 ตลาดเป็นกลาง รอสัญญาณชัดเจน (Neutral)"
-            elif value <= 75:
-                advice = "😊 ตลาดโลภ ระวังการปรับฐาน (Greed)"
-            else:
-                advice = "🤑 ตลาดโลภมาก! พิจารณาขายทำกำไร (Extreme Greed)"
-
-            return value, classification, advice
-        else:
-            # FALLBACK: API ล้มเหลว
-            return 50, "Neutral (50)", "😐 ไม่สามารถดึงข้อมูลได้ - แสดงค่ากลาง"
-    except:
-        # FALLBACK: API ล้มเหลว
-        return 50, "Neutral (50)", "😐 ไม่สามารถดึงข้อมูลได้ - แสดงค่ากลาง"
+    """ดัชนี Fear & Greed ล่าสุดจาก cache พร้อม FALLBACK (ห้ามเรียก st.* - รันใน fan_out ได้)"""
+    result = get_market_caches()['fear_greed'].get()
+    if result.value is None:
+        return FEAR_GREED_FALLBACK
+    return result.value
 
 # ========================================
-# TIER 2 AI: TOP 10 CRYPTO TABLE (CACHED + HARDCODED BACKUP)
+# TIER 2 AI: TOP-N CRYPTO TABLE (SWR CACHE ต่อหน้า + HARDCODED BACKUP)
 # ========================================
-@st.cache_data(ttl=600)  # Cache 10 นาที (ป้องกัน Rate Limit)
-def get_top_10_crypto():
+COINS_MARKETS_URL = f'{COINGECKO_API_URL}/coins/markets'
+MARKETS_PER_PAGE = 250                       # สูงสุดที่ coins/markets ให้ต่อ 1 request
+TOP_N_OPTIONS = [10, 50, 100, 250, 500, 1000]
+
+def classify_advice(change_24h):
+    """🤖 TIER 2 AI: คำแนะนำจาก % เปลี่ยนแปลง 24 ชม. ของทุกเหรียญทีเดียว (ไม่มีข้อมูล = 0%)"""
+    change = np.nan_to_num(np.asarray(change_24h, dtype='f8'), nan=0.0)
+    return np.select(
+        [change >= 3.0, change >= 0.0, change < -3.0],
+        ["🔥 พุ่งแรง (Momentum)", "🟢 เก็บของ (Accumulate)", "🩸 หนีตาย (Panic Sell)"],
+        default="🔻 ย่อตัว (Correction)",   # -3% <= change < 0%
+    )
+
+
+def build_market_frame(coins, first_rank=1):
     """
-    🛡️ CRITICAL FIX: ดึงข้อมูล Top 10 Crypto จาก CoinGecko
-    พร้อม TIER 2 AI + HARDCODED BACKUP DATA ถ้า API ล้มเหลว
-    ตารางจะไม่มีวันว่างเปล่า!
+    list ของเหรียญ (รูปแบบ coins/markets) -> DataFrame พร้อม TIER 2 AI Signal
+    สร้างทีละ column และเก็บราคา/มูลค่าเป็นตัวเลข (จัดรูปแบบตอนแสดงผลเท่านั้น -> เรียงลำดับได้จริง)
     """
-    try:
-        # TRY: ดึงข้อมูลจาก CoinGecko API
-        response = requests.get(
-            'https://api.coingecko.com/api/v3/coins/markets?vs_currency=usd&order=market_cap_desc&per_page=10&page=1',
-            timeout=10
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-
-            # สร้าง DataFrame พร้อม TIER 2 AI Signal
-            rows = []
-            for i, coin in enumerate(data):
-                price_change_24h = coin.get('price_change_percentage_24h', 0)
-
-                # 🤖 TIER 2 AI: Logic for คำแนะนำ AI
-                if price_change_24h >= 3.0:
-                    ai_advice = "🔥 พุ่งแรง (Momentum)"
-                elif price_change_24h >= 0.0:
-                    ai_advice = "🟢 เก็บของ (Accumulate)"
-                elif price_change_24h < -3.0:
-                    ai_advice = "🩸 หนีตาย (Panic Sell)"
-                else:  # price_change_24h < 0.0
-                    ai_advice = "🔻 ย่อตัว (Correction)"
-
-                rows.append({
-                    'อันดับ': i + 1,
-                    'ชื่อ': coin['name'],
-                    'สัญลักษณ์': coin['symbol'].upper(),
-                    'ราคา (USD)': f"${coin['current_price']:,.2f}",
-                    'มูลค่าตลาด': f"${coin['market_cap']:,.0f}",
-                    '24h %': f"{price_change_24h:.2f}%",
-                    'คำแนะนำ AI': ai_advice
-                })
-
-            return pd.DataFrame(rows)
-        else:
-            # API ส่ง Status Code ผิด -> ใช้ BACKUP
-            raise Exception("API returned non-200 status")
+    import pandas as pd
+    def numeric(key):
+        return np.array([np.nan if c.get(key) is None else c[key] for c in coins], dtype='f8')
+
+    change_24h = numeric('price_change_percentage_24h')
+    return pd.DataFrame({
+        'อันดับ': np.arange(first_rank, first_rank + len(coins)),
+        'ชื่อ': [c['name'] for c in coins],
+        'สัญลักษณ์': [c['symbol'].upper() for c in coins],
+        'ราคา (USD)': numeric('current_price'),
+        'มูลค่าตลาด': numeric('market_cap'),
+        '24h %': change_24h,
+        'คำแนะนำ AI': classify_advice(change_24h),
+    })
+
+
+def market_frame_to_json(df):
+    """DataFrame ของหน้า coins/markets -> dict column -> list (เก็บใน ResponseCache แบบ JSON)"""
+    return df.to_dict('list')
+
+
+def market_frame_from_json(data):
+    import pandas as pd
+    df = pd.DataFrame(data)
+    df.attrs['fallback'] = False
+    return df
+
+
+# รูปแบบตัวเลขของตาราง (ข้อมูลจริงยังเป็นตัวเลข: คลิกหัวตารางเพื่อเรียงได้ทันที)
+MARKET_COLUMN_CONFIG = {
+    'อันดับ': st.column_config.NumberColumn(format='%d'),
+    'ราคา (USD)': st.column_config.NumberColumn(format='dollar'),
+    'มูลค่าตลาด': st.column_config.NumberColumn(format='dollar'),
+    '24h %': st.column_config.NumberColumn(format='%.2f%%'),
+}
+
+def fetch_market_page(page):
+    """
+    ดึงข้อมูลตลาด 1 หน้า (MARKETS_PER_PAGE เหรียญ เรียงตามมูลค่าตลาด) จาก CoinGecko พร้อม TIER 2 AI
+    raise ถ้าล้มเหลว (cache จะนับ backoff และ get_top_crypto() ใช้ BACKUP แทน)
+    """
+    response = coingecko_get(
+        COINS_MARKETS_URL,
+        params={'vs_currency': 'usd', 'order': 'market_cap_desc', 'per_page': MARKETS_PER_PAGE, 'page': page},
+        priority=PRIORITY_MARKETS,
+        timeout=10
+    )
+    if response.status_code != 200:
+        # API ส่ง Status Code ผิด -> ใช้ BACKUP
+        raise Exception(f"Markets API page {page} returned {response.status_code}")
+
+    df = build_market_frame(response.json(), first_rank=(page - 1) * MARKETS_PER_PAGE + 1)
+    df.attrs['fallback'] = False
+    return df
 
-    except Exception as e:
-        # 🛡️ EXCEPT (FALLBACK): ใช้ HARDCODED BACKUP DATA
-        st.sidebar.warning(f"⚠️ Top 10 API ล้มเหลว - ใช้ข้อมูลสำรอง")
-
-        # 🔥 CRITICAL FIX: HARDCODED BACKUP DATA พร้อม TIER 2 AI COLUMN
-        backup_data = [
-            {'market_cap_rank': 1, 'name': 'Bitcoin', 'symbol': 'btc', 'current_price': 92000, 'price_change_percentage_24h': -1.5, 'market_cap': 1800000000000},
-            {'market_cap_rank': 2, 'name': 'Ethereum', 'symbol': 'eth', 'current_price': 3200, 'price_change_percentage_24h': 0.8, 'market_cap': 380000000000},
-            {'market_cap_rank': 3, 'name': 'Tether', 'symbol': 'usdt', 'current_price': 1.0, 'price_change_percentage_24h': 0.0, 'market_cap': 120000000000},
-            {'market_cap_rank': 4, 'name': 'BNB', 'symbol': 'bnb', 'current_price': 600, 'price_change_percentage_24h': 1.2, 'market_cap': 90000000000},
-            {'market_cap_rank': 5, 'name': 'Solana', 'symbol': 'sol', 'current_price': 140, 'price_change_percentage_24h': 4.5, 'market_cap': 65000000000},
-            {'market_cap_rank': 6, 'name': 'XRP', 'symbol': 'xrp', 'current_price': 0.55, 'price_change_percentage_24h': -0.3, 'market_cap': 28000000000},
-            {'market_cap_rank': 7, 'name': 'Cardano', 'symbol': 'ada', 'current_price': 0.45, 'price_change_percentage_24h': 2.1, 'market_cap': 16000000000},
-            {'market_cap_rank': 8, 'name': 'Avalanche', 'symbol': 'avax', 'current_price': 35, 'price_change_percentage_24h': 6.5, 'market_cap': 14000000000},
-            {'market_cap_rank': 9, 'name': 'Dogecoin', 'symbol': 'doge', 'current_price': 0.08, 'price_change_percentage_24h': -4.2, 'market_cap': 11000000000},
-            {'market_cap_rank': 10, 'name': 'Polkadot', 'symbol': 'dot', 'current_price': 7.2, 'price_change_percentage_24h': 1.8, 'market_cap': 9500000000}
-        ]
-
-        # สร้าง DataFrame จากข้อมูลสำรอง พร้อม TIER 2 AI Signal
-        rows = []
-        for coin in backup_data:
-            price_change_24h = coin['price_change_percentage_24h']
-
-            # 🤖 TIER 2 AI: Logic for คำแนะนำ AI
-            if price_change_24h >= 3.0:
-                ai_advice = "🔥 พุ่งแรง (Momentum)"
-            elif price_change_24h >= 0.0:
-                ai_advice = "🟢 เก็บของ (Accumulate)"
-            elif price_change_24h < -3.0:
-                ai_advice = "🩸 หนีตาย (Panic Sell)"
-            else:  # price_change_24h < 0.0
-                ai_advice = "🔻 ย่อตัว (Correction)"
-
-            rows.append({
-                'อันดับ': coin['market_cap_rank'],
-                'ชื่อ': coin['name'],
-                'สัญลักษณ์': coin['symbol'].upper(),
-                'ราคา (USD)': f"${coin['current_price']:,.2f}",
-                'มูลค่าตลาด': f"${coin['market_cap']:,.0f}",
-                '24h %': f"{price_change_24h:.2f}%",
-                'คำแนะนำ AI': ai_advice
-            })
-
-        return pd.DataFrame(rows)
+
+def get_backup_top_10():
+    """🔥 CRITICAL FIX: HARDCODED BACKUP DATA พร้อม TIER 2 AI COLUMN - ตารางจะไม่มีวันว่างเปล่า!"""
+    backup_data = [
+        {'market_cap_rank': 1, 'name': 'Bitcoin', 'symbol': 'btc', 'current_price': 92000, 'price_change_percentage_24h': -1.5, 'market_cap': 1800000000000},
+        {'market_cap_rank': 2, 'name': 'Ethereum', 'symbol': 'eth', 'current_price': 3200, 'price_change_percentage_24h': 0.8, 'market_cap': 380000000000},
+        {'market_cap_rank': 3, 'name': 'Tether', 'symbol': 'usdt', 'current_price': 1.0, 'price_change_percentage_24h': 0.0, 'market_cap': 120000000000},
+        {'market_cap_rank': 4, 'name': 'BNB', 'symbol': 'bnb', 'current_price': 600, 'price_change_percentage_24h': 1.2, 'market_cap': 90000000000},
+        {'market_cap_rank': 5, 'name': 'Solana', 'symbol': 'sol', 'current_price': 140, 'price_change_percentage_24h': 4.5, 'market_cap': 65000000000},
+        {'market_cap_rank': 6, 'name': 'XRP', 'symbol': 'xrp', 'current_price': 0.55, 'price_change_percentage_24h': -0.3, 'market_cap': 28000000000},
+        {'market_cap_rank': 7, 'name': 'Cardano', 'symbol': 'ada', 'current_price': 0.45, 'price_change_percentage_24h': 2.1, 'market_cap': 16000000000},
+        {'market_cap_rank': 8, 'name': 'Avalanche', 'symbol': 'avax', 'current_price': 35, 'price_change_percentage_24h': 6.5, 'market_cap': 14000000000},
+        {'market_cap_rank': 9, 'name': 'Dogecoin', 'symbol': 'doge', 'current_price': 0.08, 'price_change_percentage_24h': -4.2, 'market_cap': 11000000000},
+        {'market_cap_rank': 10, 'name': 'Polkadot', 'symbol': 'dot', 'current_price': 7.2, 'price_change_percentage_24h': 1.8, 'market_cap': 9500000000}
+    ]
+
+    # สร้าง DataFrame จากข้อมูลสำรอง พร้อม TIER 2 AI Signal
+    df = build_market_frame(backup_data)
+    df.attrs['fallback'] = True
+    return df
+
+
+def market_pages(top_n):
+    """จำนวนหน้าของ coins/markets ที่ต้องใช้สำหรับ Top-N"""
+    return -(-top_n // MARKETS_PER_PAGE)
+
+
+def combine_market_pages(frames, top_n):
+    """ต่อหน้าที่ได้มาตามลำดับ (หยุดที่หน้าแรกที่ยังไม่มีข้อมูล) แล้วตัดเหลือ top_n แถว - None ถ้าหน้าแรกยังไม่มี"""
+    import pandas as pd
+    ready = []
+    for frame in frames:
+        if frame is None:
+            break
+        ready.append(frame)
+    if not ready:
+        return None
+    df = pd.concat(ready, ignore_index=True).head(top_n) if len(ready) > 1 else ready[0].head(top_n)
+    df.attrs['fallback'] = False
+    return df
+
+
+def get_top_crypto(top_n=10):
+    """
+    🛡️ ตาราง Top-N ล่าสุดจาก cache (ไม่รอ refetch) พร้อม HARDCODED BACKUP ถ้ายังไม่เคยดึงสำเร็จ
+    (ถ้าใช้ข้อมูลสำรอง df.attrs['fallback'] = True)
+    ⚠️ อาจถูกเรียกจาก thread ของ fan_out - ห้ามเรียก st.* ในฟังก์ชันนี้
+    """
+    pages = get_market_caches()['markets'][:market_pages(top_n)]
+    df = combine_market_pages([cache.get().value for cache in pages], top_n)
+    if df is None:
+        return get_backup_top_10()
+    return df
+
+
+def get_top_10_crypto():
+    """ตาราง Top 10 แบบเดิม (หน้าแรกของ cache เดียวกับ Top-N)"""
+    return get_top_crypto(10)
+
+# ========================================
+# MARKET DATA CACHE (STALE-WHILE-REVALIDATE)
+# ========================================
+@st.cache_resource
+def get_market_caches():
+    """
+    ♻️ cache ของข้อมูลตลาด 1 ชุดต่อ server: คืนค่าล่าสุดทันทีเสมอ แล้วดึงใหม่เบื้องหลังเมื่อเกิน TTL
+    แต่ละ endpoint มี backoff + circuit breaker ของตัวเอง
+    💽 warm จาก ResponseCache บนดิสก์ตอนสร้าง: หลัง restart แสดงข้อมูลจริงล่าสุดได้ทันที (ไม่ใช่ข้อมูลสำรอง)
+    🗃️ หลาย replica: ResponseCache อยู่ในไฟล์กลาง + lease ต่อ endpoint -> ทั้งระบบยิง API 1 ครั้งต่อ TTL
+    """
+    persist = get_response_cache()
+    shared = get_shared_state()
+    lease = None
+    if shared is not None and persist is not None:
+        lease = lambda name: shared.acquire(f'refresh:{name}', REFRESH_LEASE)
+    return {
+        'fear_greed': SWRCache('fear_greed', fetch_fear_greed_index, ttl=600, persist=persist, lease=lease,
+                               fallback='neutral_fear_greed', decode=tuple),  # 10 นาที ประหยัด API
+        # 1 cache ต่อหน้า coins/markets: Top 10 / 250 / 1000 ใช้หน้าแรกร่วมกัน (10 นาที ป้องกัน Rate Limit)
+        # ตารางใช้ BACKUP เฉพาะตอนหน้าแรกไม่มีค่า (หน้าถัดไปขาด = ตารางสั้นลง)
+        'markets': [
+            SWRCache(f'markets_p{page}', partial(fetch_market_page, page), ttl=600, persist=persist, lease=lease,
+                     fallback='backup_top_n' if page == 1 else None,
+                     encode=market_frame_to_json, decode=market_frame_from_json)
+            for page in range(1, market_pages(max(TOP_N_OPTIONS)) + 1)
+        ],
+    }
 
 # ========================================
 # CALCULATE TECHNICAL INDICATORS
 # ========================================
 def calculate_indicators(df, col):
-    """คำนวณตัวชี้วัดทางเทคนิค"""
+    """คำนวณตัวชี้วัดทางเทคนิค (แบบ pandas ต้นฉบับ - แอปใช้ get_indicators() แทน)"""
     df = df.copy()
 
     # Moving Average (20 periods)
@@ -388,19 +922,66 @@ def calculate_indicators(df, col):
 
     return df
 
+
+# ช่วงเวลาของกราฟ -> ชั้นข้อมูล ('raw' = tick ดิบ, อื่นๆ = ราคาปิดของแท่ง OHLC)
+CHART_RANGES = {
+    '⚡ สด (tick ดิบ 24 ชม.)': 'raw',
+    '📅 7 วัน (แท่ง 1 นาที)': '1m',
+    '🗓️ 30 วัน (แท่ง 5 นาที)': '5m',
+    '📆 1 ปี (แท่ง 1 ชั่วโมง)': '1h',
+    '🏛️ 10 ปี (แท่ง 1 วัน)': '1d',
+}
+
+@st.cache_resource(max_entries=len(CHART_RANGES) * 2)
+def get_indicators(resolution, last_ts, _snapshot=None):
+    """
+    📐 คำนวณตัวชี้วัดของทุกสินทรัพย์ครั้งเดียวต่อ tick (vectorized บน price matrix)
+    cache ด้วย (ชั้นข้อมูล, timestamp ของ tick ล่าสุด) -> ทุก session ใช้ผลลัพธ์ (read-only) ชุดเดียวกัน
+    _snapshot (ไม่ใช้เป็น key): PriceSnapshot ของ tick นั้น -> ข้อมูลดิบใช้ array ชุดเดียวกับ snapshot ไม่ copy ซ้ำ
+    """
+    if resolution == 'raw':
+        if _snapshot is not None and _snapshot.last_ts == last_ts:
+            return IndicatorBatch.from_snapshot(_snapshot)
+        return IndicatorBatch.from_records(get_store().view(), PRICE_COLUMNS)
+    ts, closes = get_retention().by_name[resolution].closes()
+    return IndicatorBatch(ts, closes, PRICE_COLUMNS)
+
 # ========================================
 # CREATE PLOTLY CHART (NEON STYLE)
 # ========================================
-def create_chart(df, col, title):
-    """สร้างกราฟ Plotly แบบ Neon สไตล์เต็มรูปแบบ"""
-    df = calculate_indicators(df, col)
+CHART_WIDTH_PX = 520                  # ความกว้างโดยประมาณของกราฟ 1 คอลัมน์ (layout 3 คอลัมน์)
+CHART_MAX_POINTS = 2 * CHART_WIDTH_PX  # มากกว่า ~2 จุดต่อ pixel มองไม่เห็นความต่างแล้ว
+
+# ตัวเลือกการย่อข้อมูลกราฟ -> method ของ decimate()
+CHART_DECIMATION = {
+    '📉 ย่ออัตโนมัติ (LTTB)': 'lttb',
+    '📊 ย่อแบบ Min/Max': 'minmax',
+    '🔬 ความละเอียดเต็ม (ไม่ย่อ)': None,
+}
+
+def create_chart(ind, col, title, method='lttb', zoom=1.0, max_points=CHART_MAX_POINTS):
+    """
+    สร้างกราฟ Plotly แบบ Neon สไตล์เต็มรูปแบบ (ind = IndicatorBatch ของ tick ปัจจุบัน)
+    - zoom: สัดส่วนข้อมูลล่าสุดที่จะแสดง (1.0 = ทั้งหมด)
+    - ถ้าจุดเกิน max_points จะย่อด้วย method ('lttb' / 'minmax') ก่อนส่งไป browser
+      ใช้ index ชุดเดียวกันกับทุก trace (ราคา, MA, จุดสัญญาณ) ให้ hover ตรงกัน
+    """
+    import pandas as pd
+    import plotly.graph_objects as go
+    data = ind.asset(col)
+    n = len(ind)
+    start = n - max(2, int(np.ceil(n * zoom))) if zoom < 1 else 0
+    start = max(0, start)
+    idx = start + decimate(ind.ts[start:], data['price'][start:], max_points, method)
+    data = {k: v[idx] for k, v in data.items()}
+    x = pd.to_datetime(ind.ts[idx], unit='s') + THAI_OFFSET
 
     fig = go.Figure()
 
     # Trace 1: ราคาปัจจุบัน (เส้น Cyan/Neon Blue แบบ Solid)
     fig.add_trace(go.Scatter(
-        x=df['timestamp'],
-        y=df[col],
+        x=x,
+        y=data['price'],
         mode='lines',
         name='ราคา',
         line=dict(color='#00ffff', width=3),  # Solid Cyan/Neon Blue
@@ -409,8 +990,8 @@ def create_chart(df, col, title):
 
     # Trace 2: Moving Average (เส้นส้มแบบ Dashed)
     fig.add_trace(go.Scatter(
-        x=df['timestamp'],
-        y=df[f'{col}_MA20'],
+        x=x,
+        y=data['ma'],
         mode='lines',
         name='MA(20)',
         line=dict(color='#FFA500', width=2, dash='dash'),  # Dashed Orange
@@ -418,29 +999,30 @@ def create_chart(df, col, title):
     ))
 
     # Trace 3: สัญญาณ - Green 🟢 (Bullish) และ Red 🔴 (Bearish) DOTS
-    bullish = df[df[f'{col}_Change'] > 0]
-    bearish = df[df[f'{col}_Change'] < 0]
+    with np.errstate(invalid='ignore'):
+        bullish = data['change'] > 0
+        bearish = data['change'] < 0
 
     # Green dots (Bullish)
     fig.add_trace(go.Scatter(
-        x=bullish['timestamp'],
-        y=bullish[col],
+        x=x[bullish],
+        y=data['price'][bullish],
         mode='markers',
         name='🟢 ขาขึ้น',
         marker=dict(color='#00ff00', size=8, symbol='circle'),  # Green dots
         hovertemplate='<b>🟢 Bullish</b><br>เปลี่ยนแปลง: +%{customdata:.2f}%<extra></extra>',
-        customdata=bullish[f'{col}_Change']
+        customdata=data['change'][bullish]
     ))
 
     # Red dots (Bearish)
     fig.add_trace(go.Scatter(
-        x=bearish['timestamp'],
-        y=bearish[col],
+        x=x[bearish],
+        y=data['price'][bearish],
         mode='markers',
         name='🔴 ขาลง',
         marker=dict(color='#ff0000', size=8, symbol='circle'),  # Red dots
         hovertemplate='<b>🔴 Bearish</b><br>เปลี่ยนแปลง: %{customdata:.2f}%<extra></extra>',
-        customdata=bearish[f'{col}_Change']
+        customdata=data['change'][bearish]
     ))
 
     # Layout - Dark Theme (template='plotly_dark')
@@ -479,16 +1061,17 @@ def create_chart(df, col, title):
 # ========================================
 # ANALYZE TREND (WITH TIER 1 AI SIGNAL)
 # ========================================
-def analyze_trend(df, col):
-    """วิเคราะห์แนวโน้ม พร้อมดึง TIER 1 AI Signal"""
-    current_price = df[col].iloc[-1]
-    prev_price = df[col].iloc[-2] if len(df) > 1 else current_price
+def analyze_trend(ind, col):
+    """วิเคราะห์แนวโน้ม พร้อมดึง TIER 1 AI Signal (ind = IndicatorBatch ของ tick ปัจจุบัน)"""
+    data = ind.asset(col)
+    prices = data['price']
+    current_price = prices[-1]
+    prev_price = prices[-2] if len(prices) > 1 else current_price
     change_pct = ((current_price - prev_price) / prev_price * 100) if prev_price != 0 else 0
 
-    # คำนวณ RSI และ MA
-    df = calculate_indicators(df, col)
-    rsi = df[f'{col}_RSI'].iloc[-1] if not pd.isna(df[f'{col}_RSI'].iloc[-1]) else 50
-    ma20 = df[f'{col}_MA20'].iloc[-1] if not pd.isna(df[f'{col}_MA20'].iloc[-1]) else current_price
+    # RSI และ MA จาก batch ที่คำนวณไว้แล้ว (ไม่คำนวณซ้ำ)
+    rsi = data['rsi'][-1] if not np.isnan(data['rsi'][-1]) else 50
+    ma20 = data['ma'][-1] if not np.isnan(data['ma'][-1]) else current_price
 
     # วิเคราะห์
     trend = "🔴 ขาลง" if change_pct < 0 else "🟢 ขาขึ้น"
@@ -514,16 +1097,468 @@ def analyze_trend(df, col):
         'ai_signal_class': ai_signal_class
     }
 
+# ========================================
+# SHARED RENDER CACHE (กราฟ + กล่องวิเคราะห์ ข้าม SESSION)
+# ========================================
+@st.cache_resource
+def get_render_cache():
+    """🧊 cache ผลการวาด 1 ชุดต่อ server: ผู้ชมทุกคนที่ดูข้อมูล tick เดียวกันใช้ figure / HTML ชิ้นเดียวกัน"""
+    return RenderCache()
+
+
+def get_chart_figure(ind, resolution, last_ts, col, title, chart_options):
+    """create_chart() ครั้งเดียวต่อ (ชั้นข้อมูล, สินทรัพย์, tick ล่าสุด, ตัวเลือกกราฟ) -> CachedFigure"""
+    key = ('chart', resolution, last_ts, col, title, tuple(sorted(chart_options.items())))
+
+    def build():
+        with span('render_stage_seconds', stage='create_chart'):
+            figure = create_chart(ind, col, title, **chart_options)
+        with span('render_stage_seconds', stage='chart_json'):
+            return CachedFigure(figure)
+    return get_render_cache().get_or_build(key, build)
+
+
+def build_analysis_block(ind, col):
+    """ผล analyze_trend() ในรูปที่พร้อมวาด: ข้อความ metric + HTML กล่องสัญญาณ AI และกล่องแนวโน้ม"""
+    analysis = analyze_trend(ind, col)
+    has_price = not np.isnan(analysis['current'])   # สินทรัพย์ใหม่ที่ยังไม่เคยได้ราคา = NaN
+    return {
+        'value': f"${analysis['current']:,.2f}" if has_price else "—",
+        'delta': f"{analysis['change_pct']:.2f}%" if has_price else None,
+        'signal_html': f"""
+        <div class='ai-signal-box {analysis['ai_signal_class']}'>
+            {analysis['ai_signal_text']}
+        </div>
+        """,
+        'card_html': f"""
+        <div class='metric-card'>
+            <b>แนวโน้ม:</b> {analysis['trend']}<br>
+            <b>MA(20):</b> {analysis['ma_signal']}<br>
+            <b>RSI:</b> {analysis['rsi_signal']}
+        </div>
+        """,
+    }
+
+
+def get_analysis_block(ind, resolution, last_ts, col):
+    """กล่องวิเคราะห์ของสินทรัพย์ 1 ตัว (สร้างครั้งเดียวต่อ tick แล้วใช้ร่วมกันทุก session)"""
+    key = ('analysis', resolution, last_ts, col)
+    return get_render_cache().get_or_build(
+        key, lambda: build_analysis_block(ind, col),
+        size=lambda block: sum(len(v or '') for v in block.values()))
+
+# ========================================
+# WATCHLIST GRID (แบ่งหน้า + ตารางภาพรวม)
+# ========================================
+GRID_COLUMNS = 3        # การ์ดต่อแถว (layout เดิม 3 คอลัมน์)
+GRID_PAGE_SIZE = 6      # การ์ด + กราฟต่อหน้า
+
+WATCHLIST_OVERVIEW_CONFIG = {
+    'ราคา (USD)': st.column_config.NumberColumn(format='dollar'),
+    '% เปลี่ยนแปลง': st.column_config.NumberColumn(format='%.2f%%'),
+    'MA(20)': st.column_config.NumberColumn(format='localized'),
+    'RSI': st.column_config.NumberColumn(format='%.1f'),
+}
+
+def watchlist_pages(page_size=GRID_PAGE_SIZE):
+    """แบ่ง WATCHLIST เป็นหน้า (list ของ list ของ Asset)"""
+    return [WATCHLIST[i:i + page_size] for i in range(0, len(WATCHLIST), page_size)] or [[]]
+
+
+def build_watchlist_overview(ind):
+    """ตารางภาพรวมของทุกสินทรัพย์จากแถวล่าสุดของ IndicatorBatch (คำนวณทั้ง watchlist ทีเดียวแบบ array)"""
+    import pandas as pd
+    price = ind.prices[-1]
+    prev = ind.prices[-2] if len(ind) > 1 else price
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_pct = np.where(prev != 0, (price - prev) / prev * 100, 0.0)
+    rsi = np.where(np.isnan(ind.rsi[-1]), 50, ind.rsi[-1])
+    ma = np.where(np.isnan(ind.ma[-1]), price, ind.ma[-1])
+    return pd.DataFrame({
+        'สินทรัพย์': [f'{a.icon} {a.title}' for a in WATCHLIST],
+        'ราคา (USD)': price,
+        '% เปลี่ยนแปลง': change_pct,
+        'MA(20)': ma,
+        'RSI': rsi,
+        'สัญญาณ AI': [get_signal(p, m, r)[0] for p, m, r in zip(price, ma, rsi)],
+    })
+
+
+def get_watchlist_overview(ind, resolution, last_ts):
+    """ตารางภาพรวม 1 ชุดต่อ tick ใช้ร่วมกันทุก session"""
+    return get_render_cache().get_or_build(
+        ('overview', resolution, last_ts), lambda: build_watchlist_overview(ind),
+        size=lambda df: int(df.memory_usage(deep=True).sum()))
+
+# ========================================
+# LIVE SECTION (FRAGMENT - RERUN เฉพาะส่วนนี้)
+# ========================================
+@timed('render_stage_seconds', stage='live_section')
+def render_live_section(collector, resolution='raw', chart_options=None, assets=None):
+    """
+    ⚡ ส่วนที่เปลี่ยนทุก tick: นาฬิกา, ราคา, กล่องสัญญาณ AI และกราฟ (assets = สินทรัพย์ในหน้าปัจจุบัน)
+    main() ห่อฟังก์ชันนี้ด้วย st.fragment(run_every=...) -> browser เป็นคนนับเวลา
+    ไม่มี script thread ค้างอยู่ใน time.sleep และส่วน static ไม่ถูกวาดซ้ำ
+    """
+    chart_options = chart_options or {}
+    current_time = (datetime.now() + timedelta(hours=7)).strftime('%Y-%m-%d %H:%M:%S')
+    st.markdown(f"<div class='clock'>🕐 {current_time}</div>", unsafe_allow_html=True)
+
+    # ========== READ SHARED SNAPSHOT ==========
+    # session ไม่ดึงราคาเอง - ถือแค่ reference ของ PriceSnapshot ล่าสุดจาก collector (ไม่ copy)
+    # ไม่รอ tick แรก: หลัง restart มี snapshot จากดิสก์ให้วาดทันที ระหว่างนั้น fragment เช็กใหม่ทุก STARTUP_RETRY
+    snapshot = collector.snapshot(timeout=0)
+    was_warming = st.session_state.get('live_warming', False)
+    st.session_state['live_warming'] = collector_warming(collector)
+    if was_warming and not st.session_state['live_warming']:
+        st.rerun()   # ได้ราคาสดรอบแรกแล้ว -> rerun ทั้งหน้า 1 ครั้งเพื่อกลับไปใช้รอบอัปเดตปกติ
+    if snapshot is None or snapshot.empty:
+        st.warning('⏳ กำลังรอข้อมูลราคาชุดแรก...')
+        return
+
+    if collector.tick_count == 0:
+        st.info(f'💾 ราคาล่าสุดที่บันทึกไว้: {snapshot.last_time_text()} - กำลังดึงราคาใหม่...')
+    else:
+        st.success(f'✅ อัปเดตล่าสุด: {snapshot.last_time_text()}')
+    if collector.last_error is not None:
+        st.warning(f'⚠️ collector ผิดพลาด: {collector.last_error}')
+
+    # 📐 ตัวชี้วัดของทุกสินทรัพย์: คำนวณครั้งเดียว ใช้ร่วมกันทั้งกล่องสัญญาณและกราฟ
+    last_ts = snapshot.last_ts
+    with span('render_stage_seconds', stage='indicators'):
+        ind = get_indicators(resolution, last_ts, snapshot)
+    if len(ind) == 0:
+        st.info('⏳ ยังไม่มีแท่งข้อมูลในช่วงเวลานี้ - ลองเลือกช่วงที่สั้นลง')
+        return
+
+    # ========== MAIN CHARTS - ASSET GRID WITH TIER 1 AI ==========
+    # วาดเฉพาะสินทรัพย์ในหน้าปัจจุบัน (assets) -> เวลาวาดไม่โตตามขนาด watchlist
+    assets = assets or WATCHLIST
+    for row_start in range(0, len(assets), GRID_COLUMNS):
+        row = assets[row_start:row_start + GRID_COLUMNS]
+        for column, asset in zip(st.columns(GRID_COLUMNS), row):
+            with column:
+                st.markdown(f"### {asset.icon} {asset.title}")
+                analysis = get_analysis_block(ind, resolution, last_ts, asset.column)
+                st.metric(label="ราคาปัจจุบัน", value=analysis['value'], delta=analysis['delta'])
+
+                # 🤖 TIER 1 AI: Display AI Signal Box
+                st.markdown(analysis['signal_html'], unsafe_allow_html=True)
+                st.markdown(analysis['card_html'], unsafe_allow_html=True)
+                chart = get_chart_figure(ind, resolution, last_ts, asset.column, f'📈 {asset.title}', chart_options)
+                with span('render_stage_seconds', stage='plotly_chart'):
+                    st.plotly_chart(chart.figure, use_container_width=True)
+
+    mark_first_render('prices')
+
+    # ภาพรวมทั้ง watchlist (ตารางของ Streamlit วาดเฉพาะแถวที่มองเห็น)
+    if len(assets) < len(WATCHLIST):
+        st.markdown("#### 📋 ภาพรวมทุกสินทรัพย์ใน Watchlist")
+        st.dataframe(get_watchlist_overview(ind, resolution, last_ts), use_container_width=True, hide_index=True,
+                     column_config=WATCHLIST_OVERVIEW_CONFIG)
+
+    st.markdown("---")
+
+# ========================================
+# STREAMING MODE (SERVER PUSH: วาดครั้งเดียว แล้วต่อจุดใหม่ฝั่ง browser)
+# ========================================
+def embed_html(html, height):
+    """ฝัง HTML ใน iframe: Streamlit รุ่นใหม่ใช้ st.iframe แทน components.html ที่เลิกใช้แล้ว"""
+    if hasattr(st, 'iframe'):
+        return st.iframe(html, height=height)
+    import streamlit.components.v1 as components
+    return components.html(html, height=height)
+
+
+def stream_panel(ind, last_ts, asset, chart_options):
+    """ข้อมูลเริ่มต้นของสินทรัพย์ 1 ตัวใน grid สด: figure (JSON ที่ cache ไว้) + ค่าของการ์ด ณ tick ล่าสุด"""
+    data = ind.asset(asset.column)
+    price, ma, rsi = data['price'][-1], data['ma'][-1], data['rsi'][-1]
+    prev = data['price'][-2] if len(data['price']) > 1 else price
+    signal = get_signal(price, price if np.isnan(ma) else ma, 50 if np.isnan(rsi) else rsi) if np.isfinite(price) else (None, None)
+    chart = get_chart_figure(ind, 'raw', last_ts, asset.column, f'📈 {asset.title}', chart_options)
+    return {'col': asset.column, 'title': f'{asset.icon} {asset.title}', 'fig': chart.json,
+            'init': [price, prev, ma, rsi, *signal]}
+
+
+@timed('render_stage_seconds', stage='stream_section')
+def render_stream_section(server, snapshot, chart_options, assets):
+    """
+    📣 โหมดสตรีม: ส่งการ์ด + figure เต็มครั้งเดียวต่อ session (ไม่มี fragment rerun ตามเวลา)
+    หลังจากนั้น collector push tick ใหม่ผ่าน /stream -> browser เขียนการ์ดใหม่และต่อจุดด้วย Plotly.extendTraces
+    """
+    if snapshot is None or snapshot.empty:
+        st.warning('⏳ กำลังรอข้อมูลราคาชุดแรก...')
+        return
+    last_ts = snapshot.last_ts
+    with span('render_stage_seconds', stage='indicators'):
+        ind = get_indicators('raw', last_ts, snapshot)
+    panels = [stream_panel(ind, last_ts, asset, chart_options) for asset in assets]
+    rows = -(-len(panels) // GRID_COLUMNS)
+    embed_html(live_grid_html(panels, last_ts, server.public_url, columns=GRID_COLUMNS),
+               height=rows * LIVE_PANEL_HEIGHT + 50)
+    mark_first_render('prices')
+    st.markdown("---")
+
+# ========================================
+# MARKET SECTION (FEAR & GREED + TOP-N) - FAN-OUT + LATENCY BUDGET
+# ========================================
+MARKET_BUDGET = 3.0    # วินาที: รอ API ตลาดได้นานสุดก่อนวาดหน้า (นับจากตอนเริ่มยิง)
+MARKET_RETRY = 3       # วินาที: ถ้ายังโหลดไม่ครบ fragment จะเช็กใหม่ทุกกี่วินาที
+MARKET_REFRESH = 600   # วินาที: ตรงกับ ttl ของ cache
+
+def start_market_fetch(top_n=10):
+    """
+    ยิง Fear & Greed และทุกหน้าของ Top-N พร้อมกันบน thread pool กลาง (ผลเป็น CachedResult ที่มีอายุข้อมูล)
+    คืน (top_n, FanOut) เพื่อให้รู้ว่า prefetch ชุดนี้ครอบคลุมกี่เหรียญ
+    """
+    caches = get_market_caches()
+    calls = {'fear_greed': caches['fear_greed'].get}
+    for page, cache in enumerate(caches['markets'][:market_pages(top_n)], start=1):
+        calls[f'markets_{page}'] = cache.get
+    return top_n, fan_out(calls)
+
+
+def filter_market_frame(df, query, advice):
+    """กรองตาราง Top-N ด้วยชื่อ/สัญลักษณ์ และคำแนะนำ AI (mask ทั้ง column ทีเดียว)"""
+    mask = np.ones(len(df), dtype=bool)
+    if query:
+        mask &= (df['ชื่อ'].str.contains(query, case=False, regex=False).to_numpy()
+                 | df['สัญลักษณ์'].str.contains(query, case=False, regex=False).to_numpy())
+    if advice:
+        mask &= df['คำแนะนำ AI'].isin(advice).to_numpy()
+    return df if mask.all() else df[mask]
+
+
+def describe_market_age(result):
+    """ข้อความบอกอายุข้อมูลตลาด + สถานะ API (จาก CachedResult)"""
+    if result.value is None:
+        return "⚠️ API ล้มเหลว - ใช้ข้อมูลสำรอง"
+    minutes = int(result.age // 60)
+    text = f"🕒 ข้อมูลเมื่อ {minutes} นาทีที่แล้ว" if minutes else "🕒 ข้อมูลล่าสุด"
+    if result.state != 'closed':
+        text += " | ⛔ API ขัดข้อง - แสดงข้อมูลล่าสุดที่มี"
+    elif result.stale:
+        text += " | ♻️ กำลังอัปเดตเบื้องหลัง"
+    return text
+
+
+@timed('render_stage_seconds', stage='market_section')
+def render_market_section(top_n=10):
+    """
+    📊 Fear & Greed + Top-N: วาดเท่าที่ได้ผลภายใน MARKET_BUDGET
+    ส่วนที่ยังไม่มาจะแสดง "กำลังโหลด" แล้วถูกเติมในรอบถัดไปของ fragment
+    """
+    prefetch = st.session_state.pop('market_prefetch', None)
+    if prefetch is None or prefetch[0] != top_n:
+        prefetch = start_market_fetch(top_n)   # เปลี่ยนจำนวนเหรียญ -> ยิงชุดใหม่ (หน้าที่มีแล้วมาจาก cache)
+    fetch = prefetch[1]
+    # รอบแรกของ session ไม่รอเน็ต: วาดส่วนที่อยู่ใน cache แล้ว ที่เหลือเติมในรอบ MARKET_RETRY
+    budget = MARKET_BUDGET if st.session_state.get('market_painted') else 0.0
+    st.session_state['market_painted'] = True
+    results, pending = fetch.collect(budget)
+    if pending:
+        st.session_state['market_prefetch'] = prefetch  # รอบหน้าดึงผลจาก request เดิม ไม่ยิงซ้ำ
+
+    was_pending = st.session_state.get('market_pending', False)
+    st.session_state['market_pending'] = bool(pending)
+
+    bottom_col1, bottom_col2 = st.columns(2)
+
+    # Fear & Greed Index
+    with bottom_col1:
+        st.markdown("### 😱 Fear & Greed Index")
+        if 'fear_greed' in results:
+            fg_result = results['fear_greed']
+            fg_value, fg_class, fg_advice = fg_result.value or FEAR_GREED_FALLBACK
+            st.markdown(f"""
+            <div class='fear-greed-box'>
+                <div class='fear-greed-value'>{fg_value}</div>
+                <h3 style='color: #FFA500;'>{fg_class}</h3>
+                <p style='color: white; font-size: 1.2rem;'>{fg_advice}</p>
+            </div>
+            """, unsafe_allow_html=True)
+            st.caption(describe_market_age(fg_result))
+        else:
+            st.info('⏳ กำลังโหลด Fear & Greed Index...')
+
+    # 🤖 TIER 2 AI: Top-N Crypto Table (WITH NEW AI COLUMN + HARDCODED BACKUP)
+    with bottom_col2:
+        st.markdown(f"### 🏆 Top {top_n} สกุลเงินดิจิทัล (มูลค่าตลาด)")
+        if 'markets_1' in results:
+            first_page = results['markets_1']
+            pages = [results[f'markets_{p}'].value if f'markets_{p}' in results else None
+                     for p in range(1, market_pages(top_n) + 1)]
+            top_df = combine_market_pages(pages, top_n)
+            if top_df is None:
+                st.warning(f"⚠️ Top {top_n} API ล้มเหลว - ใช้ข้อมูลสำรอง")
+                top_df = get_backup_top_10()   # ตารางจะไม่มีวันว่าง - มี hardcoded backup เสมอ!
+
+            if len(top_df) > 10:
+                search_col, advice_col = st.columns(2)
+                query = search_col.text_input('🔎 ค้นหาชื่อ / สัญลักษณ์', key='market_query')
+                advice = advice_col.multiselect('🤖 คำแนะนำ AI', sorted(top_df['คำแนะนำ AI'].unique()), key='market_advice')
+                top_df = filter_market_frame(top_df, query.strip(), advice)
+            st.dataframe(top_df, use_container_width=True, hide_index=True,
+                         column_config=MARKET_COLUMN_CONFIG, height=420 if len(top_df) > 10 else 'auto')
+            if first_page.value is not None:
+                caption = describe_market_age(first_page)
+                if len(top_df) < top_n and pending:
+                    caption += f" | ⏳ กำลังโหลดหน้าที่เหลือ ({len(top_df)}/{top_n})"
+                st.caption(caption)
+        else:
+            st.info(f'⏳ กำลังโหลดตาราง Top {top_n}...')
+
+    # โหลดครบแล้ว -> rerun ทั้งหน้า 1 ครั้งเพื่อกลับไปใช้รอบรีเฟรชปกติ (MARKET_REFRESH)
+    if was_pending and not pending:
+        st.rerun()
+
+# ========================================
+# BACKTEST (TIER 1 / TIER 2 บนประวัติที่เก็บไว้)
+# ========================================
+BACKTEST_COLUMN_CONFIG = {
+    'asset': st.column_config.TextColumn('สินทรัพย์'),
+    'ma_window': st.column_config.NumberColumn('MA', format='%d'),
+    'buy_rsi': st.column_config.NumberColumn('RSI ซื้อ <', format='%d'),
+    'sell_rsi': st.column_config.NumberColumn('RSI ขาย >', format='%d'),
+    'change_threshold': st.column_config.NumberColumn('เกณฑ์ ±%', format='%.1f'),
+    'signals': st.column_config.NumberColumn('จำนวนสัญญาณ', format='%d'),
+    'hit_rate': st.column_config.NumberColumn('ทายถูก', format='percent'),
+    'strategy_return': st.column_config.NumberColumn('ผลตอบแทนตามสัญญาณ', format='percent'),
+    'buy_hold_return': st.column_config.NumberColumn('ซื้อแล้วถือ', format='percent'),
+    'exposure': st.column_config.NumberColumn('เวลาที่ถือสถานะ', format='percent'),
+    'trades': st.column_config.NumberColumn('เปลี่ยนสถานะ', format='%d'),
+}
+
+
+@st.cache_resource(max_entries=len(CHART_RANGES))
+def get_backtest(resolution, last_ts, _snapshot=None):
+    """🧪 กวาด grid พารามิเตอร์ของทุกสินทรัพย์ครั้งเดียวต่อ (ชั้นข้อมูล, tick) ใช้ราคาชุดเดียวกับตัวชี้วัด"""
+    ind = get_indicators(resolution, last_ts, _snapshot)
+    titles = {a.column: a.title for a in WATCHLIST}
+    from backtest import run_backtest
+    results = run_backtest(ind.ts, ind.prices, ind.columns)
+    if not results.empty:
+        results['asset'] = results['asset'].map(titles)
+    return results
+
+
+@timed('render_stage_seconds', stage='backtest_section')
+def render_backtest_section(collector, resolution):
+    """ผลย้อนหลังของสัญญาณ TIER 1 (get_signal) และ TIER 2 (% 24 ชม.) - คำนวณเมื่อผู้ใช้เปิดเท่านั้น"""
+    with st.expander("🧪 Backtest สัญญาณ AI ย้อนหลัง"):
+        if not st.toggle('▶️ คำนวณ backtest บนข้อมูลช่วงที่เลือก', key='backtest_on'):
+            st.caption('กวาดพารามิเตอร์ MA / RSI / เกณฑ์ % บนประวัติที่เก็บไว้ แล้วเลือกชุดที่ดีที่สุดของแต่ละสินทรัพย์')
+            return
+        snapshot = collector.snapshot(timeout=0)
+        if snapshot is None or snapshot.empty:
+            st.info('⏳ ยังไม่มีประวัติราคาให้ทดสอบ')
+            return
+        from backtest import best_by_asset, DEFAULT_HORIZON
+        results = get_backtest(resolution, snapshot.last_ts, snapshot)
+        if results.empty:
+            st.info('⏳ ยังไม่มีประวัติราคาให้ทดสอบ')
+            return
+        st.caption(f'ตัดสินถูก/ผิดจากทิศราคาอีก {DEFAULT_HORIZON} แถวข้างหน้า | ผลตอบแทน = ถือตามสัญญาณแถวก่อนหน้า (long / short / ไม่ถือ)')
+        for rule, title, params in (
+            ('tier1', '🤖 TIER 1: ราคา vs MA + RSI', ['ma_window', 'buy_rsi', 'sell_rsi']),
+            ('tier2', '🤖 TIER 2: % เปลี่ยนแปลง 24 ชม.', ['change_threshold']),
+        ):
+            st.markdown(f'**{title}** (พารามิเตอร์ที่ดีที่สุดต่อสินทรัพย์)')
+            best = best_by_asset(results, rule)
+            st.dataframe(best[['asset', *params, 'signals', 'hit_rate', 'strategy_return', 'buy_hold_return',
+                               'exposure', 'trades']],
+                         column_config=BACKTEST_COLUMN_CONFIG, hide_index=True, use_container_width=True)
+
+# ========================================
+# ALERTS PANEL (กฎแจ้งเตือนของแต่ละผู้ใช้)
+# ========================================
+def render_alert_panel(alerts):
+    """การแจ้งเตือนล่าสุด + เพิ่ม / ลบกฎของผู้ใช้ (กฎถูกประเมินโดย collector ไม่ใช่ที่หน้านี้)"""
+    with st.sidebar.expander('🔔 การแจ้งเตือน'):
+        recent = list(alerts.recent)[-10:][::-1]
+        for event in recent:
+            st.caption(f"{event['time']} · {event['owner']} · {event['message']}")
+        if not recent:
+            st.caption('ยังไม่มีการแจ้งเตือน')
+
+        owner = st.text_input('👤 ชื่อผู้ใช้', value='default', key='alert_owner')
+        with st.form('alert_rule_form', clear_on_submit=False):
+            symbol = st.selectbox('สินทรัพย์', [a.symbol for a in WATCHLIST])
+            kind = st.selectbox('เงื่อนไข', list(RULE_KINDS), format_func=RULE_KINDS.get)
+            threshold = st.number_input('ระดับ RSI (เฉพาะ RSI ตัดระดับ)', min_value=0.0, max_value=100.0, value=70.0, step=1.0)
+            direction = st.selectbox('ทิศทาง', list(DIRECTIONS), format_func=DIRECTIONS.get)
+            if st.form_submit_button('➕ เพิ่มกฎ'):
+                add_alert_rule(alerts, AlertRule(owner, symbol, kind, threshold if kind == 'rsi_cross' else None, direction))
+
+        mine = {r.rule_id: r for r in alerts.rules(owner)}
+        if mine:
+            rule_id = st.selectbox(f'กฎของ {owner} ({len(mine)} ข้อ)', list(mine), format_func=lambda r: mine[r].describe())
+            if st.button('🗑️ ลบกฎนี้'):
+                remove_alert_rule(alerts, rule_id)
+                st.rerun()
+
+
+def add_alert_rule(alerts, rule):
+    alerts.add(rule)
+    shared = get_shared_state()
+    if shared is None:
+        persist_alert_rules(alerts)
+        return
+    try:
+        shared.save_rule(rule.to_dict())   # leader (อาจเป็น replica อื่น) โหลดกฎนี้ใน tick ถัดไป
+    except Exception as e:
+        st.warning(f'⚠️ บันทึกกฎแจ้งเตือนลงไฟล์กลางไม่ได้: {e}')
+
+
+def remove_alert_rule(alerts, rule_id):
+    alerts.remove(rule_id)
+    shared = get_shared_state()
+    if shared is None:
+        persist_alert_rules(alerts)
+        return
+    try:
+        shared.delete_rule(rule_id)
+    except Exception as e:
+        st.warning(f'⚠️ ลบกฎแจ้งเตือนในไฟล์กลางไม่ได้: {e}')
+
+
+def persist_alert_rules(alerts):
+    try:
+        save_rules(alerts.rules())
+    except OSError as e:
+        st.warning(f'⚠️ บันทึกกฎแจ้งเตือนไม่ได้: {e}')
+
+# ========================================
+# MEMORY REPORT (ใช้ร่วมทั้ง process vs ต่อ session)
+# ========================================
+def memory_report(snapshot):
+    """ขนาดข้อมูลที่แชร์ทั้ง process (snapshot, ตัวชี้วัด, render cache) เทียบกับข้อมูลของ session นี้"""
+    report = {
+        'snapshot': 0,
+        'indicators': 0,
+        'render_cache': get_render_cache().bytes,
+        'session': shallow_size(st.session_state),
+        'rss': process_rss_bytes(),
+    }
+    if snapshot is not None and not snapshot.empty:
+        report['snapshot'] = snapshot.nbytes
+        report['indicators'] = get_indicators('raw', snapshot.last_ts, snapshot).nbytes
+    return report
+
 # ========================================
 # MAIN APP
 # ========================================
 def main():
-    # ========== HEADER WITH CLOCK ==========
-    current_time = (datetime.now() + timedelta(hours=7)).strftime('%Y-%m-%d %H:%M:%S')
+    if 'first_render' not in st.session_state:
+        st.session_state['first_render'] = {'started': RUN_STARTED}   # รอบแรกของ session นี้
+    get_startup_profile()
+
+    # ========== HEADER ==========
     st.markdown(f"<h1 style='text-align: center;'>📈 กระดานวิเคราะห์ราคา</h1>", unsafe_allow_html=True)
-    st.markdown(f"<div class='clock'>🕐 {current_time}</div>", unsafe_allow_html=True)
     st.markdown("<p style='text-align: center; color: #888;'>ข้อมูลเรียลไทม์จาก CoinGecko API 🚀 | พร้อม AI Decision Support 🤖</p>", unsafe_allow_html=True)
     st.markdown("---")
+    mark_first_render('header')
 
     # ========== SIDEBAR - NEWS + AUTO REFRESH ==========
     st.sidebar.markdown("<h2 style='color: #00ffff; text-shadow: 0 0 10px #00ffff;'>📰 ข่าวสารคริปโต</h2>", unsafe_allow_html=True)
@@ -543,130 +1578,125 @@ def main():
     st.sidebar.markdown("---")
 
     # ✨ ปุ่มล้างข้อมูลกราฟ (เพิ่มตรงนี้)
+    store = get_store()
+    collector = get_collector()
+    backfiller = get_backfiller()
+    registry = get_metrics_registry()
     if st.sidebar.button('🗑️ ล้างข้อมูลกราฟ (Reset Data)'):
-        if os.path.exists('crypto_prices.csv'):
-            os.remove('crypto_prices.csv')
-            st.rerun()
+        collector.reset(lambda: reset_all_data(store, get_retention(), get_tick_feed(), get_alert_engine(),
+                                               get_shared_state()))
+        if is_leader():
+            backfiller.start()   # เริ่มใหม่พร้อมประวัติย้อนหลัง ไม่ต้องรอ 20 tick ให้ MA/RSI มีค่า
+        st.rerun()
+
+    # 💾 Export CSV แบบเดิม (สร้างไฟล์ตอนกดเท่านั้น)
+    st.sidebar.download_button('⬇️ ดาวน์โหลดข้อมูล (CSV)', data=store.export_csv,
+                               file_name=CSV_FILE, mime='text/csv')
 
     # Auto Refresh Settings
     st.sidebar.markdown("### ⚙️ การตั้งค่า")
     auto_refresh = st.sidebar.checkbox('🔄 อัปเดตอัตโนมัติ', value=True)
     refresh_interval = st.sidebar.slider('⏱️ ช่วงเวลาอัปเดต (วินาที)', min_value=30, max_value=300, value=60, step=30)
+    chart_range = st.sidebar.selectbox('📊 ช่วงเวลาของกราฟ', list(CHART_RANGES))
+    chart_decimation = st.sidebar.selectbox('🔍 ความละเอียดกราฟ', list(CHART_DECIMATION))
+    chart_zoom = st.sidebar.select_slider('🔎 ซูมข้อมูลล่าสุด (%)', options=[100, 50, 25, 10, 5], value=100)
+    chart_options = {'method': CHART_DECIMATION[chart_decimation], 'zoom': chart_zoom / 100}
+    top_n = st.sidebar.select_slider('🏆 จำนวนเหรียญในตาราง Top', options=TOP_N_OPTIONS, value=10)
+    streaming = st.sidebar.checkbox('📣 โหมดสตรีม (server push ทุก tick)', value=False,
+                                    help='server ส่งราคาใหม่ทันทีที่ collector ได้ราคา ไม่ต้องรอรอบอัปเดต / rerun ทั้งหน้า '
+                                         '(ใช้กับข้อมูลสดเท่านั้น)')
+    pages = watchlist_pages()
+    page = 1
+    if len(pages) > 1:
+        page = st.sidebar.number_input(f'📋 หน้า Watchlist (ทั้งหมด {len(pages)} หน้า / {len(WATCHLIST)} สินทรัพย์)',
+                                       min_value=1, max_value=len(pages), value=1, step=1)
+    page_assets = pages[page - 1]
+
+    alerts = get_alert_engine()
+    render_alert_panel(alerts)
 
     st.sidebar.markdown("---")
     st.sidebar.markdown("### 📌 สถานะ")
-    status_placeholder = st.sidebar.empty()
-
-    # ========== UPDATE DATA ==========
-    df = update_data()
-    status_placeholder.success(f'✅ อัปเดตล่าสุด: {df["timestamp"].iloc[-1]}')
-
-    # ========== MAIN CHARTS - 3 COLUMNS WITH TIER 1 AI ==========
-    col1, col2, col3 = st.columns(3)
-
-    # Bitcoin Column
-    with col1:
-        st.markdown("### 🟠 Bitcoin (BTC)")
-        btc_analysis = analyze_trend(df, 'BTC_price')
-        st.metric(
-            label="ราคาปัจจุบัน",
-            value=f"${btc_analysis['current']:,.2f}",
-            delta=f"{btc_analysis['change_pct']:.2f}%"
-        )
-
-        # 🤖 TIER 1 AI: Display AI Signal Box
-        st.markdown(f"""
-        <div class='ai-signal-box {btc_analysis['ai_signal_class']}'>
-            {btc_analysis['ai_signal_text']}
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown(f"""
-        <div class='metric-card'>
-            <b>แนวโน้ม:</b> {btc_analysis['trend']}<br>
-            <b>MA(20):</b> {btc_analysis['ma_signal']}<br>
-            <b>RSI:</b> {btc_analysis['rsi_signal']}
-        </div>
-        """, unsafe_allow_html=True)
-        st.plotly_chart(create_chart(df, 'BTC_price', '📈 Bitcoin (BTC)'), use_container_width=True)
-
-    # Ethereum Column
-    with col2:
-        st.markdown("### 🔵 Ethereum (ETH)")
-        eth_analysis = analyze_trend(df, 'ETH_price')
-        st.metric(
-            label="ราคาปัจจุบัน",
-            value=f"${eth_analysis['current']:,.2f}",
-            delta=f"{eth_analysis['change_pct']:.2f}%"
-        )
-
-        # 🤖 TIER 1 AI: Display AI Signal Box
-        st.markdown(f"""
-        <div class='ai-signal-box {eth_analysis['ai_signal_class']}'>
-            {eth_analysis['ai_signal_text']}
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown(f"""
-        <div class='metric-card'>
-            <b>แนวโน้ม:</b> {eth_analysis['trend']}<br>
-            <b>MA(20):</b> {eth_analysis['ma_signal']}<br>
-            <b>RSI:</b> {eth_analysis['rsi_signal']}
-        </div>
-        """, unsafe_allow_html=True)
-        st.plotly_chart(create_chart(df, 'ETH_price', '📈 Ethereum (ETH)'), use_container_width=True)
-
-    # Gold Column
-    with col3:
-        st.markdown("### 🟡 ทองคำ (Gold)")
-        gold_analysis = analyze_trend(df, 'Gold_price')
-        st.metric(
-            label="ราคาปัจจุบัน",
-            value=f"${gold_analysis['current']:,.2f}",
-            delta=f"{gold_analysis['change_pct']:.2f}%"
-        )
-
-        # 🤖 TIER 1 AI: Display AI Signal Box
-        st.markdown(f"""
-        <div class='ai-signal-box {gold_analysis['ai_signal_class']}'>
-            {gold_analysis['ai_signal_text']}
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown(f"""
-        <div class='metric-card'>
-            <b>แนวโน้ม:</b> {gold_analysis['trend']}<br>
-            <b>MA(20):</b> {gold_analysis['ma_signal']}<br>
-            <b>RSI:</b> {gold_analysis['rsi_signal']}
-        </div>
-        """, unsafe_allow_html=True)
-        st.plotly_chart(create_chart(df, 'Gold_price', '📈 ทองคำ (Gold)'), use_container_width=True)
-
-    st.markdown("---")
+    shared = get_shared_state()
+    if shared is None:
+        st.sidebar.caption(f'🛰️ collector ดึงราคาทุก {COLLECT_INTERVAL} วินาที (ใช้ร่วมกันทุกผู้ชม)')
+    elif is_leader():
+        st.sidebar.caption(f'👑 replica {REPLICA_ID}: leader ดึงราคาทุก {COLLECT_INTERVAL} วินาที '
+                           f'แล้วเขียนลงไฟล์กลางให้ทุก replica')
+    else:
+        st.sidebar.caption(f'🗃️ replica {REPLICA_ID}: follower อ่านราคาจากไฟล์กลางทุก {FOLLOW_INTERVAL:g} วินาที '
+                           f'(leader: {shared.holder(get_leader_lease().name) or "กำลังเลือกใหม่"})')
+    st.sidebar.caption(f"🔔 กฎแจ้งเตือน {len(alerts)} ข้อ | แจ้งแล้ว {alerts.metrics['fired']} ครั้ง | ประเมินแล้ว {alerts.metrics['ticks']} tick")
+    cg = get_coingecko_scheduler().metrics
+    st.sidebar.caption(f"🚦 CoinGecko: ยิง {cg['requests']} | รวม request ซ้ำ {cg['coalesced']} | "
+                       f"รอคิว {cg['throttled']} | หมดเวลาในคิว {cg['expired']} | โดน 429 {cg['rate_limited']} ครั้ง")
+    for name, ps in get_price_router().stats().items():
+        latency = f"p50 {ps['p50']:.2f}s / p95 {ps['p95']:.2f}s" if ps['requests'] > ps['errors'] else 'ยังไม่มีสถิติ'
+        st.sidebar.caption(f"🛣️ {name}: {latency} | ยิง {ps['requests']} | error {ps['errors']} | "
+                           f"ยิงสำรอง {ps['hedged']} | ได้ราคาก่อน {ps['wins']} | จาก cache {ps['cached']}")
+    rc = get_render_cache()
+    st.sidebar.caption(f"🧊 render cache: ใช้ซ้ำ {rc.metrics['hits']} | สร้างใหม่ {rc.metrics['misses']} | "
+                       f"{len(rc)} ชิ้น")
+    if backfiller.state == 'running':
+        st.sidebar.caption('🕰️ กำลังเติมประวัติย้อนหลังเบื้องหลัง...')
+    elif backfiller.state == 'done':
+        skipped = f' | ข้าม {backfiller.skipped} สินทรัพย์ท้าย watchlist' if backfiller.skipped else ''
+        failed = f' | ไม่สำเร็จ: {", ".join(backfiller.errors)}' if backfiller.errors else ''
+        st.sidebar.caption(f'🕰️ เติมประวัติย้อนหลังแล้ว {backfiller.rows_added} แถว{skipped}{failed}')
+    elif backfiller.state == 'failed':
+        st.sidebar.caption(f'⚠️ เติมประวัติย้อนหลังไม่สำเร็จ: {", ".join(backfiller.errors)}')
+    disk = get_response_cache()
+    if disk is not None:
+        entries, size = disk.size()
+        st.sidebar.caption(f"💽 disk cache: {entries} รายการ {format_bytes(size)} | อ่านเจอ {disk.metrics['hits']} | "
+                           f"บันทึก {disk.metrics['writes']}")
+
+    # 🚀 เริ่มยิง API ตลาดตั้งแต่ตอนนี้ ให้ทำงานขนานกับการรอราคาชุดแรกของ collector
+    if 'market_prefetch' not in st.session_state:
+        st.session_state['market_prefetch'] = start_market_fetch(top_n)
+
+    # ========== LIVE SECTION (CLOCK + MAIN CHARTS) ==========
+    resolution = CHART_RANGES[chart_range]
+    live_server = get_live_server() if streaming and resolution == 'raw' else None
+    if registry.enabled:
+        get_live_server()   # /metrics ต้องพร้อมให้ scrape เสมอ ไม่ใช่เฉพาะตอนเปิดโหมดสตรีม
+    if live_server is not None and not live_server.running:
+        st.sidebar.warning(f'⚠️ เปิด live server ไม่ได้: {live_server.error}')
+        live_server = None
+    if live_server is not None:
+        # เปิดผ่าน network แต่ live server ตั้งค่าไว้สำหรับเครื่องนี้ -> browser ต่อ /stream ไม่ได้ ใช้โหมดรีเฟรชแทน
+        unreachable = live_server.unreachable_reason(page_host())
+        if unreachable:
+            st.sidebar.warning(f'⚠️ โหมดสตรีมใช้ไม่ได้: {unreachable}')
+            live_server = None
+    snapshot = collector.snapshot(timeout=0)
+    if live_server is not None and snapshot is not None and not snapshot.empty:
+        # 📣 server push: ไม่มี rerun ตามเวลาเลย ราคาใหม่มาถึง browser ทันทีที่ collector ได้ราคา
+        render_stream_section(live_server, snapshot, chart_options, page_assets)
+    else:
+        # รีเฟรชเฉพาะ fragment นี้ตามเวลาที่ตั้งไว้ ส่วนอื่นวาดครั้งเดียวต่อ session
+        # (ระหว่างรอราคาสดรอบแรกหลังเปิด server เช็กถี่กว่าปกติ)
+        run_every = STARTUP_RETRY if collector_warming(collector) else refresh_interval if auto_refresh else None
+        live_section = st.fragment(run_every=run_every)(render_live_section)
+        live_section(collector, resolution, chart_options, assets=page_assets)
 
     # ========== BOTTOM SECTION ==========
     st.markdown("<h2 style='text-align: center; color: #00ffff;'>📊 ข้อมูลเพิ่มเติม</h2>", unsafe_allow_html=True)
 
-    bottom_col1, bottom_col2 = st.columns(2)
+    # ถ้ารอบก่อนยังโหลดไม่ครบ ให้ fragment เช็กใหม่ถี่ๆ จนกว่าข้อมูลจะมา
+    market_pending = st.session_state.get('market_pending', False)
+    market_section = st.fragment(run_every=MARKET_RETRY if market_pending else MARKET_REFRESH)(render_market_section)
+    market_section(top_n)
 
-    # Fear & Greed Index
-    with bottom_col1:
-        st.markdown("### 😱 Fear & Greed Index")
-        fg_value, fg_class, fg_advice = get_fear_greed_index()
-        st.markdown(f"""
-        <div class='fear-greed-box'>
-            <div class='fear-greed-value'>{fg_value}</div>
-            <h3 style='color: #FFA500;'>{fg_class}</h3>
-            <p style='color: white; font-size: 1.2rem;'>{fg_advice}</p>
-        </div>
-        """, unsafe_allow_html=True)
+    render_backtest_section(collector, resolution)
 
-    # 🤖 TIER 2 AI: Top 10 Crypto Table (WITH NEW AI COLUMN + HARDCODED BACKUP)
-    with bottom_col2:
-        st.markdown("### 🏆 Top 10 สกุลเงินดิจิทัล (มูลค่าตลาด)")
-        top10_df = get_top_10_crypto()
-        # ตารางจะไม่มีวันว่าง - มี hardcoded backup เสมอ!
-        st.dataframe(top10_df, use_container_width=True, hide_index=True)
+    # 🧠 หน่วยความจำ: ประวัติราคามีชุดเดียวต่อ process ทุก session ถือแค่ reference
+    mem = memory_report(collector.snapshot(timeout=0))
+    st.sidebar.caption(f"🧠 หน่วยความจำ: snapshot {format_bytes(mem['snapshot'])} | ตัวชี้วัด {format_bytes(mem['indicators'])} | "
+                       f"render cache {format_bytes(mem['render_cache'])} | ต่อ session {format_bytes(mem['session'])} | "
+                       f"process {format_bytes(mem['rss'])}")
+    render_debug_panel(registry)
+    mark_first_render('script')
 
     st.markdown("---")
 
@@ -711,13 +1741,15 @@ def main():
         - ✅ เปิด **อัปเดตอัตโนมัติ** เพื่อรับข้อมูล Real-time
         - ⏱️ ปรับ **ช่วงเวลาอัปเดต** ตามที่ต้องการ (30-300 วินาที)
         - 📰 คลิกลิงก์ **ข่าวสาร** ด้านข้างเพื่ออ่านข่าวคริปโต
-        - 🗑️ **ปุ่มล้างข้อมูลกราฟ (Reset)**: ใช้แก้ปัญหากราฟแบน หรือต้องการเริ่มเก็บข้อมูลใหม่
+        - 🗑️ **ปุ่มล้างข้อมูลกราฟ (Reset)**: เริ่มเก็บข้อมูลใหม่ พร้อมเติมประวัติย้อนหลัง 24 ชม. ให้อัตโนมัติ (ไม่มีกราฟแบน)
+        - 📣 **โหมดสตรีม**: server ส่งราคาใหม่ถึงหน้าเว็บทันทีทุก tick (ไม่ต้องรอช่วงเวลาอัปเดต) ใช้กับช่วงข้อมูลสด 24 ชม.
+        - 📋 **Watchlist**: เพิ่ม/ลดสินทรัพย์ได้ที่ไฟล์ `watchlist.json` (ดูตัวอย่างใน `watchlist.example.json`) ดึงราคาทุกตัวด้วย request เดียว
 
         **7. แหล่งข้อมูล**
-        - ราคา BTC/ETH: CoinGecko API (Free, Real-time)
-        - ราคาทองคำ: จำลองข้อมูล (ฐาน $2,600)
+        - ราคา BTC/ETH: CoinGecko API (Free, Real-time) สำรองด้วย Binance
+        - ราคาทองคำ: PAX Gold (1 PAXG = ทอง 1 ออนซ์) จาก CoinGecko `pax-gold` สำรองด้วย Binance `PAXGUSDT`
         - Fear & Greed: Alternative.me API
-        - Top 10: CoinGecko Market Data
+        - Top-N (10-1000 เหรียญ): CoinGecko Market Data
 
         **⚠️ คำเตือน**
         - ข้อมูลนี้ใช้เพื่อการศึกษาและการวิเคราะห์เท่านั้น
@@ -730,19 +1762,15 @@ def main():
         **🆕 ฟีเจอร์ใหม่:**
         - 🤖 **TIER 1 AI**: สัญญาณการลงทุนอัจฉริยะบนกราฟหลัก (BTC/ETH/Gold)
         - 🤖 **TIER 2 AI**: คำแนะนำการลงทุนใน Top 10 Table แบบเรียลไทม์
-        - ♻️ **Auto-Reset**: รีเซ็ตกราฟอัตโนมัติเมื่อข้อมูลเก่ากว่า 1 ชั่วโมง
+        - 🗄️ **Tiered Retention**: เก็บ tick ดิบ 24 ชม. + แท่ง OHLC 1m/5m/1h/1d ย้อนหลังได้ถึง 10 ปี
         - 🗑️ **Manual Reset**: ปุ่มล้างกราฟด้วยตัวเองใน Sidebar
         - 🛡️ **Error Recovery**: จัดการข้อผิดพลาด API อย่างชาญฉลาด
         - 🔒 **Hardcoded Backup**: ตาราง Top 10 ไม่มีวันว่างเปล่า!
         """)
 
-    # ========== AUTO REFRESH LOGIC ==========
-    if auto_refresh:
-        time.sleep(refresh_interval)
-        st.rerun()
-
 # ========================================
 # RUN
 # ========================================
 if __name__ == "__main__":
-    main()
+    with span('render_stage_seconds', stage='script'):
+        main()
@@ -0,0 +1,77 @@
+# ========================================
+# CHART DOWNSAMPLING (LTTB / MIN-MAX PER BUCKET)
+# ========================================
+import numpy as np
+
+
+def _endpoints(n, n_out):
+    """จุดแรก / สุดท้ายเท่าที่ n_out ยอม (เป้าหมายเล็กเกินกว่าจะเลือกจุดตามรูปร่างได้)"""
+    return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    📉 Largest-Triangle-Three-Buckets: เลือก n_out จุดที่รักษารูปร่างกราฟไว้มากที่สุด
+    คืน index (เรียงจากน้อยไปมาก) เพื่อใช้ตัด trace อื่นที่แกน x เดียวกันได้ด้วย
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return _endpoints(n, n_out)
+
+    x = np.asarray(x, dtype='f8')
+    y = np.asarray(y, dtype='f8')
+    # แบ่งจุดกลาง (ไม่รวมจุดแรก/สุดท้าย) เป็น n_out - 2 bucket
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # จุดอ้างอิงฝั่งขวา = ค่าเฉลี่ยของ bucket ถัดไป (หรือจุดสุดท้าย)
+        if i + 2 < len(edges):
+            nlo, nhi = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            segment = y[nlo:nhi]
+            cx = x[nlo:nhi].mean()
+            cy = np.nanmean(segment) if np.isfinite(segment).any() else y[a]
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        area = np.where(np.isnan(area), -1.0, area)
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, n_out):
+    """
+    📊 Min/Max ต่อ bucket: แต่ละ bucket เก็บจุดต่ำสุดและสูงสุด (ไม่พลาด spike)
+    ได้ไม่เกิน n_out จุด เรียง index จากน้อยไปมาก
+    """
+    n = len(y)
+    buckets = (n_out - 2) // 2   # 2 จุดต่อ bucket + จุดแรก/สุดท้าย
+    if n <= n_out:
+        return np.arange(n)
+    if buckets < 1:
+        return _endpoints(n, n_out)
+
+    y = np.asarray(y, dtype='f8')
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    # NaN ไม่ควรถูกเลือกเป็น min/max: แทนด้วย +inf / -inf ตามลำดับ
+    low = np.where(np.isnan(y), np.inf, y)
+    high = np.where(np.isnan(y), -np.inf, y)
+    mins = np.array([s + np.argmin(low[s:e]) for s, e in zip(edges[:-1], edges[1:])])
+    maxs = np.array([s + np.argmax(high[s:e]) for s, e in zip(edges[:-1], edges[1:])])
+    return np.unique(np.concatenate([[0, n - 1], mins, maxs]))
+
+
+def decimate(x, y, max_points, method='lttb'):
+    """เลือก index ที่จะส่งไปกราฟ: 'lttb', 'minmax' หรือ None (ความละเอียดเต็ม)"""
+    if method is None or max_points is None or len(y) <= max_points:
+        return np.arange(len(y))
+    if method == 'minmax':
+        return minmax_indices(y, max_points)
+    return lttb_indices(x, y, max_points)
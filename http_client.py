@@ -0,0 +1,77 @@
+# ========================================
+# HTTP LAYER (POOLED SESSION + CONCURRENT FAN-OUT)
+# ========================================
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+HTTP_POOL_SIZE = 16      # keep-alive connections ต่อ host
+FANOUT_WORKERS = 8
+
+_session = None
+_session_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='http-fanout')
+
+
+def get_session():
+    """
+    🔌 requests.Session ตัวเดียวต่อ process: ใช้ TCP+TLS connection ซ้ำ (keep-alive)
+    แทนการเปิด connection ใหม่ทุกครั้งแบบ requests.get เปล่าๆ
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # import ตอนยิงครั้งแรก (thread ของ collector) ไม่ใช่ตอนเปิดหน้าแรก
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'Accept': 'application/json'})
+                _session = session
+    return _session
+
+
+def http_get(url, timeout=10, **kwargs):
+    """GET ผ่าน session กลาง (คืน Response แบบเดียวกับ requests.get)"""
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+class FanOut:
+    """
+    🚀 ยิงหลายงานพร้อมกันบน thread pool กลาง แล้วรอผลภายใน latency budget
+    งานที่ยังไม่เสร็จจะถูกข้ามไปก่อน (เก็บ future ไว้ให้ดึงผลรอบถัดไปได้)
+    """
+
+    def __init__(self, calls):
+        self.started_at = time.monotonic()
+        self.futures = {name: _executor.submit(fn) for name, fn in calls.items()}
+
+    def collect(self, budget):
+        """
+        รอจนครบ budget วินาที (นับจากตอนเริ่มยิง) คืน (results, pending)
+        - results: dict ชื่อ -> ผลลัพธ์ ของงานที่เสร็จแล้ว (งานที่ error จะไม่อยู่ในนี้)
+        - pending: set ชื่อของงานที่ยังไม่เสร็จ
+        """
+        remaining = max(0.0, budget - (time.monotonic() - self.started_at))
+        wait(self.futures.values(), timeout=remaining)
+
+        results, pending = {}, set()
+        for name, future in self.futures.items():
+            if not future.done():
+                pending.add(name)
+            elif future.exception() is None:
+                results[name] = future.result()
+        return results, pending
+
+
+def fan_out(calls):
+    """เริ่มยิงงานทั้งหมดพร้อมกัน (calls: dict ชื่อ -> ฟังก์ชันไม่มี argument)"""
+    return FanOut(calls)
+
+
+def submit(fn, *args):
+    """ส่งงานเบื้องหลังเข้า thread pool กลาง (คืน Future)"""
+    return _executor.submit(fn, *args)
@@ -0,0 +1,243 @@
+# ========================================
+# INCREMENTAL INDICATOR ENGINE (O(1) PER TICK)
+# ========================================
+import math
+from collections import deque
+
+import numpy as np
+
+MA_WINDOW = 20
+RSI_WINDOW = 14
+
+
+class RollingMean:
+    """
+    ค่าเฉลี่ยเคลื่อนที่แบบ running sum (เทียบเท่า pandas rolling(window).mean())
+    - O(1) ต่อค่าใหม่, รวมผลใหม่ทั้งหน้าต่างทุก `window` ครั้งเพื่อกัน floating-point drift
+    - นับ NaN และค่าที่ไม่ใช่ 0 ในหน้าต่าง: หน้าต่างที่เป็น 0 ล้วนให้ 0 เป๊ะแบบ pandas
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.nan_count = 0
+        self.nonzero_count = 0
+        self._since_resum = 0
+
+    def push(self, value):
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if math.isnan(old):
+                self.nan_count -= 1
+            else:
+                self.total -= old
+                if old != 0:
+                    self.nonzero_count -= 1
+        self.values.append(value)
+        if math.isnan(value):
+            self.nan_count += 1
+        else:
+            self.total += value
+            if value != 0:
+                self.nonzero_count += 1
+
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            self.total = math.fsum(v for v in self.values if not math.isnan(v))
+            self._since_resum = 0
+        return self.mean()
+
+    def mean(self):
+        if len(self.values) < self.window or self.nan_count:
+            return math.nan
+        if self.nonzero_count == 0:
+            return 0.0
+        return self.total / self.window
+
+
+class AssetIndicators:
+    """สถานะตัวชี้วัดของสินทรัพย์ 1 ตัว: MA, RSI (SMA ของ gain/loss แบบเดียวกับของเดิม), % Change"""
+
+    def __init__(self, ma_window=MA_WINDOW, rsi_window=RSI_WINDOW):
+        self.ma = RollingMean(ma_window)
+        self.gain = RollingMean(rsi_window)
+        self.loss = RollingMean(rsi_window)
+        self.prev_price = None
+
+    def update(self, price):
+        """ใส่ราคาใหม่ 1 ค่า คืน (ma, rsi, change_pct)"""
+        price = float(price)
+        ma = self.ma.push(price)
+
+        if self.prev_price is None:
+            delta = math.nan
+            change = math.nan
+        else:
+            delta = price - self.prev_price
+            change = (price / self.prev_price - 1) * 100 if self.prev_price != 0 else math.nan
+        # เหมือน delta.where(delta > 0, 0): NaN -> 0
+        gain = self.gain.push(delta if delta > 0 else 0.0)
+        loss = self.loss.push(-delta if delta < 0 else 0.0)
+        self.prev_price = price
+
+        if math.isnan(gain) or math.isnan(loss) or (gain == 0 and loss == 0):
+            rsi = math.nan
+        elif loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - (100 / (1 + gain / loss))
+        return ma, rsi, change
+
+
+class IndicatorEngine:
+    """
+    📐 ตัวชี้วัดแบบ stateful สำหรับทุกสินทรัพย์: อัปเดต O(1) ต่อ tick
+    เก็บประวัติผลลัพธ์ไว้ไม่เกิน `capacity` แถว (เท่ากับ PriceStore) เพื่อให้กราฟใช้ต่อได้
+    """
+
+    def __init__(self, columns, capacity=1000, ma_window=MA_WINDOW, rsi_window=RSI_WINDOW):
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.ma_window = ma_window
+        self.rsi_window = rsi_window
+        self.reset()
+
+    def reset(self):
+        self.state = {c: AssetIndicators(self.ma_window, self.rsi_window) for c in self.columns}
+        self.history = {
+            c: {k: deque(maxlen=self.capacity) for k in ('MA20', 'RSI', 'Change')}
+            for c in self.columns
+        }
+        self.last_ts = None
+        self.count = 0
+
+    def update(self, ts, prices):
+        """ใส่ราคาใหม่ 1 แถว (prices: dict ชื่อ column -> ราคา)"""
+        latest = {}
+        for c in self.columns:
+            ma, rsi, change = self.state[c].update(prices[c])
+            h = self.history[c]
+            h['MA20'].append(ma)
+            h['RSI'].append(rsi)
+            h['Change'].append(change)
+            latest[c] = {'MA20': ma, 'RSI': rsi, 'Change': change}
+        self.last_ts = int(ts)
+        self.count += 1
+        return latest
+
+    def rebuild(self, records):
+        """สร้างสถานะใหม่จากประวัติทั้งหมด (ตอนเริ่ม server หรือหลัง reset)"""
+        self.reset()
+        for row in records:
+            self.update(row['ts'], {c: row[c] for c in self.columns})
+
+    def sync(self, records):
+        """
+        ให้ engine ตามทัน store: ปกติเพิ่มแค่แถวล่าสุด (O(1))
+        ถ้าข้อมูลไม่ต่อเนื่อง (reset / เริ่มใหม่) ค่อย rebuild ทั้งหมด
+        """
+        n = len(records)
+        if n == 0:
+            self.reset()
+        elif self.last_ts is not None and int(records['ts'][-1]) == self.last_ts:
+            pass
+        elif n > 1 and self.last_ts is not None and int(records['ts'][-2]) == self.last_ts:
+            row = records[-1]
+            self.update(row['ts'], {c: row[c] for c in self.columns})
+        else:
+            self.rebuild(records)
+
+    def latest(self, col):
+        """ค่าล่าสุดของสินทรัพย์ (dict MA20/RSI/Change)"""
+        h = self.history[col]
+        if not h['MA20']:
+            return {'MA20': math.nan, 'RSI': math.nan, 'Change': math.nan}
+        return {k: h[k][-1] for k in h}
+
+    def series(self, col, n=None):
+        """ประวัติผลลัพธ์เป็น numpy array (ล่าสุด n แถว)"""
+        n = self.capacity if n is None else n
+        out = {}
+        for k, values in self.history[col].items():
+            arr = np.fromiter(values, dtype='f8', count=len(values))
+            out[k] = arr[-n:] if n else arr[:0]
+        return out
+
+
+# ========================================
+# BATCHED INDICATOR STAGE (ทุกสินทรัพย์พร้อมกัน)
+# ========================================
+def rolling_mean(values, window):
+    """rolling mean ตามแกนเวลา (axis 0) ของ matrix 2 มิติ - NaN ในหน้าต่างให้ผล NaN แบบ pandas"""
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+        out[window - 1:] = windows.sum(axis=-1) / window
+    return out
+
+
+def compute_indicators(prices, ma_window=MA_WINDOW, rsi_window=RSI_WINDOW):
+    """
+    คำนวณ MA / RSI / % Change ของทุก column ใน price matrix (แถว = เวลา, column = สินทรัพย์)
+    ด้วย NumPy ทีเดียว ได้ค่าเดียวกับ calculate_indicators() แบบ pandas
+    """
+    prices = np.asarray(prices, dtype='f8')
+    ma = rolling_mean(prices, ma_window)
+
+    delta = np.full(prices.shape, np.nan)
+    delta[1:] = prices[1:] - prices[:-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gain = rolling_mean(np.where(delta > 0, delta, 0.0), rsi_window)
+        loss = rolling_mean(np.where(delta < 0, -delta, 0.0), rsi_window)
+        rsi = 100 - (100 / (1 + gain / loss))
+
+        change = np.full(prices.shape, np.nan)
+        change[1:] = (prices[1:] / prices[:-1] - 1) * 100
+    return ma, rsi, change
+
+
+class IndicatorBatch:
+    """
+    ผลตัวชี้วัดของทุกสินทรัพย์ใน tick เดียว - คำนวณครั้งเดียวแล้วแชร์ให้ทั้ง
+    กล่องสัญญาณและกราฟ (และทุก session) ทุก array เป็น read-only
+    """
+
+    def __init__(self, ts, prices, columns, ma_window=MA_WINDOW, rsi_window=RSI_WINDOW, copy=True):
+        self.columns = list(columns)
+        self.index = {c: i for i, c in enumerate(self.columns)}
+        # copy: ไม่ผูกกับ ring buffer ที่ยังถูกเขียนต่อ (ข้อมูลจาก PriceSnapshot เป็น read-only อยู่แล้ว -> ใช้ร่วมได้)
+        self.ts = np.array(ts, dtype='<i8') if copy else np.asarray(ts, dtype='<i8')
+        self.prices = np.asarray(prices, dtype='f8')
+        self.ma, self.rsi, self.change = compute_indicators(self.prices, ma_window, rsi_window)
+        for arr in (self.ts, self.prices, self.ma, self.rsi, self.change):
+            arr.flags.writeable = False
+
+    @classmethod
+    def from_records(cls, records, columns, **kwargs):
+        """สร้างจาก structured array ของ PriceStore.view()"""
+        prices = np.column_stack([records[c] for c in columns]) if len(records) else np.empty((0, len(columns)))
+        return cls(records['ts'], prices, columns, **kwargs)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, **kwargs):
+        """สร้างจาก PriceSnapshot โดยใช้ ts / ราคาชุดเดียวกัน (ไม่ copy)"""
+        return cls(snapshot.ts, snapshot.matrix(), snapshot.columns, copy=False, **kwargs)
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def nbytes(self):
+        """หน่วยความจำของผลตัวชี้วัด (ไม่นับ ts / ราคาที่ใช้ร่วมกับ snapshot)"""
+        return self.ma.nbytes + self.rsi.nbytes + self.change.nbytes
+
+    def asset(self, col):
+        """view 1 มิติของสินทรัพย์เดียว: price / ma / rsi / change"""
+        i = self.index[col]
+        return {
+            'price': self.prices[:, i],
+            'ma': self.ma[:, i],
+            'rsi': self.rsi[:, i],
+            'change': self.change[:, i],
+        }
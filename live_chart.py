@@ -0,0 +1,168 @@
+# ========================================
+# LIVE CHART (EXTEND-TRACES DELTAS)
+# ========================================
+import json
+import math
+import os
+
+import plotly
+
+from price_store import format_epoch
+
+LIVE_MAX_POINTS = 2000   # จำนวนจุดสูงสุดที่ browser เก็บไว้ต่อ trace (Plotly.extendTraces maxPoints)
+LIVE_PANEL_HEIGHT = 800  # pixel ต่อแถวของ grid สด (การ์ด + กราฟ 450)
+
+PLOTLY_JS_PATH = os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js')
+
+
+def _clean(value):
+    """NaN -> None (JSON null) ให้ Plotly เว้นช่องว่างแทนที่จะพัง"""
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+class TickFeed:
+    """
+    📡 tick ล่าสุด (ราคา + MA + % change + RSI + สัญญาณ) ที่ collector publish ครั้งละ 1 จุด
+    - จัดเป็น entry เดียวสำหรับทุกสินทรัพย์ -> payload ต่อ tick มีขนาดคงที่
+    - ถ้ามี TickHub: push entry นั้นไปยังทุก browser ที่เปิด /stream ทันที (tick ที่พลาดไปได้จาก replay ของ hub)
+    classify(price, ma, rsi) -> (ข้อความ, class) ของสัญญาณ TIER 1 (เช่น dashboard.get_signal)
+    """
+
+    def __init__(self, columns, hub=None, classify=None):
+        self.columns = list(columns)
+        self.hub = hub
+        self.classify = classify
+
+    def _signal(self, price, ma, rsi):
+        """สัญญาณแบบเดียวกับ analyze_trend(): RSI ไม่มีค่า = 50, MA ไม่มีค่า = ราคา"""
+        if self.classify is None or price is None:
+            return None, None
+        return self.classify(price, price if ma is None else ma, 50 if rsi is None else rsi)
+
+    def publish(self, ts, prices, indicators):
+        """indicators: dict column -> {'MA20': ..., 'RSI': ..., 'Change': ...} (จาก IndicatorEngine.latest)"""
+        entry = {'ts': int(ts), 'x': format_epoch(ts)}
+        for c in self.columns:
+            price, ma, rsi = _clean(prices[c]), _clean(indicators[c]['MA20']), _clean(indicators[c]['RSI'])
+            entry[c] = (price, ma, _clean(indicators[c]['Change']), rsi, *self._signal(price, ma, rsi))
+        if self.hub is not None:
+            self.hub.publish(ts, entry)
+        return entry
+
+    def clear(self):
+        if self.hub is not None:
+            self.hub.clear()
+
+
+def handle_plotly_js(query):
+    """GET /plotly.min.js - เสิร์ฟ plotly.js จาก package ของ Python เอง (ไม่ต้องพึ่ง CDN)"""
+    with open(PLOTLY_JS_PATH, 'rb') as f:
+        return 200, 'application/javascript', f.read()
+
+
+def live_grid_html(panels, last_ts, base_url, columns=3, chart_height=450, max_points=LIVE_MAX_POINTS):
+    """
+    HTML ของ grid สด (การ์ดราคา + กล่องสัญญาณ + กราฟ) ทุกสินทรัพย์ในหน้าเดียวกันใน iframe เดียว
+    -> 1 EventSource ต่อ browser (ไม่ชนเพดาน 6 connection ต่อ host ของ HTTP/1.1)
+    panels: list ของ dict col / title / fig (JSON ของ figure เริ่มต้น) / init [ราคา, ราคาก่อนหน้า, MA, RSI, ข้อความสัญญาณ, class]
+    ทุก tick ที่ server push มา: ต่อจุดด้วย Plotly.extendTraces (trace 0 = ราคา, 1 = MA, 2 = จุดขาขึ้น, 3 = จุดขาลง)
+    และเขียนการ์ดใหม่ (ข้อความแนวโน้ม / MA / RSI แบบเดียวกับ analyze_trend ฝั่ง Python)
+    """
+    items = ',\n'.join(
+        f'{{"col": {json.dumps(p["col"])}, "title": {json.dumps(p["title"])}, "fig": {p["fig"]}, '
+        f'"init": {json.dumps([_clean(v) if isinstance(v, float) else v for v in p["init"]])}}}'
+        for p in panels)
+    return f"""
+<div id="clock" class="clock"></div>
+<div id="grid" style="display:grid;grid-template-columns:repeat({columns}, 1fr);gap:16px;"></div>
+<script src="{base_url}/plotly.min.js"></script>
+<script>
+  const panels = [{items}];
+  const grid = document.getElementById('grid');
+  const clock = document.getElementById('clock');
+  let last = {int(last_ts)};
+
+  function money(v) {{
+    return '$' + v.toLocaleString('en-US', {{minimumFractionDigits: 2, maximumFractionDigits: 2}});
+  }}
+  function renderCard(p, price, prev, ma, rsi, text, cls) {{
+    const el = p.el;
+    if (price === null) {{
+      el.querySelector('.value').textContent = '—';
+      el.querySelector('.delta').textContent = '';
+      return;
+    }}
+    const change = prev ? (price - prev) / prev * 100 : 0;
+    ma = ma === null ? price : ma;
+    rsi = rsi === null ? 50 : rsi;
+    el.querySelector('.value').textContent = money(price);
+    const delta = el.querySelector('.delta');
+    delta.textContent = (change < 0 ? '▼ ' : '▲ ') + change.toFixed(2) + '%';
+    delta.style.color = change < 0 ? '#ff2b2b' : '#21c354';
+    if (text) {{
+      const box = el.querySelector('.ai-signal-box');
+      box.className = 'ai-signal-box ' + cls;
+      box.textContent = text;
+    }}
+    const rsiText = rsi > 70 ? '⚠️ Overbought (RSI > 70)' : rsi < 30 ? '⚠️ Oversold (RSI < 30)' : '✅ ปกติ (RSI: ' + rsi.toFixed(1) + ')';
+    el.querySelector('.metric-card').innerHTML =
+      '<b>แนวโน้ม:</b> ' + (change < 0 ? '🔴 ขาลง' : '🟢 ขาขึ้น') + '<br>' +
+      '<b>MA(20):</b> ' + (price > ma ? 'เหนือ MA(20) 📈' : 'ต่ำกว่า MA(20) 📉') + '<br>' +
+      '<b>RSI:</b> ' + rsiText;
+    p.price = price;
+  }}
+
+  for (const p of panels) {{
+    p.el = document.createElement('div');
+    p.el.innerHTML = '<h3></h3><div class="label">ราคาปัจจุบัน</div><div class="value"></div><div class="delta"></div>' +
+      '<div class="ai-signal-box"></div><div class="metric-card"></div><div class="chart" style="height:{chart_height}px"></div>';
+    p.el.querySelector('h3').textContent = p.title;
+    grid.appendChild(p.el);
+    p.chart = p.el.querySelector('.chart');
+    Plotly.newPlot(p.chart, p.fig.data, p.fig.layout, {{responsive: true, displaylogo: false}});
+    renderCard(p, ...p.init);
+  }}
+
+  // 📣 server push: tick ใหม่มาถึงทันทีที่ collector ได้ราคา (EventSource ต่อใหม่เองถ้าหลุด)
+  const source = new EventSource('{base_url}/stream?since=' + last);
+  source.addEventListener('tick', (ev) => {{
+    const t = JSON.parse(ev.data);
+    if (t.ts <= last) return;   // replay ซ้ำหลังต่อใหม่
+    last = t.ts;
+    clock.textContent = '📣 อัปเดตล่าสุด (push): ' + t.x;
+    for (const p of panels) {{
+      const v = t[p.col];
+      if (!v) continue;
+      const [price, ma, change, rsi, text, cls] = v;
+      Plotly.extendTraces(p.chart, {{x: [[t.x], [t.x]], y: [[price], [ma]]}}, [0, 1], {max_points});
+      if (change) {{
+        Plotly.extendTraces(p.chart, {{x: [[t.x]], y: [[price]], customdata: [[change]]}}, [change > 0 ? 2 : 3], {max_points});
+      }}
+      renderCard(p, price, p.price, ma, rsi, text, cls);
+    }}
+  }});
+  source.addEventListener('reset', () => {{
+    last = 0;
+    for (const p of panels) {{
+      Plotly.restyle(p.chart, {{x: [[], [], [], []], y: [[], [], [], []]}}, [0, 1, 2, 3]);
+    }}
+  }});
+</script>
+<style>
+  body {{ margin: 0; background: transparent; color: #fafafa; font-family: "Source Sans Pro", sans-serif; }}
+  h3 {{ color: #00ffff; text-shadow: 0 0 10px #00ffff, 0 0 20px #00ffff; margin: 8px 0; }}
+  .clock {{ color: #00ffff; font-size: 1.2rem; text-align: center; margin: 10px 0; }}
+  .label {{ font-size: 0.9rem; }}
+  .value {{ color: #00ffff; font-size: 2rem; }}
+  .delta {{ font-size: 1.2rem; }}
+  .metric-card {{ background: rgba(0, 255, 255, 0.1); border: 2px solid #00ffff; border-radius: 10px; padding: 20px;
+                  margin-top: 10px; box-shadow: 0 0 20px rgba(0, 255, 255, 0.3); }}
+  .ai-signal-box {{ border-radius: 10px; padding: 15px; margin-top: 10px; text-align: center; font-weight: bold;
+                    font-size: 1.1rem; box-shadow: 0 0 15px rgba(0, 0, 0, 0.3); }}
+  .signal-green {{ background: rgba(0, 255, 0, 0.2); border: 2px solid #00ff00; color: #00ff00; }}
+  .signal-blue {{ background: rgba(0, 150, 255, 0.2); border: 2px solid #0096ff; color: #0096ff; }}
+  .signal-red {{ background: rgba(255, 0, 0, 0.2); border: 2px solid #ff0000; color: #ff0000; }}
+  .signal-gray {{ background: rgba(128, 128, 128, 0.2); border: 2px solid #808080; color: #cccccc; }}
+</style>
+"""
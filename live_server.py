@@ -0,0 +1,128 @@
+# ========================================
+# LIVE SIDE SERVER (STDLIB HTTP ข้าง STREAMLIT)
+# ========================================
+import json
+import os
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ค่าเริ่มต้นฟังเฉพาะเครื่องนี้: /metrics /stream ตอบ CORS * - เปิดออก network ต้องตั้ง LIVE_SERVER_HOST เอง
+LIVE_SERVER_HOST = os.environ.get('LIVE_SERVER_HOST', '127.0.0.1')
+LIVE_SERVER_PORT = int(os.environ.get('LIVE_SERVER_PORT', '8502'))
+# URL ที่ browser ใช้เรียก (หลัง reverse proxy / port forward อาจไม่ใช่ localhost)
+LIVE_SERVER_PUBLIC_URL = os.environ.get('LIVE_SERVER_PUBLIC_URL', f'http://localhost:{LIVE_SERVER_PORT}')
+LOCAL_HOSTS = {'localhost', '::1', ''}
+
+
+def is_local_host(host):
+    """host / 'host:port' / URL ชี้มาที่เครื่องนี้เองหรือไม่ (ไม่รู้ host = ถือว่าเครื่องนี้)"""
+    name = urlparse(host if '//' in (host or '') else f'//{host or ""}').hostname or ''
+    return name in LOCAL_HOSTS or name.startswith('127.')
+
+
+def json_response(payload, status=200):
+    return status, 'application/json', json.dumps(payload, separators=(',', ':'))
+
+
+class LiveServer:
+    """
+    🛰️ HTTP server เล็กๆ 1 ตัวต่อ process สำหรับ endpoint ที่ Streamlit ให้ไม่ได้
+    (ข้อมูลส่วนต่างของกราฟสด ฯลฯ) - handler คืน (status, content_type, body)
+    body เป็น str / bytes หรือ iterator ของ chunk (สำหรับ response แบบ stream)
+    """
+
+    def __init__(self, host=LIVE_SERVER_HOST, port=LIVE_SERVER_PORT, public_url=LIVE_SERVER_PUBLIC_URL):
+        self.host = host
+        self.port = port
+        self.public_url = public_url.rstrip('/')
+        self.routes = {}
+        self._server = None
+        self.error = None
+
+    def route(self, path, handler):
+        self.routes[path] = handler
+
+    def url(self, path):
+        return self.public_url + path
+
+    def unreachable_reason(self, page_host):
+        """
+        เหตุผลที่ browser ซึ่งเปิดหน้าเว็บจาก page_host (header Host ของ Streamlit) ต่อ live server ไม่ได้
+        หรือ None ถ้าน่าจะต่อได้ - public URL เป็น localhost = เครื่องของผู้ชมเอง ไม่ใช่ server นี้
+        """
+        if is_local_host(page_host) or not is_local_host(self.public_url):
+            return None
+        fix = 'ตั้ง LIVE_SERVER_PUBLIC_URL เป็น URL ที่ browser เข้าถึงได้'
+        if is_local_host(self.host):
+            fix += f' และ LIVE_SERVER_HOST (ตอนนี้ฟังแค่ {self.host}) หรือทำ reverse proxy'
+        return f'หน้านี้เปิดจาก {page_host} แต่กราฟสดจะต่อไปที่ {self.public_url}: {fix}'
+
+    def start(self):
+        routes = self.routes
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                # response เล็กๆ (event ของ stream) ต้องออกทันที ไม่รอรวม packet (Nagle)
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                handler = routes.get(parsed.path)
+                if handler is None:
+                    status, content_type, body = json_response({'error': 'not found'}, 404)
+                else:
+                    query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                    if self.headers.get('Last-Event-ID'):
+                        query['last_event_id'] = self.headers['Last-Event-ID']   # EventSource ต่อใหม่
+                    try:
+                        status, content_type, body = handler(query)
+                    except Exception as e:
+                        status, content_type, body = json_response({'error': str(e)}, 500)
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Access-Control-Allow-Origin', '*')  # iframe ของ components.html มี origin = null
+                self.send_header('Cache-Control', 'no-cache')
+                if isinstance(body, (str, bytes)):
+                    data = body.encode('utf-8') if isinstance(body, str) else body
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+
+                # stream: ส่งทีละ chunk จนกว่า iterator จะจบหรือ client ปิด connection
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                try:
+                    for chunk in body:
+                        self.wfile.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    close = getattr(body, 'close', None)
+                    if close:
+                        close()
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass  # เงียบไว้ ไม่ให้ log ท่วม console ของ Streamlit
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            # port ถูกใช้แล้ว (เช่น replica อื่นบนเครื่องเดียวกัน) -> โหมดสดใช้ไม่ได้ แต่แอปยังทำงานต่อ
+            self.error = e
+            return self
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='live-server', daemon=True).start()
+        return self
+
+    @property
+    def running(self):
+        return self._server is not None
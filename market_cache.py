@@ -0,0 +1,176 @@
+# ========================================
+# STALE-WHILE-REVALIDATE CACHE + BACKOFF / CIRCUIT BREAKER
+# ========================================
+import threading
+import time
+from collections import namedtuple
+
+from http_client import submit
+from metrics import span, inc
+
+# ผลลัพธ์จาก cache: value=None แปลว่ายังไม่เคยได้ข้อมูลจริงเลย (ผู้เรียกต้องใช้ fallback เอง)
+CachedResult = namedtuple('CachedResult', ['value', 'age', 'stale', 'error', 'state'])
+
+
+class EndpointHealth:
+    """
+    🩺 สุขภาพของ endpoint: นับความล้มเหลวต่อเนื่อง + exponential backoff + circuit breaker
+    - closed: เรียกได้ปกติ
+    - open: ล้มเหลวติดกันเกิน threshold -> ห้ามเรียกจนครบ cooldown
+    - half-open: ครบ cooldown แล้ว ให้ลองได้ 1 ครั้ง ถ้าสำเร็จกลับเป็น closed
+    """
+
+    def __init__(self, base_delay=5, max_delay=600, threshold=3, cooldown=300):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.next_attempt_at = 0.0
+        self.last_error = None
+
+    @property
+    def state(self):
+        if self.failures < self.threshold:
+            return 'closed'
+        return 'open' if time.time() < self.next_attempt_at else 'half-open'
+
+    def allow(self):
+        return time.time() >= self.next_attempt_at
+
+    def record_success(self):
+        self.failures = 0
+        self.next_attempt_at = 0.0
+        self.last_error = None
+
+    def record_failure(self, error):
+        self.failures += 1
+        self.last_error = error
+        if self.failures >= self.threshold:
+            delay = self.cooldown
+        else:
+            delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+        self.next_attempt_at = time.time() + delay
+
+
+class SWRCache:
+    """
+    ♻️ cache ค่าเดียวต่อ endpoint แบบ stale-while-revalidate
+    - ค่ายังสด: คืนทันที
+    - ค่าหมดอายุ: คืนค่าเก่าทันที แล้วให้ thread เบื้องหลังไปดึงใหม่ (ไม่มีผู้ใช้คนไหนต้องรอ)
+    - ไม่เคยมีค่าเลย: ดึงแบบรอผลแค่ครั้งแรกสุดเท่านั้น หลังจากนั้นดึงเบื้องหลังตาม backoff
+    - persist (ResponseCache): เริ่ม process ใหม่ด้วยค่าล่าสุดจากดิสก์ (อายุจริง) แทนการรอ API
+    - lease (หลาย replica ใช้ persist ไฟล์เดียวกัน): ก่อน refresh เบื้องหลัง ใช้ค่าที่ replica อื่นเพิ่งดึงมาถ้ามี
+      ไม่งั้นต้องได้สิทธิ์ lease(name) ก่อนถึงจะยิง API -> 1 request ต่อ TTL ทั้งระบบ ไม่ใช่ต่อ replica
+    loader ต้อง raise เมื่อดึงไม่สำเร็จ เพื่อให้นับเป็นความล้มเหลวได้
+    encode / decode: แปลงค่าเป็นรูปที่เก็บเป็น JSON ใน persist ได้ และกลับ (None = เก็บ / ใช้ค่าตามที่ได้)
+    fallback: ชื่อ kind ของ fallback_total ที่นับ 1 ครั้งต่อการดึงที่ล้มเหลวตอนยังไม่มีค่าจริง
+    (ผู้เรียกต้องใช้ค่าสำรองจนกว่าจะดึงสำเร็จ) - นับต่อผลการดึง ไม่ใช่ต่อการ render
+    """
+
+    def __init__(self, name, loader, ttl, health=None, persist=None, lease=None, fallback=None,
+                 encode=None, decode=None):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.health = health or EndpointHealth()
+        self.persist = persist
+        self.lease = lease
+        self.fallback = fallback
+        self.encode = encode
+        self.decode = decode
+        self.value = None
+        self.fetched_at = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._attempted = False
+        self.restored = False
+        self._restore()
+
+    def _restore(self):
+        """warm จากดิสก์: มีค่าแล้วไม่ต้องรอโหลดครั้งแรก ถ้าเกิน TTL จะ refresh เบื้องหลังตามปกติ"""
+        if self.persist is None:
+            return
+        cached = self._read_persist()
+        if cached is not None:
+            self.value, self.fetched_at = cached
+            self._attempted = True
+            self.restored = True
+
+    def _adopt(self):
+        """ค่าใน persist ใหม่กว่าของเราและยังไม่หมดอายุ (replica อื่นดึงมาแล้ว) -> ใช้ค่านั้น คืน True"""
+        cached = self._read_persist() if self.persist is not None else None
+        if cached is None or time.time() - cached[1] > self.ttl:
+            return False
+        if self.fetched_at is not None and cached[1] <= self.fetched_at:
+            return False
+        self.value, self.fetched_at = cached
+        self.health.record_success()
+        return True
+
+    def _read_persist(self):
+        """(value, fetched_at) จาก persist ผ่าน decode หรือ None (ไม่มี / รูปแบบไม่ตรงกับที่ decode รู้จัก)"""
+        cached = self.persist.get(self.name)
+        if cached is None or self.decode is None:
+            return cached
+        try:
+            return self.decode(cached[0]), cached[1]
+        except Exception:
+            return None
+
+    def _may_fetch(self):
+        """ได้สิทธิ์ยิง API รอบนี้ไหม (ไฟล์กลางใช้ไม่ได้ = ยิงเองแบบเดิม ดีกว่าข้อมูลค้าง)"""
+        try:
+            return self.lease(self.name)
+        except Exception:
+            return True
+
+    def _load(self):
+        try:
+            with span('upstream_seconds', endpoint=self.name):
+                value = self.loader()
+        except Exception as e:
+            self.health.record_failure(e)
+            inc('upstream_errors_total', endpoint=self.name)
+            if self.value is None and self.fallback is not None:
+                inc('fallback_total', kind=self.fallback)
+            return
+        self.value = value
+        self.fetched_at = time.time()
+        self.health.record_success()
+        if self.persist is not None:
+            self.persist.set(self.name, value if self.encode is None else self.encode(value), self.fetched_at)
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing or not self.health.allow():
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                if self.lease is not None and (self._adopt() or not self._may_fetch()):
+                    return   # replica อื่นดึงมาแล้ว / กำลังดึงอยู่: รอบหน้าค่อยรับค่าจาก persist
+                self._load()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        submit(run)
+
+    def get(self):
+        if not self._attempted:
+            with self._lock:
+                # request แรกสุดของ process: รอผลครั้งเดียว (คนอื่นที่มาพร้อมกันรอ lock เดียวกัน)
+                if not self._attempted:
+                    self._load()
+                    self._attempted = True
+
+        age = None if self.fetched_at is None else time.time() - self.fetched_at
+        stale = age is None or age > self.ttl
+        if stale:
+            self._refresh_in_background()
+        return CachedResult(self.value, age, stale, self.health.last_error, self.health.state)
+
+    def invalidate(self):
+        self.fetched_at = None
@@ -0,0 +1,222 @@
+# ========================================
+# METRICS (TIMING SPANS + COUNTERS -> PROMETHEUS TEXT)
+# ========================================
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+METRIC_PREFIX = 'dashboard_'
+# ขอบบนของ bucket (วินาที) ของทุก histogram เวลา
+SPAN_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _NoopSpan:
+    """span ตอนปิด metrics: object เดียวใช้ซ้ำ ไม่จับเวลา ไม่ lock"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('registry', 'name', 'key', 'started')
+
+    def __init__(self, registry, name, key):
+        self.registry = registry
+        self.name = name
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry._observe(self.name, self.key, time.perf_counter() - self.started)
+        return False
+
+
+def labels(**kwargs):
+    """labels ในรูป key ของ series (ใช้ใน dict ที่ฟังก์ชัน gauge คืน)"""
+    return tuple(sorted(kwargs.items()))
+
+
+def _key(kwargs):
+    return tuple(sorted(kwargs.items()))
+
+
+def _format_labels(key):
+    if not key:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in key)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + '}'
+
+
+def _format_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'NaN'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """
+    📏 ที่เก็บ metrics ของทั้ง process (ทุก session + collector + thread เบื้องหลัง)
+    - counter: inc(name, **labels)
+    - histogram เวลา: with span(name, **labels) / @timed(name, **labels) -> count, sum, bucket, ค่าล่าสุด
+    - gauge: ฟังก์ชันที่ถูกเรียกตอน scrape เท่านั้น (อ่านค่าจาก object ที่มีตัวนับอยู่แล้ว ไม่มีต้นทุนต่อ request)
+    ปิดด้วย METRICS_ENABLED=0: span / inc คืนทันที (ไม่จับเวลา ไม่ lock)
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, buckets=SPAN_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._help = {}
+
+    # ---------- write path ----------
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, _key(labels))
+
+    def observe(self, name, seconds, **labels):
+        if self.enabled:
+            self._observe(name, _key(labels), seconds)
+
+    def _observe(self, name, key, seconds):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            h = series.get(key)
+            if h is None:
+                h = series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0, 'last': 0.0, 'max': 0.0}
+            i = bisect.bisect_left(self.buckets, seconds)
+            if i < len(self.buckets):
+                h['buckets'][i] += 1
+            h['sum'] += seconds
+            h['count'] += 1
+            h['last'] = seconds
+            h['max'] = max(h['max'], seconds)
+
+    def timed(self, name, **labels):
+        """decorator: จับเวลาทั้งฟังก์ชัน (รวมกรณี raise เช่น st.rerun / st.stop)"""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def gauge(self, name, fn, help=None, kind='gauge'):
+        """
+        ลงทะเบียนค่าที่อ่านตอน scrape: fn() คืนตัวเลข หรือ dict ของ {labels dict เป็น tuple: ค่า}
+        kind='counter' สำหรับตัวนับสะสมที่เก็บอยู่ใน object อื่น (เช่น hits ของ cache)
+        """
+        self._gauges[name] = (fn, kind)
+        if help:
+            self._help[name] = help
+
+    def describe(self, name, help):
+        self._help[name] = help
+
+    # ---------- read path ----------
+    def _gauge_values(self, fn):
+        try:
+            value = fn()
+        except Exception:
+            return {}
+        if value is None:
+            return {}   # ไม่มีค่า (เช่นอ่าน API ภายในไม่ได้) -> ไม่ส่ง metric นี้
+        return value if isinstance(value, dict) else {(): value}
+
+    def spans(self):
+        """สรุปเวลาของทุก span สำหรับ debug panel: list ของ (ชื่อ, labels, count, avg, last, max) วินาที"""
+        with self._lock:
+            return [(name, dict(key), h['count'], h['sum'] / h['count'], h['last'], h['max'])
+                    for name, series in self._histograms.items() for key, h in series.items() if h['count']]
+
+    def counters(self):
+        with self._lock:
+            return {name: {k: v for k, v in series.items()} for name, series in self._counters.items()}
+
+    def render(self):
+        """ทุก metric ในรูปแบบ Prometheus text exposition (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            histograms = {n: {k: {**h, 'buckets': list(h['buckets'])} for k, h in s.items()}
+                          for n, s in self._histograms.items()}
+
+        def header(name, kind):
+            full = METRIC_PREFIX + name
+            if name in self._help:
+                lines.append(f'# HELP {full} {self._help[name]}')
+            lines.append(f'# TYPE {full} {kind}')
+            return full
+
+        for name, series in sorted(counters.items()):
+            full = header(name, 'counter')
+            for key, value in sorted(series.items()):
+                lines.append(f'{full}{_format_labels(key)} {_format_value(value)}')
+
+        for name, series in sorted(histograms.items()):
+            full = header(name, 'histogram')
+            for key, h in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, h['buckets']):
+                    cumulative += count
+                    lines.append(f'{full}_bucket{_format_labels(key + (("le", repr(bound)),))} {cumulative}')
+                lines.append(f'{full}_bucket{_format_labels(key + (("le", "+Inf"),))} {h["count"]}')
+                lines.append(f'{full}_sum{_format_labels(key)} {_format_value(h["sum"])}')
+                lines.append(f'{full}_count{_format_labels(key)} {h["count"]}')
+
+        for name, (fn, kind) in sorted(self._gauges.items()):
+            values = self._gauge_values(fn)
+            if not values:
+                continue
+            full = header(name, kind)
+            for key, value in sorted(values.items()):
+                lines.append(f'{full}{_format_labels(key)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def handle_metrics(self, query):
+        """handler ของ LiveServer: GET /metrics"""
+        return 200, 'text/plain; version=0.0.4; charset=utf-8', self.render()
+
+
+_registry = Registry()
+
+
+def get_registry():
+    return _registry
+
+
+def span(name, **labels):
+    return _registry.span(name, **labels)
+
+
+def inc(name, value=1, **labels):
+    _registry.inc(name, value, **labels)
+
+
+def timed(name, **labels):
+    return _registry.timed(name, **labels)
@@ -0,0 +1,236 @@
+# ========================================
+# APPEND-ONLY PRICE STORE (MEMORY-MAPPED RING BUFFER)
+# ========================================
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+MAGIC = b'CPSTORE1'
+HEADER_SIZE = 4096          # header: magic + capacity + count + ชื่อ columns (JSON) ขยายทีละ 4096 ถ้า column เยอะ
+THAI_OFFSET = timedelta(hours=7)
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# ชื่อ column ของไฟล์ CSV รุ่นเก่า -> ชื่อที่ใช้ในแอป
+LEGACY_CSV_COLUMNS = {
+    'Timestamp': 'timestamp',
+    'BTC Price': 'BTC_price',
+    'ETH Price': 'ETH_price',
+    'Gold Price': 'Gold_price',
+}
+
+
+def to_epoch(text):
+    """แปลงเวลาไทย (string) -> epoch วินาที (int64, UTC)"""
+    import pandas as pd
+    local = pd.to_datetime(text, format=TIME_FORMAT)
+    return ((local - THAI_OFFSET) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+
+
+def format_epoch(ts):
+    """แปลง epoch วินาที -> string เวลาไทยแบบเดียวกับ CSV เดิม"""
+    return (datetime.fromtimestamp(int(ts), timezone.utc) + THAI_OFFSET).strftime(TIME_FORMAT)
+
+
+class PriceStore:
+    """
+    💾 ที่เก็บราคาแบบ append-only: ไฟล์ memory-mapped ขนาดคงที่ (ring buffer)
+    - 1 record = ts (epoch int64) + ราคา float64 ต่อสินทรัพย์
+    - append = O(1): เขียน record ลง slot เดียว (สองตำแหน่ง) แล้วค่อยเลื่อน count
+    - แต่ละ record ถูกเขียนซ้ำที่ slot และ slot + slots ทำให้ข้อมูลล่าสุด `capacity` แถว
+      เป็นช่วงต่อเนื่องเสมอ -> view() คืน numpy view แบบ zero-copy ได้ทุกครั้ง
+    - มีผู้เขียนคนเดียว (collector) ผู้อ่านหลายคนอ่านได้พร้อมกันโดยไม่ต้อง lock:
+      count ถูกอัปเดตหลังเขียน record เสร็จ และ slot ที่กำลังเขียนอยู่นอกหน้าต่างที่ผู้อ่านเห็นเสมอ
+    """
+
+    def __init__(self, path, columns, capacity=1000, readonly=False):
+        self.path = path
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.slots = capacity + 1       # +1 slot กันชนระหว่างผู้เขียนกับผู้อ่าน
+        self.readonly = readonly
+        self.dtype = np.dtype([('ts', '<i8')] + [(c, '<f8') for c in self.columns])
+        self.header_size = self._header_size(self._meta())
+
+        if not os.path.exists(path) or not self._header_matches():
+            if readonly:
+                raise FileNotFoundError(path)
+            self._create()
+        self._map()
+
+    @classmethod
+    def open_readonly(cls, path):
+        """เปิดไฟล์ที่มีอยู่แบบอ่านอย่างเดียว ด้วย capacity / columns จาก header ของไฟล์เอง (เช่น CLI ข้าง dashboard)"""
+        header = cls._read_header_of(path)
+        if header is None:
+            raise ValueError(f'{path}: not a PriceStore file')
+        capacity, columns = header
+        return cls(path, columns, capacity=capacity, readonly=True)
+
+    # ---------- file layout ----------
+    def _meta(self):
+        return json.dumps({'columns': self.columns}).encode('utf-8')
+
+    @staticmethod
+    def _header_size(meta):
+        """ขนาด header ปัดขึ้นทีละ HEADER_SIZE (เหลือ byte ว่างปิดท้าย JSON อย่างน้อย 1 byte เสมอ)"""
+        return -(-(24 + len(meta) + 1) // HEADER_SIZE) * HEADER_SIZE
+
+    def _read_header(self):
+        return self._read_header_of(self.path)
+
+    @staticmethod
+    def _read_header_of(path):
+        with open(path, 'rb') as f:
+            raw = f.read(HEADER_SIZE)
+            if len(raw) < HEADER_SIZE or raw[:8] != MAGIC:
+                return None
+            # JSON ยาวเกิน block แรก (สินทรัพย์เยอะ): อ่านต่อจนเจอ \0 ที่ปิดท้าย
+            while b'\0' not in raw[24:]:
+                more = f.read(HEADER_SIZE)
+                if len(more) < HEADER_SIZE:
+                    return None
+                raw += more
+        capacity, _count = np.frombuffer(raw[8:24], dtype='<i8')
+        meta = raw[24:raw.index(b'\0', 24)]
+        return int(capacity), json.loads(meta.decode('utf-8'))['columns']
+
+    def _header_matches(self):
+        try:
+            header = self._read_header()
+        except (OSError, ValueError):
+            return False
+        if header is None:
+            return False
+        capacity, columns = header
+        if capacity == self.capacity and columns == self.columns:
+            return True
+        if self.readonly:
+            # ผู้อ่านห้ามแตะไฟล์เด็ดขาด (migrate = สร้างไฟล์ใหม่ทับของจริง) -> ใช้ open_readonly() แทน
+            raise ValueError(f'{self.path}: store has capacity {capacity} / columns {columns}, '
+                             f'expected capacity {self.capacity} / columns {self.columns}')
+        # โครงสร้างเปลี่ยน (เพิ่มสินทรัพย์ / เปลี่ยน capacity) -> ย้ายข้อมูลเดิมมาไฟล์ใหม่
+        self._migrate(capacity, columns)
+        return True
+
+    def _create(self):
+        header = MAGIC + np.array([self.capacity, 0], dtype='<i8').tobytes() + self._meta()
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(header.ljust(self.header_size, b'\0'))
+            f.truncate(self.header_size + 2 * self.slots * self.dtype.itemsize)
+        os.replace(tmp, self.path)   # atomic: ผู้อ่านไม่มีวันเห็นไฟล์ครึ่งๆ กลางๆ
+
+    def _map(self):
+        mode = 'r' if self.readonly else 'r+'
+        self._count = np.memmap(self.path, dtype='<i8', mode=mode, offset=16, shape=(1,))
+        self._records = np.memmap(self.path, dtype=self.dtype, mode=mode,
+                                  offset=self.header_size, shape=(2 * self.slots,))
+        # ผู้อ่านหยิบ count + records คู่เดียวกันเสมอ (rewrite() สลับไฟล์ระหว่างที่มีคนอ่านอยู่ได้)
+        self._mapped = (self._count, self._records)
+
+    def _migrate(self, old_capacity, old_columns):
+        old = PriceStore(self.path, old_columns, capacity=old_capacity, readonly=True)
+        rows = np.array(old.view())
+        old.close()
+        self._create()
+        self._map()
+        if len(rows):
+            self.extend({'ts': rows['ts'], **{c: rows[c] for c in old_columns if c in self.columns}})
+        self.close()
+
+    # ---------- write path (collector เท่านั้น) ----------
+    def append(self, ts, prices):
+        """เพิ่ม 1 record แบบ O(1) (prices: dict ชื่อ column -> ราคา)"""
+        count = int(self._count[0])
+        record = np.array([(ts, *[prices.get(c, np.nan) for c in self.columns])], dtype=self.dtype)[0]
+        slot = count % self.slots
+        self._records[slot] = record
+        self._records[slot + self.slots] = record
+        self._count[0] = count + 1   # publish หลังเขียน record เสร็จเท่านั้น
+
+    def extend(self, columns):
+        """เพิ่มหลาย record ทีเดียว (ใช้ตอน import / migrate)"""
+        ts = np.asarray(columns['ts'], dtype='<i8')
+        for i in range(len(ts)):
+            self.append(ts[i], {c: columns[c][i] for c in self.columns if c in columns})
+
+    def clear(self):
+        self._count[0] = 0
+
+    def rewrite(self, columns):
+        """
+        แทนข้อมูลทั้งหมดด้วยชุดใหม่แบบ atomic: เขียนไฟล์ใหม่ให้เสร็จแล้ว os.replace ทับไฟล์เดิม
+        ผู้อ่านที่ไม่ lock เห็นชุดเดิมหรือชุดใหม่ทั้งชุดเท่านั้น (ไม่มีช่วงที่ store ว่าง / ครึ่งๆ กลางๆ)
+        view() ที่หยิบไปก่อนหน้ายังอ่านไฟล์เดิมได้จนเลิกใช้ - process อื่นต้องเปิดไฟล์ใหม่ถึงจะเห็นชุดใหม่
+        """
+        tmp_path = self.path + '.rewrite'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)   # ของค้างจากครั้งก่อนที่ไม่จบ (header ตรงกันจะถูกเปิดต่อแทนที่จะสร้างใหม่)
+        tmp = PriceStore(tmp_path, self.columns, capacity=self.capacity)
+        tmp.extend(columns)
+        tmp.close()
+        self.flush()
+        os.replace(tmp_path, self.path)
+        self._map()   # map เดิมไม่ปิด: ปล่อยให้หายไปเองเมื่อ view ที่ยังใช้อยู่เลิกอ้างถึง
+
+    def flush(self):
+        self._records.flush()
+        self._count.flush()
+
+    def close(self):
+        if not self.readonly:
+            self.flush()
+        self._records._mmap.close()
+        self._count._mmap.close()
+
+    # ---------- read path ----------
+    def __len__(self):
+        return min(int(self._mapped[0][0]), self.capacity)
+
+    def view(self):
+        """numpy structured array ของข้อมูลล่าสุด (zero-copy, read-only)"""
+        counter, records = self._mapped
+        count = int(counter[0])
+        n = min(count, self.capacity)
+        start = (count - n) % self.slots
+        view = records[start:start + n].view(np.ndarray)
+        view.flags.writeable = False
+        return view
+
+    def last(self):
+        """record ล่าสุด หรือ None ถ้ายังว่าง"""
+        counter, records = self._mapped
+        count = int(counter[0])
+        if count == 0:
+            return None
+        return records[(count - 1) % self.slots].copy()
+
+    def to_frame(self):
+        """DataFrame แบบเดิม (timestamp เป็น string เวลาไทย) สำหรับโค้ดส่วนแสดงผล"""
+        import pandas as pd
+        view = self.view()
+        df = pd.DataFrame({c: view[c] for c in self.columns})
+        stamps = pd.to_datetime(view['ts'], unit='s') + THAI_OFFSET
+        df.insert(0, 'timestamp', stamps.strftime(TIME_FORMAT))
+        return df
+
+    # ---------- CSV compatibility ----------
+    def import_csv(self, csv_path):
+        """นำเข้าไฟล์ CSV เดิม (รองรับทั้ง schema ใหม่และรุ่นเก่า) คืนจำนวนแถวที่นำเข้า"""
+        import pandas as pd
+        df = pd.read_csv(csv_path).rename(columns=LEGACY_CSV_COLUMNS)
+        if 'timestamp' not in df.columns or df.empty:
+            return 0
+        df = df.dropna(subset=['timestamp']).tail(self.capacity)
+        columns = {'ts': to_epoch(df['timestamp']).to_numpy()}
+        for c in self.columns:
+            if c in df.columns:
+                columns[c] = pd.to_numeric(df[c], errors='coerce').to_numpy(dtype='f8')
+        self.extend(columns)
+        return len(df)
+
+    def export_csv(self, csv_path=None):
+        """ส่งออกเป็น CSV แบบเดิม (คืน string ถ้าไม่ระบุ path)"""
+        return self.to_frame().to_csv(csv_path, index=False)
@@ -0,0 +1,205 @@
+# ========================================
+# PRICE PROVIDERS (หลายแหล่งต่อสินทรัพย์ + HEDGED REQUESTS)
+# ========================================
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import wait, FIRST_COMPLETED
+
+import numpy as np
+
+from http_client import http_get, submit
+from metrics import span, inc
+from watchlist import cached_quotes, fetch_quotes
+
+BINANCE_API_URL = os.environ.get('BINANCE_API_URL', 'https://api.binance.com')
+HEDGE_DEFAULT = 1.0        # วินาที: รอแหล่งหลักเท่านี้ก่อนยิงแหล่งสำรอง (ตอนยังไม่มีสถิติพอ)
+HEDGE_MIN, HEDGE_MAX = 0.2, 3.0
+HEDGE_MIN_SAMPLES = 20     # จำนวน latency ขั้นต่ำก่อนเชื่อค่า p95
+LATENCY_SAMPLES = 200
+
+
+class ProviderStats:
+    """สถิติต่อแหล่งราคา: latency ล่าสุด (p50 / p95), จำนวน request / error / ครั้งที่ได้ราคาก่อนแหล่งอื่น"""
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=samples)
+        self.requests = 0
+        self.errors = 0
+        self.hedged = 0    # ครั้งที่ถูกยิงในฐานะแหล่งสำรอง
+        self.wins = 0      # จำนวนราคาที่แหล่งนี้ส่งมาถึงก่อน (ถูกใช้จริง)
+        self.cached = 0    # ครั้งที่ตอบจาก cache ของแหล่งเอง (ไม่นับเป็น latency ของ upstream)
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.requests += 1
+            if ok:
+                self.latencies.append(seconds)
+            else:
+                self.errors += 1
+
+    def record_hedge(self):
+        with self._lock:
+            self.hedged += 1
+
+    def record_wins(self, n):
+        with self._lock:
+            self.wins += n
+
+    def record_cached(self):
+        with self._lock:
+            self.cached += 1
+
+    def percentile(self, q):
+        with self._lock:
+            samples = list(self.latencies)
+        return float(np.percentile(samples, q)) if samples else math.nan
+
+    def as_dict(self):
+        return {'requests': self.requests, 'errors': self.errors, 'hedged': self.hedged, 'wins': self.wins,
+                'cached': self.cached,
+                'p50': self.percentile(50), 'p95': self.percentile(95)}
+
+
+class PriceProvider:
+    """
+    แหล่งราคา 1 แหล่ง: fetch(ids) ยิง 1 batch คืน dict id ของแหล่งนี้ -> ราคา USD
+    แต่ละ Asset บอก id ของตัวเองต่อแหล่งใน asset.provider_ids (ไม่มี id = แหล่งนี้ไม่มีสินทรัพย์นั้น)
+    """
+    name = 'provider'
+
+    def __init__(self):
+        self.stats = ProviderStats()
+
+    def fetch(self, ids):
+        raise NotImplementedError
+
+    def cached(self, ids):
+        """ราคาที่แหล่งนี้มีอยู่แล้วโดยไม่ต้องยิง upstream (None = ไม่มี)"""
+        return None
+
+    def timed_fetch(self, ids):
+        quotes = self.cached(ids)
+        if quotes is not None:
+            # cache hit ไม่ใช่ latency ของ upstream: ถ้านับด้วย p95 จะต่ำเกินจริงและยิงแหล่งสำรองเร็วเกินไป
+            self.stats.record_cached()
+            return quotes
+        started = time.monotonic()
+        try:
+            with span('upstream_seconds', endpoint=self.name):
+                quotes = self.fetch(ids)
+        except Exception:
+            self.stats.record(time.monotonic() - started, False)
+            inc('upstream_errors_total', endpoint=self.name)
+            raise
+        self.stats.record(time.monotonic() - started, bool(quotes))
+        if not quotes:
+            inc('upstream_errors_total', endpoint=self.name)
+        return quotes
+
+    def hedge_delay(self):
+        """รอแหล่งนี้ไม่เกิน p95 ของ latency ที่ผ่านมา แล้วค่อยยิงแหล่งสำรอง"""
+        if len(self.stats.latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT
+        return min(max(self.stats.percentile(95), HEDGE_MIN), HEDGE_MAX)
+
+
+class CoinGeckoProvider(PriceProvider):
+    """simple/price แบบ batch ผ่าน scheduler กลาง (+ ResponseCache บนดิสก์ข้าม restart)"""
+    name = 'coingecko'
+
+    def __init__(self, cache=None, ttl=0, **kwargs):
+        super().__init__()
+        self.cache = cache
+        self.ttl = ttl
+        self.kwargs = kwargs   # priority / timeout ส่งต่อให้ fetch_simple_prices
+
+    def cached(self, ids):
+        return cached_quotes(ids, self.cache, self.ttl)
+
+    def fetch(self, ids):
+        return fetch_quotes(ids, self.cache, 0, **self.kwargs)   # cached() เช็กแล้ว: ยิงจริงแล้วบันทึกลง cache
+
+
+class BinanceProvider(PriceProvider):
+    """ticker/price ของ Binance: ทุกคู่เหรียญใน 1 request (id = symbol ของคู่ เช่น BTCUSDT, PAXGUSDT)"""
+    name = 'binance'
+
+    def __init__(self, base_url=BINANCE_API_URL, timeout=10):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def fetch(self, ids):
+        symbols = '[' + ','.join(f'"{s}"' for s in sorted(set(ids))) + ']'
+        response = http_get(f'{self.base_url}/api/v3/ticker/price', params={'symbols': symbols}, timeout=self.timeout)
+        if response.status_code != 200:
+            raise Exception(f'binance ticker/price returned {response.status_code}')
+        return {row['symbol']: float(row['price']) for row in response.json()}
+
+
+def valid_price(value):
+    return isinstance(value, (int, float)) and math.isfinite(value) and value > 0
+
+
+class PriceRouter:
+    """
+    🛣️ ราคาล่าสุดของทุกสินทรัพย์จากหลายแหล่ง (เรียงตามลำดับความสำคัญ)
+    - ยิงแหล่งแรกเป็น batch เดียว ถ้ายังไม่ตอบภายใน p95 ของมันเอง (หรือ error) ค่อยยิงแหล่งถัดไป
+      เฉพาะสินทรัพย์ที่ยังไม่ได้ราคา (hedged request) -> ราคาที่ถูกต้องตัวแรกของแต่ละสินทรัพย์ชนะ
+    - แหล่งที่ตอบช้าไม่ถูกยกเลิก แต่ผลที่มาหลังจากได้ราคาครบแล้วจะไม่ถูกใช้
+    """
+
+    def __init__(self, providers, timeout=10):
+        self.providers = list(providers)
+        self.by_name = {p.name: p for p in self.providers}
+        self.timeout = timeout
+
+    def quote(self, assets):
+        """assets: Asset ที่มีแหล่งราคา -> dict symbol -> ราคา (เฉพาะตัวที่ได้ราคาก่อน timeout)"""
+        missing = {a.symbol: a for a in assets}
+        quotes = {}
+        queue = [p for p in self.providers if any(p.name in a.provider_ids for a in assets)]
+        pending = {}
+        deadline = time.monotonic() + self.timeout
+        hedge_at = 0.0
+
+        while missing:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if queue and (not pending or now >= hedge_at):
+                provider = queue.pop(0)
+                wanted = {a.provider_ids[provider.name]: a.symbol for a in missing.values()
+                          if provider.name in a.provider_ids}
+                if not wanted:
+                    continue
+                if quotes or pending:
+                    provider.stats.record_hedge()
+                pending[submit(provider.timed_fetch, list(wanted))] = (provider, wanted)
+                hedge_at = now + provider.hedge_delay()
+            if not pending:
+                break
+            wake = min(hedge_at, deadline) if queue else deadline
+            done, _ = wait(pending, timeout=max(0.0, wake - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, wanted = pending.pop(future)
+                if future.exception() is not None:
+                    continue
+                wins = 0
+                for provider_id, price in future.result().items():
+                    symbol = wanted.get(provider_id)
+                    if symbol in missing and valid_price(price):
+                        quotes[symbol] = float(price)
+                        del missing[symbol]
+                        wins += 1
+                provider.stats.record_wins(wins)
+            if done and missing:
+                hedge_at = 0.0   # แหล่งที่ตอบแล้วขาดบางตัว / error: ยิงแหล่งถัดไปทันที ไม่ต้องรอ p95
+        return quotes
+
+    def stats(self):
+        return {p.name: p.stats.as_dict() for p in self.providers}
@@ -0,0 +1,184 @@
+# ========================================
+# COINGECKO REQUEST SCHEDULER (TOKEN BUCKET + COALESCING + PRIORITY)
+# ========================================
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from http_client import http_get
+
+# base URL ของ CoinGecko (ชี้ไป stub server ในเครื่องได้ตอนทดสอบ / benchmark)
+COINGECKO_API_URL = os.environ.get('COINGECKO_API_URL', 'https://api.coingecko.com/api/v3').rstrip('/')
+COINGECKO_RATE_PER_MIN = 10   # free tier: เผื่อไว้ต่ำกว่าโควต้าจริง
+COINGECKO_BURST = 5
+RETRY_AFTER_DEFAULT = 60      # วินาที: หยุดยิงถ้าโดน 429 โดยไม่มี Retry-After
+SCHEDULER_WORKERS = 4         # thread ยิง HTTP ของ scheduler เอง (แยกจาก pool กลางที่ผู้เรียกนั่งรอผลอยู่)
+
+# ตัวเลขน้อย = สำคัญกว่า
+PRIORITY_LIVE_PRICE = 0
+PRIORITY_MARKETS = 10
+PRIORITY_BACKGROUND = 20
+
+
+class TokenBucket:
+    """token bucket แบบคลาสสิก: เติม `rate` token ต่อวินาที เก็บได้ไม่เกิน `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self):
+        """ต้องรออีกกี่วินาทีถึงจะมี 1 token (0 = ใช้ได้เลย)"""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def drain(self):
+        self.tokens = 0.0
+        self.updated_at = time.monotonic()
+
+
+class RequestScheduler:
+    """
+    🚦 คิวกลางของทุก request ไป host เดียวกัน (CoinGecko)
+    - token bucket คุมอัตรารวมของทั้ง process ให้อยู่ใต้โควต้า
+    - request ที่ url/params เหมือนกันและยังค้างอยู่ ใช้ผลลัพธ์ (Future) เดียวกัน
+    - คิวเรียงตาม priority: ราคาสดมาก่อน Top 10 และงานเบื้องหลัง
+    - โดน 429 -> หยุดยิงตาม Retry-After ทั้ง process
+    - ยิงบน thread pool ของตัวเอง: ผู้เรียกที่รอผลอยู่บน pool กลาง (SWRCache / PriceRouter / Backfiller)
+      เต็มทุก worker แล้ว request ในคิวก็ยังได้ยิง
+    - request ที่รอคิวจนเกิน timeout ของผู้เรียกทุกคนแล้ว ถูกทิ้งโดยไม่ใช้ token (ไม่มีใครรอผลแล้ว)
+    """
+
+    def __init__(self, rate_per_min=COINGECKO_RATE_PER_MIN, burst=COINGECKO_BURST):
+        self.bucket = TokenBucket(rate_per_min / 60.0, burst)
+        self._queue = []
+        self._inflight = {}
+        self._deadlines = {}   # key -> เวลาที่ผู้เรียกคนสุดท้ายเลิกรอ (monotonic)
+        self._executor = ThreadPoolExecutor(max_workers=SCHEDULER_WORKERS, thread_name_prefix='coingecko-http')
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._paused_until = 0.0
+        self.metrics = {
+            'requests': 0,        # request ที่ยิงออกไปจริง
+            'coalesced': 0,       # request ที่แชร์ผลกับตัวที่ค้างอยู่
+            'throttled': 0,       # request ที่ต้องรอ token
+            'rate_limited': 0,    # จำนวนครั้งที่โดน 429
+            'errors': 0,
+            'expired': 0,         # request ที่ถูกทิ้งเพราะผู้เรียกเลิกรอก่อนถึงคิว
+            'max_queue': 0,
+            'wait_seconds': 0.0,  # เวลารอในคิวรวม
+        }
+        self._thread = threading.Thread(target=self._dispatch, name='coingecko-scheduler', daemon=True)
+        self._thread.start()
+
+    def request(self, url, params=None, priority=PRIORITY_MARKETS, timeout=10):
+        """ส่ง request เข้าคิว คืน Future ของ Response"""
+        key = (url, tuple(sorted((params or {}).items())))
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.metrics['coalesced'] += 1
+                self._deadlines[key] = max(self._deadlines.get(key, 0.0), deadline)
+                return future
+            future = Future()
+            self._inflight[key] = future
+            self._deadlines[key] = deadline
+            heapq.heappush(self._queue, (priority, next(self._seq), time.monotonic(), key, url, params, timeout))
+            self.metrics['max_queue'] = max(self.metrics['max_queue'], len(self._queue))
+            self._cond.notify()
+        return future
+
+    def get(self, url, params=None, priority=PRIORITY_MARKETS, timeout=10):
+        """แบบรอผล: คืน Response (raise TimeoutError ถ้ารอคิว + ดึงข้อมูลเกิน timeout)"""
+        return self.request(url, params, priority, timeout).result(timeout=timeout)
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                waited = False
+                while True:
+                    delay = max(self.bucket.wait_time(), self._paused_until - time.monotonic())
+                    if delay <= 0:
+                        break
+                    waited = True
+                    self._cond.wait(delay)
+                # หยิบตัวที่สำคัญที่สุด ณ ตอนที่มี token (อาจมีตัวใหม่แทรกเข้ามาระหว่างรอ)
+                priority, _, queued_at, key, url, params, timeout = heapq.heappop(self._queue)
+                if time.monotonic() >= self._deadlines.get(key, 0.0):
+                    # ทุกคนที่รอ request นี้ timeout ไปแล้ว: ไม่ยิง ไม่เสียโควต้า
+                    future = self._inflight.pop(key, None)
+                    self._deadlines.pop(key, None)
+                    self.metrics['expired'] += 1
+                    if future is not None:
+                        future.set_exception(TimeoutError(f'{url} expired in the CoinGecko queue'))
+                    continue
+                self.bucket.take()
+                self.metrics['requests'] += 1
+                self.metrics['throttled'] += int(waited)
+                self.metrics['wait_seconds'] += time.monotonic() - queued_at
+            self._executor.submit(self._execute, key, url, params, timeout)
+
+    def _execute(self, key, url, params, timeout):
+        with self._cond:
+            future = self._inflight[key]
+        try:
+            response = http_get(url, params=params, timeout=timeout)
+        except Exception as e:
+            with self._cond:
+                self.metrics['errors'] += 1
+                self._inflight.pop(key, None)
+                self._deadlines.pop(key, None)
+            future.set_exception(e)
+            return
+
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            pause = float(retry_after) if retry_after and retry_after.isdigit() else RETRY_AFTER_DEFAULT
+            with self._cond:
+                self.metrics['rate_limited'] += 1
+                self._paused_until = time.monotonic() + pause
+                self.bucket.drain()
+        with self._cond:
+            self._inflight.pop(key, None)
+            self._deadlines.pop(key, None)
+        future.set_result(response)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_coingecko_scheduler():
+    """scheduler ตัวเดียวต่อ process สำหรับทุก request ไป api.coingecko.com"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler()
+    return _scheduler
+
+
+def coingecko_get(url, params=None, priority=PRIORITY_MARKETS, timeout=10):
+    """GET ไป CoinGecko ผ่าน scheduler กลาง (คืน Response แบบเดียวกับ http_get)"""
+    return get_coingecko_scheduler().get(url, params=params, priority=priority, timeout=timeout)
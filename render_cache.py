@@ -0,0 +1,82 @@
+# ========================================
+# SHARED RENDER CACHE (LRU ข้าม SESSION)
+# ========================================
+import threading
+from collections import OrderedDict
+
+RENDER_CACHE_ENTRIES = 256              # จำนวนชิ้นสูงสุด (กราฟ + กล่องวิเคราะห์)
+RENDER_CACHE_BYTES = 64 * 1024 * 1024   # ขนาดรวมโดยประมาณ (ความยาว JSON / HTML)
+
+
+class RenderCache:
+    """
+    🧊 cache กลางของผลการวาดที่เหมือนกันทุกผู้ชม (figure + JSON, HTML กล่องสัญญาณ)
+    key ต้องมี timestamp ของ tick ล่าสุด -> tick ใหม่ = key ใหม่ ของเก่าถูกไล่ออกแบบ LRU
+    จำกัดทั้งจำนวนชิ้นและขนาดรวม ผู้ชมกี่คนก็สร้างแค่ 1 ครั้งต่อ (key, tick)
+    """
+
+    def __init__(self, max_entries=RENDER_CACHE_ENTRIES, max_bytes=RENDER_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (value, size)
+        self._building = {}             # key -> Event ของ thread ที่กำลังสร้างอยู่
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.metrics = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get_or_build(self, key, build, size=len):
+        """
+        คืนค่าจาก cache หรือเรียก build() ครั้งเดียว (session อื่นที่ขอ key เดียวกันพร้อมกันจะรอผลนี้)
+        size(value) = ขนาดโดยประมาณเป็น byte ที่ใช้คุมหน่วยความจำ
+        """
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.metrics['hits'] += 1
+                    return self._entries[key][0]
+                waiting = self._building.get(key)
+                if waiting is None:
+                    self._building[key] = threading.Event()
+                    self.metrics['misses'] += 1
+                    break
+            waiting.wait()
+            # ถ้าตัวที่สร้างล้มเหลว (ไม่มีค่าใน cache) วนกลับมาสร้างเอง
+
+        try:
+            value = build()
+            self._put(key, value, size(value))
+            return value
+        finally:
+            with self._lock:
+                self._building.pop(key).set()
+
+    def _put(self, key, value, nbytes):
+        with self._lock:
+            if nbytes > self.max_bytes:
+                return   # ชิ้นใหญ่เกินงบทั้งก้อน: ใช้ครั้งเดียวไม่เก็บ
+            self._entries[key] = (value, nbytes)
+            self.bytes += nbytes
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, old) = self._entries.popitem(last=False)
+                self.bytes -= old
+                self.metrics['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CachedFigure:
+    """figure ของ Plotly ที่ serialize เป็น JSON ไว้แล้ว (ห้ามแก้ไข: ทุก session ใช้ object เดียวกัน)"""
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.json = figure.to_json()
+
+    def __len__(self):
+        return len(self.json)
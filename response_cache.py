@@ -0,0 +1,119 @@
+# ========================================
+# PERSISTENT RESPONSE CACHE (SQLITE ข้าม RESTART)
+# ========================================
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# หลาย replica (SHARED_STATE_FILE): ใช้ไฟล์กลางเดียวกัน -> ข้อมูลตลาดที่ replica หนึ่งดึงมา ตัวอื่นใช้ต่อได้
+RESPONSE_CACHE_FILE = os.environ.get('RESPONSE_CACHE_FILE') or os.environ.get('SHARED_STATE_FILE', 'crypto_cache.sqlite')
+RESPONSE_CACHE_BYTES = 32 * 1024 * 1024   # ขนาดรวมสูงสุดของข้อมูลใน cache
+RESPONSE_CACHE_MAX_AGE = 7 * 86400        # ข้อมูลเก่ากว่านี้ไม่เอามาแสดงแล้ว (ลบทิ้งตอนอ่าน)
+
+
+class ResponseCache:
+    """
+    💽 cache ผลลัพธ์จาก API บนดิสก์ (SQLite 1 ไฟล์): อยู่รอดข้าม deploy / crash
+    - เก็บ value (JSON) + เวลาที่ดึงมา -> ผู้อ่านรู้อายุข้อมูลจริง (TTL ตัดสินที่ฝั่งผู้อ่าน)
+      ไฟล์ใช้ร่วมกันหลาย process / replica จึงไม่ใช้ pickle (ใครเขียนไฟล์ได้ = รันโค้ดในทุก process ที่อ่านได้)
+      tuple อ่านกลับมาเป็น list, key ของ dict เป็น str เสมอ
+    - ขนาดรวมเกิน max_bytes -> ลบ key ที่ไม่ได้ใช้นานที่สุดก่อน (LRU ตาม accessed_at)
+    - connection เดียวต่อ process ใช้ร่วมทุก thread ผ่าน lock (โหมด WAL: ผู้อ่านไม่ติดผู้เขียน)
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_FILE, max_bytes=RESPONSE_CACHE_BYTES, max_age=RESPONSE_CACHE_MAX_AGE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,'
+            ' fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self.metrics = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'errors': 0}
+
+    def get(self, key):
+        """คืน (value, fetched_at) หรือ None ถ้าไม่มี / เก่าเกิน max_age / อ่านไม่ได้"""
+        try:
+            with self._lock:
+                row = self._db.execute('SELECT value, fetched_at FROM responses WHERE key = ?', (key,)).fetchone()
+                if row is not None and time.time() - row[1] > self.max_age:
+                    self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    row = None
+                if row is None:
+                    self.metrics['misses'] += 1
+                    return None
+                self._db.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (time.time(), key))
+                self.metrics['hits'] += 1
+            return json.loads(row[0]), row[1]
+        except (sqlite3.Error, ValueError):
+            # ไฟล์เสีย / แถวเก่าที่ไม่ใช่ JSON -> ทำเหมือนไม่มี cache (DON'T CRASH!)
+            self.metrics['errors'] += 1
+            return None
+
+    def set(self, key, value, fetched_at=None):
+        """บันทึกค่าล่าสุดของ key (แทนที่ของเดิม) แล้วลบของเก่าจนขนาดรวมไม่เกิน max_bytes"""
+        try:
+            blob = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+        except (TypeError, ValueError):
+            self.metrics['errors'] += 1   # ค่าที่เก็บเป็น JSON ไม่ได้ ไม่บันทึก (แอปยังมีค่าในหน่วยความจำ)
+            return
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO responses (key, value, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                    (key, blob, len(blob), fetched_at or now, now))
+                self.metrics['writes'] += 1
+                self._evict()
+        except sqlite3.Error:
+            self.metrics['errors'] += 1
+
+    def _evict(self):
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute('SELECT key, size FROM responses ORDER BY accessed_at').fetchall():
+            self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self.metrics['evictions'] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def size(self):
+        """(จำนวน key, ขนาดรวม bytes) - อ่านไฟล์ไม่ได้คืน (0, 0)"""
+        try:
+            with self._lock:
+                return self._db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        except sqlite3.Error:
+            self.metrics['errors'] += 1
+            return 0, 0
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """ResponseCache ตัวเดียวต่อ process (เปิดไฟล์ไม่ได้ -> None: แอปทำงานต่อแบบ cache ในหน่วยความจำอย่างเดียว)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = ResponseCache()
+                except sqlite3.Error:
+                    return None
+    return _cache
@@ -0,0 +1,146 @@
+# ========================================
+# TIERED RETENTION (RAW TICKS -> 1m / 5m / 1h / 1d OHLC)
+# ========================================
+import numpy as np
+
+from price_store import PriceStore
+
+# (ชื่อ, ขนาด bucket เป็นวินาที, จำนวน bucket ที่เก็บ)
+RESOLUTIONS = [
+    ('1m', 60, 7 * 1440),      # 7 วัน
+    ('5m', 300, 30 * 288),     # 30 วัน
+    ('1h', 3600, 365 * 24),    # 1 ปี
+    ('1d', 86400, 10 * 365),   # 10 ปี
+]
+OHLC_FIELDS = ('open', 'high', 'low', 'close')
+
+
+def merge_ohlc(partial, ohlc):
+    """รวม OHLC ใหม่เข้ากับ bucket ที่ยังไม่ปิด (array shape (n_assets, 4)) - ข้าม NaN"""
+    if partial is None:
+        return ohlc.copy()
+    merged = partial.copy()
+    missing_open = np.isnan(merged[:, 0])
+    merged[missing_open, 0] = ohlc[missing_open, 0]
+    merged[:, 1] = np.fmax(merged[:, 1], ohlc[:, 1])
+    merged[:, 2] = np.fmin(merged[:, 2], ohlc[:, 2])
+    has_close = ~np.isnan(ohlc[:, 3])
+    merged[has_close, 3] = ohlc[has_close, 3]
+    return merged
+
+
+class RollupTier:
+    """ชั้นข้อมูล 1 ระดับ: bucket ที่ปิดแล้วอยู่ใน PriceStore (ring buffer) + bucket ปัจจุบันในหน่วยความจำ"""
+
+    def __init__(self, path, name, seconds, capacity, assets):
+        self.name = name
+        self.seconds = seconds
+        self.assets = list(assets)
+        self.fields = [f'{a}_{f}' for a in self.assets for f in OHLC_FIELDS]
+        self.store = PriceStore(path, self.fields, capacity=capacity)
+        self.partial = None
+        self.partial_start = None
+
+    def bucket_start(self, ts):
+        return int(ts) - int(ts) % self.seconds
+
+    def closed_until(self):
+        """เวลาสิ้นสุดของ bucket ล่าสุดที่ปิดแล้ว (ข้อมูลก่อนหน้านี้ถูก rollup ไปแล้ว)"""
+        last = self.store.last()
+        return None if last is None else int(last['ts']) + self.seconds
+
+    def add(self, ts, ohlc):
+        """เพิ่มข้อมูล 1 จุด คืน (start, ohlc) ของ bucket ที่เพิ่งปิด หรือ None"""
+        start = self.bucket_start(ts)
+        closed = None
+        if self.partial is not None and start != self.partial_start:
+            closed = (self.partial_start, self.partial)
+            self.append_closed(self.partial_start, self.partial)
+            self.partial = None
+        self.partial = merge_ohlc(self.partial, ohlc)
+        self.partial_start = start
+        return closed
+
+    def append_closed(self, start, ohlc):
+        """บันทึก bucket ที่ปิดแล้ว (ohlc shape (n_assets, 4)) - จาก add() หรือแท่งที่ leader ปิดไว้ในไฟล์กลาง"""
+        self.store.append(start, dict(zip(self.fields, np.ravel(ohlc))))
+
+    def records_ohlc(self, records):
+        """แปลง records ของ tier นี้ -> array shape (n, n_assets, 4)"""
+        return np.stack([records[f] for f in self.fields], axis=-1).reshape(len(records), len(self.assets), 4)
+
+    def closes(self, include_partial=True):
+        """(ts, close matrix แถว=เวลา column=สินทรัพย์) สำหรับกราฟ/ตัวชี้วัด"""
+        view = self.store.view()
+        ts = view['ts']
+        closes = np.column_stack([view[f'{a}_close'] for a in self.assets]) if len(view) else np.empty((0, len(self.assets)))
+        if include_partial and self.partial is not None:
+            ts = np.append(ts, self.partial_start)
+            closes = np.vstack([closes, self.partial[:, 3]])
+        return ts, closes
+
+    def clear(self):
+        self.store.clear()
+        self.partial = None
+        self.partial_start = None
+
+
+class RetentionEngine:
+    """
+    🗄️ เก็บประวัติหลายระดับแบบขนาดจำกัด:
+    tick ดิบ (PriceStore หลัก) -> 1m -> 5m -> 1h -> 1d OHLC
+    - ต่อ tick: อัปเดต bucket 1m ในหน่วยความจำ O(1) เขียนไฟล์เฉพาะตอน bucket ปิด
+    - bucket ที่ปิดจะไหลขึ้นชั้นถัดไปทันที (cascade) ทุกชั้นเป็น ring buffer ขนาดคงที่
+    - เริ่ม server ใหม่: สร้าง bucket ที่ยังไม่ปิดของแต่ละชั้นจากข้อมูลชั้นล่าง (rebuild)
+    """
+
+    def __init__(self, path_prefix, assets, resolutions=RESOLUTIONS):
+        self.assets = list(assets)
+        self.tiers = [
+            RollupTier(f'{path_prefix}_{name}.bin', name, seconds, capacity, self.assets)
+            for name, seconds, capacity in resolutions
+        ]
+        self.by_name = {t.name: t for t in self.tiers}
+
+    def _cascade(self, level, ts, ohlc):
+        closed_all = []
+        while level < len(self.tiers):
+            closed = self.tiers[level].add(ts, ohlc)
+            if closed is None:
+                break
+            closed_all.append((self.tiers[level], *closed))
+            ts, ohlc = closed
+            level += 1
+        return closed_all
+
+    def add_tick(self, ts, prices):
+        """ใส่ tick ดิบ 1 จุด (prices: dict ชื่อสินทรัพย์ -> ราคา) คืน list ของ (tier, เวลาเริ่ม, ohlc) ที่เพิ่งปิด"""
+        p = np.array([prices.get(a, np.nan) for a in self.assets], dtype='f8')
+        return self._cascade(0, ts, np.repeat(p[:, None], 4, axis=1))
+
+    def rebuild(self, raw_records):
+        """
+        สร้าง bucket ที่ยังไม่ปิดของทุกชั้นใหม่ (หลัง restart)
+        ไล่จากชั้นล่างขึ้นบน: แต่ละชั้น replay เฉพาะข้อมูลชั้นล่างที่ยังไม่ถูก rollup
+        """
+        for level, tier in enumerate(self.tiers):
+            tier.partial = None
+            tier.partial_start = None
+            since = tier.closed_until()
+            if level == 0:
+                src = raw_records
+                if since is not None:
+                    src = src[src['ts'] >= since]
+                ohlc = np.stack([np.column_stack([src[a]] * 4) for a in self.assets], axis=1) if len(src) else []
+            else:
+                lower = self.tiers[level - 1]
+                src = lower.store.view()
+                if since is not None:
+                    src = src[src['ts'] >= since]
+                ohlc = lower.records_ohlc(src) if len(src) else []
+            for i in range(len(src)):
+                tier.add(src['ts'][i], ohlc[i])   # ไม่ cascade: ชั้นบนจะอ่านจาก store ของชั้นนี้เอง
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
@@ -0,0 +1,289 @@
+# ========================================
+# SHARED STATE (หลาย REPLICA: SQLITE WAL + LEADER LEASE)
+# ========================================
+import json
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from metrics import inc
+
+SHARED_STATE_FILE = os.environ.get('SHARED_STATE_FILE')   # ไม่ตั้ง = replica เดียว (ทุกอย่างอยู่ในไฟล์ของ process เอง)
+REPLICA_ID = os.environ.get('REPLICA_ID') or f'{socket.gethostname()}-{os.getpid()}'
+LEADER_LEASE = 'collector'
+FOLLOW_INTERVAL = 1.0     # วินาที: follower อ่าน tick ใหม่จากไฟล์กลางถี่เท่านี้ (อ่านอย่างเดียว ไม่ติด lock ผู้เขียน)
+REFRESH_LEASE = 60        # วินาที: สิทธิ์ดึงข้อมูลตลาดใหม่ของ replica เดียว (นานกว่า timeout ของ request)
+# โฟลเดอร์ไฟล์ local ของ replica นี้ (ไม่ตั้ง = replicas/<REPLICA_ID>) - ใช้เมื่อมีหลาย replica เท่านั้น
+REPLICA_DATA_DIR = os.environ.get('REPLICA_DATA_DIR')
+
+
+def replica_path(path, shared_file=SHARED_STATE_FILE, replica_id=REPLICA_ID, data_dir=REPLICA_DATA_DIR):
+    """
+    path ของไฟล์ที่มีผู้เขียนได้คนเดียว (ring buffer ราคา / แท่ง OHLC / alert log) สำหรับ replica นี้
+    replica เดียว: path เดิม | หลาย replica บนเครื่องเดียวกัน: แยกโฟลเดอร์ต่อ replica ไม่งั้นทุกตัวเขียนไฟล์เดียวกัน
+    (REPLICA_ID ค่าเริ่มต้นเปลี่ยนทุกครั้งที่ restart - ตั้งค่าคงที่ถ้าอยากใช้ไฟล์เดิมต่อ แต่ follower sync จากไฟล์กลางได้อยู่แล้ว)
+    """
+    if not shared_file:
+        return path
+    directory = data_dir or os.path.join('replicas', re.sub(r'[^\w.-]', '_', replica_id))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, os.path.basename(path))
+
+
+class SharedState:
+    """
+    🗃️ สถานะกลางของทุก replica หลัง load balancer: ไฟล์ SQLite 1 ไฟล์ (โหมด WAL) บน volume ที่ทุก replica เห็น
+    - ticks: tick ดิบล่าสุด (ตัวเดียวกับ ring buffer ของ leader) / bars: แท่ง OHLC ที่ปิดแล้วของทุกชั้น
+    - leases: สิทธิ์แบบมีวันหมดอายุ -> leader ที่ดึงราคามีได้ทีละ replica, ตายไปแล้ว replica อื่นรับช่วงเอง
+    - generation: เพิ่มทุกครั้งที่ประวัติถูกเขียนใหม่ทั้งชุด (reset / เติมย้อนหลัง) -> follower sync ใหม่ทั้งหมด
+    - alert_rules: กฎแจ้งเตือนของทุกผู้ใช้ (เพิ่ม / ลบจาก replica ไหนก็ได้ leader โหลดใหม่เมื่อ rules_version เปลี่ยน)
+    ผู้เขียนคือ leader คนเดียว ผู้อ่าน (follower) อ่านพร้อมกันได้ไม่ติดกัน
+    ⚠️ ใช้กับ volume ในเครื่องเดียวกันเท่านั้น (SQLite WAL ไม่รองรับ network filesystem เช่น NFS)
+    """
+
+    def __init__(self, path=SHARED_STATE_FILE, owner=REPLICA_ID, keep_ticks=None):
+        self.path = path
+        self.owner = owner
+        self.keep_ticks = keep_ticks   # จำนวน tick ดิบที่เก็บ (ตาม capacity ของ store) None = ไม่ตัด
+        self.generation = None         # generation ที่ replica นี้ sync ล่าสุด
+        self.rules_seen = None         # rules_version ที่ AlertEngine ของ replica นี้โหลดไว้ล่าสุด
+        self.request_backfill = None   # leader เรียกเมื่อประวัติกลางสั้น (reset จาก replica อื่น / เพิ่งได้เป็น leader)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS ticks (ts INTEGER PRIMARY KEY, prices TEXT NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS bars ('
+            ' tier TEXT NOT NULL, ts INTEGER NOT NULL, ohlc BLOB NOT NULL, PRIMARY KEY (tier, ts));'
+            'CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS alert_rules (id TEXT PRIMARY KEY, rule TEXT NOT NULL);'
+        )
+        self.metrics = {'published': 0, 'pulled': 0, 'resyncs': 0, 'errors': 0}
+
+    # ---------- leases ----------
+    def acquire(self, name, ttl):
+        """ขอ / ต่ออายุสิทธิ์ name เป็นเวลา ttl วินาที: คืน True ถ้า replica นี้ถือสิทธิ์อยู่หลังเรียก"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute('SELECT owner, expires_at FROM leases WHERE name = ?', (name,)).fetchone()
+            if row is not None and row[0] != self.owner and row[1] > now:
+                return False   # คนอื่นถืออยู่และยังไม่หมดอายุ: อ่านอย่างเดียว ไม่แย่ง write lock
+            # atomic: ได้สิทธิ์เฉพาะถ้ายังเป็นของเราเอง หรือของเดิมหมดอายุแล้ว (กันสอง replica ได้พร้อมกัน)
+            self._db.execute(
+                'INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+                'WHERE leases.owner = excluded.owner OR leases.expires_at <= ?',
+                (name, self.owner, now + ttl, now))
+            return self._db.execute('SELECT changes()').fetchone()[0] > 0
+
+    def release(self, name):
+        with self._lock:
+            self._db.execute('DELETE FROM leases WHERE name = ? AND owner = ?', (name, self.owner))
+
+    def holder(self, name):
+        """replica ที่ถือสิทธิ์ name อยู่ (None = ว่าง / หมดอายุแล้ว)"""
+        with self._lock:
+            row = self._db.execute('SELECT owner, expires_at FROM leases WHERE name = ?', (name,)).fetchone()
+        return row[0] if row is not None and row[1] > time.time() else None
+
+    # ---------- write path (leader) ----------
+    def _bump(self, key):
+        self._db.execute("INSERT INTO meta (key, value) VALUES (?, 1) "
+                         "ON CONFLICT(key) DO UPDATE SET value = value + 1", (key,))
+        return self._db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()[0]
+
+    def _meta(self, key):
+        row = self._db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row is not None else 0
+
+    def _bump_generation(self):
+        self.generation = self._bump('generation')
+
+    def _insert_bars(self, closed):
+        """คืนจำนวนแท่งที่เพิ่มจริง (ที่มีอยู่แล้วถูกข้าม)"""
+        added = 0
+        for tier, ts, ohlc, keep_seconds in closed:
+            added += self._db.execute('INSERT OR IGNORE INTO bars (tier, ts, ohlc) VALUES (?, ?, ?)',
+                                      (tier, int(ts), np.asarray(ohlc, dtype='<f8').tobytes())).rowcount
+            self._db.execute('DELETE FROM bars WHERE tier = ? AND ts < ?', (tier, int(ts) - keep_seconds))
+        return added
+
+    def _trim_ticks(self):
+        if self.keep_ticks:
+            self._db.execute('DELETE FROM ticks WHERE ts < (SELECT ts FROM ticks ORDER BY ts DESC LIMIT 1 OFFSET ?)',
+                             (self.keep_ticks - 1,))
+
+    def publish_tick(self, ts, prices, closed=()):
+        """
+        tick ใหม่ของ leader + แท่งที่ปิดเพราะ tick นี้ ใน transaction เดียว
+        -> follower ที่เห็น tick นี้ย่อมเห็นแท่งที่ปิดก่อนหน้ามันครบเสมอ
+        closed: list ของ (ชื่อชั้น, เวลาเริ่มแท่ง, ohlc array, ช่วงเวลาที่เก็บของชั้นนั้นเป็นวินาที)
+        """
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.execute('INSERT OR REPLACE INTO ticks (ts, prices) VALUES (?, ?)',
+                                 (int(ts), json.dumps(prices)))
+                self._insert_bars(closed)
+                self._trim_ticks()
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self.metrics['published'] += 1
+
+    def publish_history(self, records, columns, closed=(), replace=False):
+        """
+        เขียนประวัติทั้งชุดของ leader (หลังเติมย้อนหลัง / ตอนได้เป็น leader ครั้งแรก) ที่ยังไม่มีในไฟล์กลาง
+        replace=True: แทนที่ tick ทั้งหมด คืนจำนวนแถวที่เพิ่ม - มีอะไรเปลี่ยน = follower ทุกตัว sync ใหม่ทั้งชุด
+        """
+        rows = [(int(r['ts']), json.dumps({c: float(r[c]) for c in columns})) for r in records]
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                if replace:
+                    self._db.execute('DELETE FROM ticks')
+                before = self._db.total_changes
+                self._db.executemany('INSERT OR IGNORE INTO ticks (ts, prices) VALUES (?, ?)', rows)
+                added = self._db.total_changes - before + self._insert_bars(closed)
+                self._trim_ticks()
+                if added:
+                    self._bump_generation()
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        return added
+
+    def reset(self):
+        """ล้างประวัติกลางทั้งหมด (ปุ่ม Reset Data จาก replica ไหนก็ได้) ทุก replica จะล้างของตัวเองตาม"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.execute('DELETE FROM ticks')
+                self._db.execute('DELETE FROM bars')
+                self._bump_generation()
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+
+    # ---------- alert rules (เขียนได้ทุก replica) ----------
+    def _write_rules(self, sql, params):
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.executemany(sql, params)
+                self._bump('rules_version')
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def save_rule(self, rule):
+        """เพิ่ม / แทนที่กฎ 1 ข้อ (dict จาก AlertRule.to_dict())"""
+        self._write_rules('INSERT OR REPLACE INTO alert_rules (id, rule) VALUES (?, ?)',
+                          [(rule['id'], json.dumps(rule, ensure_ascii=False))])
+
+    def delete_rule(self, rule_id):
+        self._write_rules('DELETE FROM alert_rules WHERE id = ?', [(rule_id,)])
+
+    def seed_rules(self, rules):
+        """กฎชุดแรกของไฟล์กลาง (จากไฟล์กฎเดิมของ replica แรก) - ใช้เฉพาะตอนยังไม่เคยมีใครเขียนกฎเลย"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                if self._meta('rules_version') == 0:
+                    self._db.executemany('INSERT OR REPLACE INTO alert_rules (id, rule) VALUES (?, ?)',
+                                         [(r['id'], json.dumps(r, ensure_ascii=False)) for r in rules])
+                    self._bump('rules_version')
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def rules_version(self):
+        with self._lock:
+            return self._meta('rules_version')
+
+    def load_rules(self):
+        """คืน (rules_version, list ของ dict กฎ) ที่อ่านพร้อมกันใน transaction เดียว"""
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                version = self._meta('rules_version')
+                rows = self._db.execute('SELECT rule FROM alert_rules ORDER BY id').fetchall()
+            finally:
+                self._db.execute('COMMIT')
+        return version, [json.loads(row[0]) for row in rows]
+
+    # ---------- read path (follower) ----------
+    def pull(self, since_ts, bars_since):
+        """
+        ของใหม่ตั้งแต่ครั้งก่อน ใน read transaction เดียว (เห็นสถานะเดียวกันทั้งชุด)
+        bars_since: dict ชื่อชั้น -> เวลาเริ่มแท่งล่าสุดที่มีแล้ว (None = เอาทั้งหมด)
+        ถ้า generation เปลี่ยนจากที่ sync ไว้ คืนประวัติทั้งชุดแทน (resync=True)
+        generation 0 = ยังไม่มี leader คนไหนเคยเขียนประวัติ -> ไม่ resync (ไม่ล้างประวัติในเครื่องทิ้ง)
+        คืน dict: generation, resync, ticks [(ts, dict ราคา)], bars {ชั้น: [(ts, bytes)]}
+        """
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                generation = self._meta('generation')
+                resync = generation != self.generation and generation > 0
+                if resync:
+                    since_ts, bars_since = None, {tier: None for tier in bars_since}
+                ticks = self._db.execute('SELECT ts, prices FROM ticks WHERE ts > ? ORDER BY ts',
+                                         (-1 if since_ts is None else int(since_ts),)).fetchall()
+                bars = {tier: self._db.execute('SELECT ts, ohlc FROM bars WHERE tier = ? AND ts > ? ORDER BY ts',
+                                               (tier, -1 if since is None else int(since))).fetchall()
+                        for tier, since in bars_since.items()}
+            finally:
+                self._db.execute('COMMIT')
+            self.generation = generation
+        self.metrics['pulled'] += len(ticks)
+        self.metrics['resyncs'] += resync
+        return {'generation': generation, 'resync': resync,
+                'ticks': [(ts, json.loads(prices)) for ts, prices in ticks], 'bars': bars}
+
+
+class LeaderLease:
+    """
+    👑 ใครเป็นคนดึงราคา: replica ที่ถือ lease อยู่ต่ออายุทุก tick ตัวอื่นเป็น follower
+    leader หายไป (crash / ถูกปิด) -> lease หมดอายุใน ttl วินาที แล้ว follower ตัวแรกที่ขอได้รับช่วงต่อ
+    ttl ต้องยาวกว่ารอบการดึงราคาหลายเท่า (กัน tick ที่ช้าทำให้เสียสิทธิ์)
+    """
+
+    def __init__(self, state, ttl, name=LEADER_LEASE):
+        self.state = state
+        self.ttl = ttl
+        self.name = name
+        self.is_leader = False
+        self.changes = 0
+
+    def refresh(self):
+        """ขอ / ต่ออายุ lease คืน (เป็น leader หรือไม่, เพิ่งได้เป็น leader ในรอบนี้หรือไม่)"""
+        try:
+            held = self.state.acquire(self.name, self.ttl)
+        except sqlite3.Error:
+            # ไฟล์กลางใช้ไม่ได้ชั่วคราว: คงบทบาทเดิมไว้ (leader ดึงราคาเก็บในเครื่องต่อ ไม่หยุดทั้งระบบ)
+            self.state.metrics['errors'] += 1
+            return self.is_leader, False
+        promoted = held and not self.is_leader
+        if held != self.is_leader:
+            self.changes += 1
+            inc('leader_changes_total', role='leader' if held else 'follower')
+        self.is_leader = held
+        return held, promoted
+
+    def release(self):
+        if self.is_leader:
+            self.state.release(self.name)
+            self.is_leader = False
@@ -0,0 +1,96 @@
+# ========================================
+# IMMUTABLE PRICE SNAPSHOT (1 ชุดต่อ TICK ต่อ PROCESS)
+# ========================================
+import os
+import sys
+
+import numpy as np
+
+from price_store import THAI_OFFSET, TIME_FORMAT, format_epoch
+
+
+class PriceSnapshot:
+    """
+    🧊 ประวัติราคา ณ tick หนึ่ง ในรูปแบบ array ล้วน (read-only ทั้งหมด)
+    - ts: epoch วินาที int64 / prices: float64 shape (สินทรัพย์, เวลา) -> ราคาของแต่ละสินทรัพย์ต่อเนื่องใน memory
+    - collector สร้างใหม่ 1 ครั้งต่อ tick ทุก session ถือแค่ reference ของ object เดียวกัน (ไม่ copy)
+    - string เวลาไทย / DataFrame สร้างเฉพาะตอนต้องแสดงหรือ export เท่านั้น
+    """
+
+    def __init__(self, ts, prices, columns, dtype='f8'):
+        self.columns = list(columns)
+        self.index = {c: i for i, c in enumerate(self.columns)}
+        self.ts = np.ascontiguousarray(ts, dtype='<i8')
+        self.prices = np.ascontiguousarray(prices, dtype=dtype)
+        for arr in (self.ts, self.prices):
+            arr.flags.writeable = False
+
+    @classmethod
+    def from_records(cls, records, columns, dtype='f8'):
+        """copy ข้อมูลจาก PriceStore.view() ครั้งเดียว (ring buffer ยังถูกเขียนต่อได้โดยไม่กระทบ snapshot)"""
+        prices = np.empty((len(columns), len(records)), dtype=dtype)
+        for i, c in enumerate(columns):
+            prices[i] = records[c]
+        return cls(records['ts'], prices, columns, dtype)
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def empty(self):
+        return len(self.ts) == 0
+
+    @property
+    def last_ts(self):
+        return int(self.ts[-1]) if len(self.ts) else None
+
+    def last_time_text(self):
+        """เวลาไทยของ tick ล่าสุด (string แบบเดียวกับ CSV เดิม)"""
+        return format_epoch(self.ts[-1]) if len(self.ts) else None
+
+    def column(self, col):
+        """ราคาของสินทรัพย์เดียว (view ต่อเนื่อง ไม่ copy)"""
+        return self.prices[self.index[col]]
+
+    def matrix(self):
+        """price matrix แถว = เวลา column = สินทรัพย์ (view แบบ transpose ไม่ copy) สำหรับตัวชี้วัด"""
+        return self.prices.T
+
+    @property
+    def nbytes(self):
+        return self.ts.nbytes + self.prices.nbytes
+
+    def to_frame(self):
+        """DataFrame แบบเดิม (timestamp เป็น string เวลาไทย) - สร้างใหม่ทุกครั้ง ใช้ตอน export เท่านั้น"""
+        import pandas as pd
+        df = pd.DataFrame({c: self.prices[i] for i, c in enumerate(self.columns)})
+        stamps = pd.to_datetime(self.ts, unit='s') + THAI_OFFSET
+        df.insert(0, 'timestamp', stamps.strftime(TIME_FORMAT))
+        return df
+
+
+def process_rss_bytes():
+    """หน่วยความจำที่ process ใช้อยู่ตอนนี้ (Linux: /proc) หรือค่าสูงสุดที่เคยใช้ (OS อื่น)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:   # Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024   # macOS เป็น byte, Linux เป็น KB
+
+
+def shallow_size(mapping):
+    """ขนาดโดยประมาณของ dict (เช่น st.session_state): object ที่แชร์กันนับแค่ reference"""
+    return sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in mapping.items())
+
+
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f'{n:.0f} {unit}' if unit == 'B' else f'{n:.1f} {unit}'
+        n /= 1024
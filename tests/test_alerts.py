@@ -0,0 +1,150 @@
+import json
+import math
+import random
+
+import pytest
+
+from alerts import AlertEngine, AlertRule, FileSink, LevelIndex, default_rules, load_rules, save_rules
+
+NAN = math.nan
+
+
+def rsi_rule(threshold, direction='both', rule_id=None):
+    return AlertRule('alice', 'BTC', 'rsi_cross', threshold, direction, rule_id=rule_id)
+
+
+def feed(engine, rsis, price=100.0, ma=100.0, start=1):
+    """ใส่ RSI ทีละ tick คืน list ของ (tick, direction, rule_id) ที่ยิง"""
+    out = []
+    for i, rsi in enumerate(rsis, start):
+        out += [(i, e['direction'], e['rule_id']) for e in engine.evaluate(i, {'BTC': (price, ma, rsi)})]
+    return out
+
+
+def test_rsi_crossings_up_and_down_including_exact_touch():
+    engine = AlertEngine([rsi_rule(70, 'up', 'up70'), rsi_rule(30, 'down', 'down30'), rsi_rule(50, rule_id='any50')])
+    fired = feed(engine, [45, 50, 69.9, 70, 40, 30, 29.9])
+    assert fired == [
+        (2, 'up', 'any50'),      # 45 -> 50 แตะพอดี = ตัดขึ้น
+        (4, 'up', 'up70'),       # 69.9 -> 70 แตะพอดี
+        (5, 'down', 'any50'),    # 70 -> 40
+        (7, 'down', 'down30'),   # 30 -> 29.9 (40 -> 30 แค่แตะ: ลงต้องต่ำกว่าระดับ)
+    ]
+
+
+def test_down_cross_fires_only_below_the_level():
+    """ลง: cur < level <= prev - แตะ 30 จากข้างบนยังไม่ยิง ต้องต่ำกว่า 30"""
+    engine = AlertEngine([rsi_rule(30, 'down', 'down30')])
+    assert feed(engine, [40, 30, 29.9]) == [(3, 'down', 'down30')]
+
+
+def test_up_cross_fires_on_touch():
+    """ขึ้น: prev < level <= cur - แตะ 70 จากข้างล่างยิงทันที"""
+    engine = AlertEngine([rsi_rule(70, 'up', 'up70')])
+    assert feed(engine, [60, 70, 75]) == [(2, 'up', 'up70')]
+
+
+def test_no_refire_until_rearmed():
+    engine = AlertEngine([rsi_rule(70, 'up', 'up70')])
+    fired = feed(engine, [60, 72, 75, 71, 80, 72])   # อยู่เหนือ 70 ตลอด: ยิงครั้งเดียว
+    assert fired == [(2, 'up', 'up70')]
+    fired = feed(engine, [65, 66, 71], start=7)      # ลงไปต่ำกว่า 70 ก่อน (re-arm) แล้วขึ้นใหม่
+    assert fired == [(9, 'up', 'up70')]
+
+
+def test_nan_and_stale_ticks_do_not_fire():
+    engine = AlertEngine([rsi_rule(50, rule_id='r')])
+    assert feed(engine, [40, NAN, 60]) == []          # ข้ามช่วง NaN ไม่นับเป็นการตัด
+    assert engine.evaluate(3, {'BTC': (100.0, 100.0, 20.0)}) == []   # ts ไม่ใหม่กว่าเดิม
+    engine.reset()
+    assert engine.evaluate(3, {'BTC': (100.0, 100.0, 20.0)}) == []   # จุดเริ่มใหม่หลัง reset
+
+
+def test_ma_cross_and_signal_change():
+    classify = lambda price, ma, rsi: ('ขึ้น', 'signal-green') if price > ma else ('ลง', 'signal-red')
+    rules = [AlertRule('bob', 'BTC', 'ma_cross', direction='down', rule_id='ma-down'),
+             AlertRule('bob', 'BTC', 'signal_change', target='signal-green', rule_id='to-green')]
+    engine = AlertEngine(rules, classify=classify)
+    ticks = [(105, 100), (99, 100), (101, 100), (98, 100)]
+    fired = [(i, e['rule_id']) for i, (p, ma) in enumerate(ticks, 1) for e in engine.evaluate(i, {'BTC': (p, ma, 50.0)})]
+    assert fired == [(2, 'ma-down'), (3, 'to-green'), (4, 'ma-down')]
+
+
+def brute_force(rules, prev, cur):
+    if cur > prev:
+        return 'up', sorted((r for r in rules if prev < r.threshold <= cur), key=lambda r: r.threshold)
+    if cur < prev:
+        return 'down', sorted((r for r in rules if cur < r.threshold <= prev), key=lambda r: r.threshold)
+    return None, []
+
+
+def test_level_index_stays_in_sync_after_add_and_remove():
+    rng = random.Random(1)
+    index, live = LevelIndex(), []
+    for step in range(500):
+        if live and rng.random() < 0.4:
+            rule = live.pop(rng.randrange(len(live)))
+            index.remove(rule)
+        else:
+            rule = rsi_rule(rng.choice([20, 30, 30, 50, 70, 70.5]) + rng.randint(0, 3))
+            index.add(rule)
+            live.append(rule)
+        assert index.levels == sorted(index.levels) and len(index) == len(live)
+        assert [r.threshold for r in index.rules] == index.levels
+        prev, cur = rng.uniform(0, 100), rng.uniform(0, 100)
+        direction, crossed = index.crossed(prev, cur)
+        expected_direction, expected = brute_force(live, prev, cur)
+        assert direction == expected_direction
+        assert sorted(map(id, crossed)) == sorted(map(id, expected))
+
+
+def test_engine_add_replace_and_remove_keep_indexes_in_sync():
+    engine = AlertEngine([rsi_rule(50, rule_id='a'), rsi_rule(60, rule_id='b')])
+    engine.add(rsi_rule(55, rule_id='a'))             # id เดิม: แทนที่ ไม่ซ้อน
+    engine.remove('b')
+    engine.remove('missing')
+    assert [r.rule_id for r in engine.rules()] == ['a'] and len(engine._rsi['BTC']) == 1
+    assert feed(engine, [40, 65]) == [(2, 'up', 'a')]
+
+    engine.replace_rules([rsi_rule(30, rule_id='c'), AlertRule('bob', 'BTC', 'ma_cross', rule_id='m')])
+    assert sorted(r.rule_id for r in engine.rules()) == ['c', 'm'] and len(engine._rsi['BTC']) == 1
+    assert feed(engine, [20], start=3) == [(3, 'down', 'c')]   # ค่าก่อนหน้ายังอยู่หลัง replace
+    assert [r.rule_id for r in engine.rules('bob')] == ['m']
+
+
+def test_save_and_load_rules_round_trip(tmp_path):
+    path = str(tmp_path / 'rules.json')
+    rules = default_rules(['BTC']) + [AlertRule('ผู้ใช้', 'ETH', 'signal_change', target='signal-red')]
+    save_rules(rules, path)
+    loaded = load_rules(path)
+    assert [r.to_dict() for r in loaded] == [r.to_dict() for r in rules]
+
+    assert [r.rule_id for r in load_rules(str(tmp_path / 'missing.json'), ['SOL'])][0] == 'default-SOL-rsi30'
+    (tmp_path / 'broken.json').write_text('[{"owner": "x"}]')
+    assert len(load_rules(str(tmp_path / 'broken.json'), ['SOL'])) == 4   # ไฟล์เสีย -> กฎพื้นฐาน
+
+
+def test_file_sink_appends_json_lines(tmp_path):
+    path = tmp_path / 'alerts.jsonl'
+    engine = AlertEngine([rsi_rule(50, rule_id='r')], [FileSink(str(path))])
+    feed(engine, [40, 60, 40])
+    lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [(e['ts'], e['direction'], e['rule_id'], e['owner'], e['asset']) for e in lines] == [
+        (2, 'up', 'r', 'alice', 'BTC'), (3, 'down', 'r', 'alice', 'BTC')]
+    assert lines[0]['value'] == 60.0 and 'RSI' in lines[0]['message']
+
+
+def test_failing_sink_does_not_break_evaluation():
+    class Broken:
+        def send(self, events):
+            raise OSError('disk full')
+
+    engine = AlertEngine([rsi_rule(50, rule_id='r')], [Broken()])
+    assert feed(engine, [40, 60]) == [(2, 'up', 'r')]
+    assert engine.metrics['sink_errors'] == 1 and engine.metrics['fired'] == 1
+
+
+def test_rule_ids_are_unique():
+    assert len({AlertRule('a', 'BTC', 'ma_cross').rule_id for _ in range(1000)}) == 1000
+    with pytest.raises(ValueError):
+        AlertRule('a', 'BTC', 'rsi_cross')
@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from backfill import Backfiller, fixture_history, merge_history
+from price_store import PriceStore
+from watchlist import Asset
+
+STEP = 300
+NOW = int(time.time()) // STEP * STEP   # Backfiller ขอช่วง 24 ชม. ก่อนเวลาจริง
+ASSETS = [Asset('BTC', 'Bitcoin', coingecko_id='bitcoin'), Asset('ETH', 'Ethereum', coingecko_id='ethereum')]
+COLUMNS = [a.column for a in ASSETS]
+
+
+@pytest.fixture
+def fixture_dir(tmp_path):
+    """ไฟล์ <coin id>.json รูปแบบ market_chart/range (ms, ราคา) - ทุก 5 นาที 24 ชม. ก่อน NOW (ไม่เรียงเวลา)"""
+    directory = tmp_path / 'fixtures'
+    directory.mkdir()
+    for asset, base in zip(ASSETS, (60000.0, 3000.0)):
+        ts = np.arange(NOW - 86400, NOW + 10 * STEP, STEP)
+        points = [[int(t) * 1000, base + (t - NOW) / STEP] for t in ts]
+        (directory / f'{asset.coingecko_id}.json').write_text(json.dumps({'prices': points[::-1]}))
+    return str(directory)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.bin'), COLUMNS, capacity=400)
+    yield store
+    store.close()
+
+
+def add_ticks(store, start, n):
+    for i in range(n):
+        ts = start + i * 30
+        store.append(ts, {c: float(ts) for c in COLUMNS})
+
+
+def finish(backfiller):
+    backfiller.start()
+    deadline = time.monotonic() + 10
+    while backfiller.state == 'running' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return backfiller
+
+
+def run_backfill(store, fixture_dir):
+    backfiller = finish(Backfiller(ASSETS, COLUMNS, lambda ts, matrix: merge_history(store, ts, matrix, COLUMNS),
+                                   seconds=86400, step=STEP, source=fixture_history(fixture_dir)))
+    assert backfiller.state == 'done', backfiller.errors
+    return backfiller
+
+
+class StubSource:
+    """แหล่งประวัติแทน API: จดว่าถูกขอเหรียญไหนบ้าง, เหรียญใน fail raise"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+
+    def __call__(self, coin_id, start, end):
+        self.calls.append(coin_id)
+        if coin_id in self.fail:
+            raise Exception(f'{coin_id} returned 500')
+        ts = np.arange(int(end) - 3600, int(end), STEP)
+        return ts, np.full(len(ts), 1.0)
+
+
+def test_history_goes_before_existing_ticks_without_duplicates(store, fixture_dir):
+    add_ticks(store, NOW - 5 * STEP, 20)   # tick สดซ้อนกับช่วงท้ายของประวัติ
+    existing = np.array(store.view())
+
+    backfiller = run_backfill(store, fixture_dir)
+    records = store.view()
+    ts = records['ts']
+    assert backfiller.rows_added == len(records) - len(existing)
+    assert (np.diff(ts) > 0).all()                      # เรียงตามเวลา ไม่มีเวลาซ้ำ
+    assert (ts[:backfiller.rows_added] < existing['ts'][0]).all()
+    np.testing.assert_array_equal(records[-len(existing):], existing)   # tick เดิมอยู่ท้ายครบทุกแถว
+    # ราคาย้อนหลังมาจาก fixture ของแต่ละเหรียญ (ไม่สลับ column)
+    first = records[0]
+    assert first['BTC_price'] == 60000.0 + (first['ts'] - NOW) / STEP
+    assert first['ETH_price'] == 3000.0 + (first['ts'] - NOW) / STEP
+
+
+def test_history_is_trimmed_to_free_room_keeping_the_newest(store, fixture_dir):
+    add_ticks(store, NOW, 350)
+    backfiller = run_backfill(store, fixture_dir)
+    ts = store.view()['ts']
+    assert backfiller.rows_added == 50 and len(ts) == store.capacity
+    assert ts[49] == NOW - STEP and ts[0] == NOW - 50 * STEP
+
+    # store เต็มแล้ว: รอบถัดไปไม่มีอะไรเพิ่ม
+    assert run_backfill(store, fixture_dir).rows_added == 0
+    np.testing.assert_array_equal(store.view()['ts'], ts)
+
+
+def test_lock_free_readers_never_see_a_partial_store(store, fixture_dir):
+    add_ticks(store, NOW, 100)
+    before = store.view()
+    copy = np.array(before)
+    seen, stop = [], threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            view = store.view()
+            seen.append((len(view), bool((np.diff(view['ts']) > 0).all()), int(view['ts'][-1])))
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        run_backfill(store, fixture_dir)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert seen
+    assert all(n in (100, len(store)) and ordered and last == copy['ts'][-1] for n, ordered, last in seen)
+    np.testing.assert_array_equal(before, copy)   # view ที่หยิบไปก่อน merge ไม่ถูกเขียนทับ
+    reopened = PriceStore.open_readonly(store.path)
+    np.testing.assert_array_equal(reopened.view(), store.view())
+    reopened.close()
+
+
+def test_partial_failure_keeps_the_assets_that_loaded():
+    applied = []
+    source = StubSource(fail={'ethereum'})
+    backfiller = finish(Backfiller(ASSETS, COLUMNS, lambda ts, matrix: applied.append(matrix) or len(ts),
+                                   seconds=3600, step=STEP, source=source))
+    assert backfiller.state == 'done'
+    assert list(backfiller.errors) == ['ETH'] and 'ethereum' in str(backfiller.errors['ETH'])
+    assert backfiller.rows_added == 12
+    matrix, = applied
+    assert (matrix[:, 0] == 1.0).all() and np.isnan(matrix[:, 1]).all()
+
+
+def test_every_asset_failing_is_failed():
+    applied = []
+    backfiller = finish(Backfiller(ASSETS, COLUMNS, lambda ts, matrix: applied.append(matrix),
+                                   seconds=3600, step=STEP, source=StubSource(fail={'bitcoin', 'ethereum'})))
+    assert backfiller.state == 'failed' and set(backfiller.errors) == {'BTC', 'ETH'}
+    assert applied == [] and backfiller.rows_added == 0
+
+
+def test_restart_clears_previous_errors():
+    source = StubSource(fail={'bitcoin', 'ethereum'})
+    backfiller = finish(Backfiller(ASSETS, COLUMNS, lambda ts, matrix: len(ts), seconds=3600, step=STEP,
+                                   source=source))
+    assert backfiller.state == 'failed'
+    source.fail.clear()
+    assert finish(backfiller).state == 'done' and backfiller.errors == {}
+
+
+def test_requests_are_capped_per_start():
+    assets = [Asset(f'C{i}', f'Coin {i}', coingecko_id=f'coin-{i}') for i in range(5)]
+    assets.insert(1, Asset('SIM', 'Simulated', source='simulated'))   # ไม่มีประวัติ ไม่นับในโควตา
+    source = StubSource()
+    backfiller = finish(Backfiller(assets, [a.column for a in assets], lambda ts, matrix: len(ts),
+                                   seconds=3600, step=STEP, source=source, max_assets=3))
+    assert source.calls == ['coin-0', 'coin-1', 'coin-2']   # ต้น watchlist ก่อน
+    assert backfiller.skipped == 2 and backfiller.state == 'done'
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+from backtest import (TIER1_CLASSES, TIER2_CLASSES, change_over, run_backtest, synthetic_prices,
+                      tier1_classes, tier2_classes)
+from dashboard import analyze_trend, classify_advice, get_signal
+from indicators import IndicatorBatch, compute_indicators
+
+COLUMNS = ['BTC', 'ETH', 'Gold']
+# class ของ get_signal() -> ชื่อใน TIER1_CLASSES
+SIGNAL_CLASS = {'signal-green': 'strong_buy', 'signal-blue': 'hold', 'signal-red': 'sell', 'signal-gray': 'wait'}
+ADVICE_CLASS = {"🔥 พุ่งแรง (Momentum)": 'momentum', "🟢 เก็บของ (Accumulate)": 'accumulate',
+                "🩸 หนีตาย (Panic Sell)": 'panic_sell', "🔻 ย่อตัว (Correction)": 'correction'}
+SMALL_GRID = {'ma_window': [20], 'buy_rsi': [45], 'sell_rsi': [55], 'change_threshold': [3.0]}
+
+
+def expected_tier1(price, ma, rsi):
+    """get_signal() ทีละแถว (แทน NaN แบบเดียวกับ analyze_trend) -> index ใน TIER1_CLASSES"""
+    out = []
+    for p, m, r in zip(price, ma, rsi):
+        r = 50 if np.isnan(r) else r
+        m = p if np.isnan(m) else m
+        out.append(TIER1_CLASSES.index(SIGNAL_CLASS[get_signal(p, m, r)[1]]))
+    return np.array(out)
+
+
+def with_flat_run(prices):
+    """ราคาเท่าเดิมช่วงหนึ่ง -> price == ma และ RSI เป็น NaN (0 / 0) ได้ทดสอบกรณีขอบ"""
+    prices = prices.copy()
+    prices[100:130] = prices[100]
+    return prices
+
+
+def test_tier1_matches_get_signal_row_by_row():
+    ts, prices = synthetic_prices(3000, len(COLUMNS))
+    prices = with_flat_run(prices)
+    ma, rsi, _ = compute_indicators(prices)
+    for i in range(len(COLUMNS)):
+        np.testing.assert_array_equal(tier1_classes(prices[:, i], ma[:, i], rsi[:, i]),
+                                      expected_tier1(prices[:, i], ma[:, i], rsi[:, i]))
+
+
+def test_tier1_matches_analyze_trend_on_every_prefix():
+    # analyze_trend() ดูแถวสุดท้ายของ batch -> สร้าง batch จากประวัติถึงแถว k เหมือนตอน dashboard รันจริง
+    ts, prices = synthetic_prices(160, len(COLUMNS), seed=1)
+    prices = with_flat_run(prices)
+    ma, rsi, _ = compute_indicators(prices)
+    for k in range(len(prices)):
+        batch = IndicatorBatch(ts[:k + 1], prices[:k + 1], COLUMNS)
+        for i, col in enumerate(COLUMNS):
+            cls = SIGNAL_CLASS[analyze_trend(batch, col)['ai_signal_class']]
+            expected = tier1_classes(prices[k:k + 1, i], ma[k:k + 1, i], rsi[k:k + 1, i])[0]
+            assert TIER1_CLASSES[expected] == cls, (k, col)
+
+
+def test_tier2_matches_classify_advice():
+    ts, prices = synthetic_prices(6000, 1, seed=2)
+    change = change_over(ts, prices[:, 0] * np.linspace(1, 1.2, len(ts)))
+    change[::97] = np.nan   # ไม่มีข้อมูล = 0%
+    expected = [TIER2_CLASSES.index(ADVICE_CLASS[a]) for a in classify_advice(change)]
+    np.testing.assert_array_equal(tier2_classes(change), expected)
+
+
+def test_process_pool_matches_in_process():
+    ts, prices = synthetic_prices(2000, len(COLUMNS))
+    grid = {'ma_window': [10, 20], 'buy_rsi': [40, 45], 'sell_rsi': [55], 'change_threshold': [2.0, 3.0]}
+    serial = run_backtest(ts, prices, COLUMNS, grid=grid, workers=1)
+    parallel = run_backtest(ts, prices, COLUMNS, grid=grid, workers=2)
+    assert len(serial) == len(COLUMNS) * (2 * 2 + 2)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+class SpyPool(backtest.ProcessPoolExecutor):
+    created = []
+
+    def __init__(self, max_workers=None, **kwargs):
+        SpyPool.created.append(max_workers)
+        super().__init__(max_workers=max_workers, **kwargs)
+
+
+@pytest.mark.parametrize('rows, parallel', [(166_000, False), (170_000, True)])
+def test_default_workers_switch_at_parallel_min_cells(monkeypatch, rows, parallel):
+    # 3 สินทรัพย์: 498k ช่อง = process เดียว / 510k ช่อง = ProcessPoolExecutor (ผลต้องเท่ากัน)
+    monkeypatch.setattr(backtest.os, 'cpu_count', lambda: 2)
+    monkeypatch.setattr(backtest, 'ProcessPoolExecutor', SpyPool)
+    SpyPool.created.clear()
+    ts, prices = synthetic_prices(rows, len(COLUMNS), seed=3)
+    result = run_backtest(ts, prices, COLUMNS, grid=SMALL_GRID)
+    assert SpyPool.created == ([2] if parallel else [])
+    pd.testing.assert_frame_equal(result, run_backtest(ts, prices, COLUMNS, grid=SMALL_GRID, workers=1))
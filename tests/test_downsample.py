@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from downsample import decimate, lttb_indices, minmax_indices
+
+METHODS = ['lttb', 'minmax']
+
+
+def series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype='f8') * 30
+    y = 100 + np.cumsum(rng.normal(0, 1, n))
+    return x, y
+
+
+def check_indices(idx, n, target):
+    assert len(idx) <= target
+    assert (np.diff(idx) > 0).all()                    # เรียงและไม่ซ้ำ
+    assert idx.min() >= 0 and idx.max() < n
+
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('n, target', [(10_000, 500), (1_001, 100), (500, 499), (100, 4), (100, 5), (50, 3)])
+def test_length_order_and_endpoints(method, n, target):
+    x, y = series(n)
+    idx = decimate(x, y, target, method)
+    check_indices(idx, n, target)
+    assert idx[0] == 0 and idx[-1] == n - 1
+
+
+@pytest.mark.parametrize('target', [0, 1, 2])
+def test_tiny_targets_never_exceed_the_limit(target):
+    x, y = series(100)
+    assert len(lttb_indices(x, y, target)) == target
+    assert len(minmax_indices(y, target)) == target
+    assert list(minmax_indices(y, 2)) == [0, 99]
+
+
+@pytest.mark.parametrize('method', METHODS + [None])
+@pytest.mark.parametrize('n', [0, 1, 2, 300])
+def test_passthrough_when_small_enough(method, n):
+    x, y = series(n)
+    np.testing.assert_array_equal(decimate(x, y, 300, method), np.arange(n))
+    np.testing.assert_array_equal(decimate(x, y, None, method), np.arange(n))
+
+
+def test_method_none_keeps_full_resolution():
+    x, y = series(1000)
+    np.testing.assert_array_equal(decimate(x, y, 10, None), np.arange(1000))
+
+
+def test_minmax_keeps_global_extremes_and_spikes():
+    x, y = series(20_000, seed=3)
+    y[12_345] = 1e6      # spike ที่ LTTB แบบเฉลี่ยอาจพลาดได้ แต่ min/max ต้องเก็บไว้
+    y[777] = -1e6
+    idx = minmax_indices(y, 200)
+    assert 12_345 in idx and 777 in idx
+    kept = y[idx]
+    assert kept.max() == y.max() and kept.min() == y.min()
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    _, y = series(1_000, seed=4)
+    idx = set(minmax_indices(y, 42).tolist())
+    edges = np.linspace(0, 1_000, 21).astype(int)   # (42 - 2) // 2 = 20 bucket
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        assert lo + int(np.argmin(y[lo:hi])) in idx and lo + int(np.argmax(y[lo:hi])) in idx
+
+
+def test_lttb_keeps_an_isolated_spike():
+    x, y = series(5_000, seed=2)
+    y[2_500] += 500
+    assert 2_500 in lttb_indices(x, y, 250)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_nan_points_are_not_picked_over_real_values(method):
+    x, y = series(5_000, seed=6)
+    y[1000:1400] = np.nan          # ช่วงที่ไม่มีราคา (สินทรัพย์เพิ่งถูกเพิ่ม / API ล่ม)
+    y[3001::7] = np.nan
+    idx = decimate(x, y, 300, method)
+    check_indices(idx, len(y), 300)
+    inner = idx[1:-1]
+    picked_nan = np.isnan(y[inner])
+    # NaN ถูกเลือกได้เฉพาะ bucket ที่ไม่มีค่าจริงเลย (อยู่ในช่วงที่หายไปทั้งช่วง)
+    assert ((inner[picked_nan] >= 1000) & (inner[picked_nan] < 1400)).all()
+    if method == 'minmax':
+        kept = y[idx]
+        assert np.nanmax(kept) == np.nanmax(y) and np.nanmin(kept) == np.nanmin(y)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_all_nan_series_does_not_crash(method):
+    x = np.arange(1_000, dtype='f8')
+    y = np.full(1_000, np.nan)
+    idx = decimate(x, y, 100, method)
+    check_indices(idx, 1_000, 100)
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard import calculate_indicators
+from indicators import IndicatorEngine, IndicatorBatch, compute_indicators
+
+COLUMNS = ['BTC', 'ETH', 'Gold']
+
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.array([60000.0, 3000.0, 2000.0])
+    return start * np.cumprod(1 + rng.normal(0, 0.002, size=(n, len(COLUMNS))), axis=0)
+
+
+def reference(prices):
+    """ผลของ calculate_indicators() แบบ pandas ต้นฉบับ: dict column -> (ma, rsi, change)"""
+    df = pd.DataFrame(prices, columns=COLUMNS)
+    out = {}
+    for col in COLUMNS:
+        df_col = calculate_indicators(df[[col]], col)
+        out[col] = tuple(df_col[f'{col}_{k}'].to_numpy(dtype='f8') for k in ('MA20', 'RSI', 'Change'))
+    return out
+
+
+def run_engine(prices):
+    engine = IndicatorEngine(COLUMNS, capacity=len(prices))
+    for ts, row in enumerate(prices):
+        engine.update(ts, dict(zip(COLUMNS, row)))
+    return engine
+
+
+def assert_same(actual, expected):
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize('n', [1, 14, 20, 21, 300])
+def test_batch_matches_pandas(n):
+    prices = random_walk(n)
+    ma, rsi, change = compute_indicators(prices)
+    expected = reference(prices)
+    for i, col in enumerate(COLUMNS):
+        assert_same(ma[:, i], expected[col][0])
+        assert_same(rsi[:, i], expected[col][1])
+        assert_same(change[:, i], expected[col][2])
+
+
+def test_warm_up_is_nan():
+    ma, rsi, change = compute_indicators(random_walk(40))
+    assert np.isnan(ma[:19]).all() and not np.isnan(ma[19:]).any()
+    # delta แรกเป็น NaN แต่ where(..., 0) ทำให้เป็น 0 -> หน้าต่าง RSI เต็มตั้งแต่แถวที่ 14 (index 13)
+    assert np.isnan(rsi[:13]).all() and not np.isnan(rsi[13:]).any()
+    assert np.isnan(change[0]).all() and not np.isnan(change[1:]).any()
+
+
+@pytest.mark.parametrize('name, step, expected_rsi', [
+    ('flat', 0.0, np.nan),        # gain = loss = 0 -> 0 / 0
+    ('rising', 1.0, 100.0),       # loss = 0 -> RSI 100
+    ('falling', -1.0, 0.0),       # gain = 0 -> RSI 0
+])
+def test_one_sided_and_flat_prices(name, step, expected_rsi):
+    column = 1000.0 + step * np.arange(50)
+    prices = np.column_stack([column] * len(COLUMNS))
+    expected = reference(prices)
+
+    ma, rsi, _ = compute_indicators(prices)
+    engine = run_engine(prices)
+    for i, col in enumerate(COLUMNS):
+        assert_same(rsi[:, i], expected[col][1])
+        assert_same(engine.series(col)['RSI'], expected[col][1])
+        assert_same(engine.series(col)['MA20'], expected[col][0])
+        assert_same(rsi[13:, i], np.full(50 - 13, expected_rsi))
+
+
+def test_flat_after_moves_gives_nan_rsi():
+    """หน้าต่างที่ราคาไม่ขยับเลยต้องได้ gain / loss เป็น 0 เป๊ะ (ไม่ใช่เศษ float) -> RSI NaN แบบ pandas"""
+    moves = random_walk(30)[:, 0]
+    column = np.concatenate([moves, np.full(30, moves[-1])])
+    prices = np.column_stack([column] * len(COLUMNS))
+    expected = reference(prices)['BTC']
+
+    _, rsi, _ = compute_indicators(prices)
+    engine_rsi = run_engine(prices).series('BTC')['RSI']
+    assert np.isnan(expected[1][-10:]).all()
+    assert_same(rsi[:, 0], expected[1])
+    assert_same(engine_rsi, expected[1])
+
+
+def test_incremental_engine_matches_batch():
+    prices = random_walk(1000, seed=7)   # ยาวพอให้ RollingMean รวมผลใหม่ (resum) หลายรอบ
+    engine = run_engine(prices)
+    batch = IndicatorBatch(np.arange(len(prices)), prices, COLUMNS)
+    for col in COLUMNS:
+        series = engine.series(col)
+        view = batch.asset(col)
+        assert_same(series['MA20'], view['ma'])
+        assert_same(series['RSI'], view['rsi'])
+        assert_same(series['Change'], view['change'])
+
+
+def test_sync_follows_store_records():
+    prices = random_walk(60, seed=3)
+    dtype = [('ts', '<i8')] + [(c, '<f8') for c in COLUMNS]
+    records = np.zeros(len(prices), dtype=dtype)
+    records['ts'] = np.arange(len(prices))
+    for i, col in enumerate(COLUMNS):
+        records[col] = prices[:, i]
+
+    engine = IndicatorEngine(COLUMNS, capacity=len(prices))
+    for n in range(1, len(records) + 1):
+        engine.sync(records[:n])   # ครั้งแรก rebuild, หลังจากนั้นเพิ่มทีละแถว
+    assert engine.count == len(prices)
+
+    batch = IndicatorBatch.from_records(records, COLUMNS)
+    for col in COLUMNS:
+        assert_same(engine.series(col)['RSI'], batch.asset(col)['rsi'])
+        assert_same(engine.series(col)['MA20'], batch.asset(col)['ma'])
@@ -0,0 +1,32 @@
+import pytest
+
+from live_server import LiveServer, is_local_host
+
+
+@pytest.mark.parametrize('host, local', [
+    ('localhost:8501', True), ('127.0.0.1', True), ('[::1]:8501', True), ('http://localhost:8502', True),
+    (None, True), ('', True), ('crypto.example.com', False), ('10.0.0.5:8501', False),
+    ('https://live.example.com/app', False), ('0.0.0.0', False),
+])
+def test_is_local_host(host, local):
+    assert is_local_host(host) is local
+
+
+def test_local_page_is_reachable_with_defaults():
+    server = LiveServer(host='127.0.0.1', public_url='http://localhost:8502')
+    assert server.unreachable_reason('localhost:8501') is None
+    assert server.unreachable_reason(None) is None
+
+
+def test_remote_page_with_localhost_public_url_is_flagged():
+    reason = LiveServer(host='127.0.0.1', public_url='http://localhost:8502').unreachable_reason('10.0.0.5:8501')
+    assert 'LIVE_SERVER_PUBLIC_URL' in reason and 'LIVE_SERVER_HOST' in reason
+    # ฟังทุก interface แล้ว แต่ URL ยังชี้ localhost
+    reason = LiveServer(host='0.0.0.0', public_url='http://localhost:8502').unreachable_reason('10.0.0.5:8501')
+    assert 'LIVE_SERVER_PUBLIC_URL' in reason and 'LIVE_SERVER_HOST' not in reason
+
+
+def test_remote_page_with_public_url_is_reachable():
+    # reverse proxy: ฟังแค่เครื่องนี้ แต่ browser เข้าผ่าน URL ภายนอก
+    server = LiveServer(host='127.0.0.1', public_url='https://live.example.com')
+    assert server.unreachable_reason('crypto.example.com') is None
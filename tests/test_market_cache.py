@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+import market_cache
+from market_cache import EndpointHealth, SWRCache
+
+
+class FakeClock:
+    """แทน time.time ของ market_cache: อายุข้อมูล / backoff เดินเมื่อเทสต์สั่งเท่านั้น"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(market_cache, 'time', clock)
+    return clock
+
+
+class Loader:
+    """loader ที่นับจำนวนครั้ง คืน value-1, value-2, ... / raise ถ้า fail / รอ gate ถ้าปิดไว้"""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.gate = threading.Event()
+        self.gate.set()
+        self.done = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        try:
+            self.gate.wait(5)
+            if self.fail:
+                raise RuntimeError('upstream down')
+            return f'value-{self.calls}'
+        finally:
+            self.done.set()
+
+
+def wait_refresh(cache, loader):
+    assert loader.done.wait(2)
+    deadline = time.monotonic() + 2
+    while cache._refreshing:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_serves_stale_value_while_revalidating(clock):
+    loader = Loader()
+    cache = SWRCache('test', loader, ttl=60)
+    first = cache.get()
+    assert (first.value, first.age, first.stale) == ('value-1', 0, False)
+    assert cache.get().value == 'value-1' and loader.calls == 1   # ยังสด: ไม่ดึงใหม่
+
+    clock.now += 61
+    loader.gate.clear()
+    loader.done.clear()
+    started = time.monotonic()
+    stale = cache.get()
+    assert time.monotonic() - started < 0.5              # ไม่ต้องรอ upstream ที่ค้างอยู่
+    assert (stale.value, stale.stale) == ('value-1', True)
+    assert cache.get().value == 'value-1'                 # refresh ค้างอยู่: ไม่ยิงซ้ำ
+    loader.gate.set()
+    wait_refresh(cache, loader)
+    assert loader.calls == 2
+    fresh = cache.get()
+    assert (fresh.value, fresh.stale, fresh.state) == ('value-2', False, 'closed')
+
+
+def test_failed_refresh_keeps_last_good_value(clock):
+    loader = Loader()
+    cache = SWRCache('test', loader, ttl=60)
+    cache.get()
+    clock.now += 61
+    loader.fail = True
+    loader.done.clear()
+    cache.get()
+    wait_refresh(cache, loader)
+    result = cache.get()
+    assert result.value == 'value-1' and result.stale and isinstance(result.error, RuntimeError)
+
+
+def test_endpoint_health_backs_off_exponentially_then_opens(clock):
+    health = EndpointHealth(base_delay=5, max_delay=600, threshold=3, cooldown=300)
+    assert health.state == 'closed' and health.allow()
+
+    health.record_failure(RuntimeError('1'))
+    assert health.next_attempt_at - clock.now == 5 and not health.allow() and health.state == 'closed'
+    health.record_failure(RuntimeError('2'))
+    assert health.next_attempt_at - clock.now == 10
+    health.record_failure(RuntimeError('3'))              # ถึง threshold: เปิดวงจร รอ cooldown
+    assert health.next_attempt_at - clock.now == 300 and health.state == 'open'
+
+    clock.now += 299
+    assert not health.allow() and health.state == 'open'
+    clock.now += 1
+    assert health.allow() and health.state == 'half-open'
+    health.record_failure(RuntimeError('4'))              # ลองแล้วยังพัง: เปิดต่ออีก cooldown
+    assert health.state == 'open'
+    clock.now += 300
+    health.record_success()
+    assert health.state == 'closed' and health.failures == 0 and health.last_error is None
+
+
+def test_backoff_delay_is_capped():
+    health = EndpointHealth(base_delay=5, max_delay=12, threshold=10)
+    for _ in range(4):
+        health.record_failure(RuntimeError())
+    assert health.next_attempt_at - time.time() == pytest.approx(12, abs=1)
+
+
+def test_open_circuit_stops_calling_upstream_until_cooldown(clock):
+    loader = Loader()
+    loader.fail = True
+    cache = SWRCache('test', loader, ttl=60, health=EndpointHealth(base_delay=5, threshold=2, cooldown=300))
+    assert cache.get().value is None and loader.calls == 1   # ครั้งแรกรอผล (ล้มเหลว)
+
+    clock.now += 5
+    loader.done.clear()
+    cache.get()
+    wait_refresh(cache, loader)
+    assert loader.calls == 2 and cache.get().state == 'open'
+
+    for _ in range(5):
+        clock.now += 50
+        cache.get()
+    time.sleep(0.05)
+    assert loader.calls == 2                                  # วงจรเปิด: ไม่ยิงเลย
+
+    clock.now += 100                                          # ครบ cooldown -> half-open ลอง 1 ครั้ง
+    loader.fail = False
+    loader.done.clear()
+    assert cache.get().state == 'half-open'
+    wait_refresh(cache, loader)
+    result = cache.get()
+    assert loader.calls == 3 and (result.value, result.state) == ('value-3', 'closed')
@@ -0,0 +1,33 @@
+from streamlit import runtime
+
+import dashboard
+from metrics import Registry, METRIC_PREFIX
+
+
+def test_gauge_without_value_is_left_out_of_scrape():
+    registry = Registry(enabled=True)
+    registry.gauge('ok', lambda: 3, 'fine')
+    registry.gauge('unknown', lambda: None, 'no value')
+    registry.gauge('broken', lambda: 1 / 0)
+    text = registry.render()
+    assert f'{METRIC_PREFIX}ok 3' in text
+    assert 'unknown' not in text and 'broken' not in text
+
+
+class FakeRuntime:
+    """Runtime ของ Streamlit รุ่นที่ไม่มี _session_mgr"""
+
+
+def test_active_sessions_survives_streamlit_internals_changing(monkeypatch):
+    monkeypatch.setattr(runtime, 'exists', lambda: True)
+    monkeypatch.setattr(runtime, 'get_instance', FakeRuntime)
+    assert dashboard.active_sessions() is None
+
+    registry = Registry(enabled=True)
+    registry.gauge('active_sessions', dashboard.active_sessions)
+    assert 'active_sessions' not in registry.render()
+
+
+def test_active_sessions_without_runtime_is_zero(monkeypatch):
+    monkeypatch.setattr(runtime, 'exists', lambda: False)
+    assert dashboard.active_sessions() == 0
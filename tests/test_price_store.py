@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_store import PriceStore, format_epoch, to_epoch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_CSV = os.path.join(ROOT, 'crypto_prices.csv')
+COLUMNS = ['BTC_price', 'ETH_price', 'Gold_price']
+
+
+def fill(store, start, n):
+    for i in range(start, start + n):
+        store.append(1_700_000_000 + 30 * i, {c: float(i * (k + 1)) for k, c in enumerate(store.columns)})
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'prices.bin')
+
+
+def test_ring_wraps_past_capacity_and_view_stays_contiguous(path):
+    store = PriceStore(path, COLUMNS, capacity=10)
+    assert len(store) == 0 and store.last() is None and len(store.view()) == 0
+    for n in range(1, 36):   # วนรอบ ring (capacity + 1 slot) หลายรอบ
+        fill(store, n - 1, 1)
+        view = store.view()
+        assert len(view) == min(n, 10) == len(store)
+        assert view.flags.c_contiguous and not view.flags.writeable   # ช่วงต่อเนื่องเดียว (zero-copy)
+        np.testing.assert_array_equal(view['ts'], 1_700_000_000 + 30 * np.arange(max(0, n - 10), n))
+        np.testing.assert_array_equal(view['ETH_price'], 2.0 * np.arange(max(0, n - 10), n))
+        assert store.last()['ts'] == view['ts'][-1]
+    store.close()
+
+
+def test_reopen_returns_identical_data(path):
+    store = PriceStore(path, COLUMNS, capacity=20)
+    fill(store, 0, 27)
+    before = np.array(store.view())
+    store.close()
+
+    reopened = PriceStore(path, COLUMNS, capacity=20)
+    np.testing.assert_array_equal(reopened.view(), before)
+    fill(reopened, 27, 1)   # เขียนต่อจากตำแหน่งเดิมได้
+    assert reopened.view()['ts'][-1] == 1_700_000_000 + 30 * 27 and len(reopened) == 20
+    reopened.close()
+
+
+def test_columns_migrate_when_watchlist_changes(path):
+    store = PriceStore(path, ['BTC_price', 'ETH_price'], capacity=10)
+    fill(store, 0, 15)
+    old = np.array(store.view())
+    store.close()
+
+    migrated = PriceStore(path, ['BTC_price', 'SOL_price'], capacity=5)   # ลบ ETH เพิ่ม SOL ลด capacity
+    view = migrated.view()
+    assert migrated.columns == ['BTC_price', 'SOL_price'] and len(view) == 5
+    np.testing.assert_array_equal(view['ts'], old['ts'][-5:])
+    np.testing.assert_array_equal(view['BTC_price'], old['BTC_price'][-5:])
+    assert np.isnan(view['SOL_price']).all()
+    migrated.close()
+    reader = PriceStore.open_readonly(path)
+    assert reader.columns == ['BTC_price', 'SOL_price']
+    reader.close()
+
+
+def test_open_readonly_never_migrates(path):
+    store = PriceStore(path, COLUMNS, capacity=10)
+    fill(store, 0, 4)
+    store.close()
+    with open(path, 'rb') as f:
+        original = f.read()
+
+    with pytest.raises(ValueError):
+        PriceStore(path, ['BTC_price'], capacity=10, readonly=True)
+    with pytest.raises(ValueError):
+        PriceStore(path, COLUMNS, capacity=99, readonly=True)
+    reader = PriceStore.open_readonly(path)
+    assert (reader.capacity, reader.columns, len(reader)) == (10, COLUMNS, 4)
+    reader.close()
+    with open(path, 'rb') as f:
+        assert f.read() == original
+
+    with pytest.raises(FileNotFoundError):
+        PriceStore(path + '.missing', COLUMNS, readonly=True)
+
+
+def test_csv_round_trip_with_baseline_layout(path, tmp_path):
+    baseline = pd.read_csv(BASELINE_CSV)
+    store = PriceStore(path, COLUMNS, capacity=1000)
+    assert store.import_csv(BASELINE_CSV) == len(baseline)
+    view = store.view()
+    np.testing.assert_array_equal(view['ts'], to_epoch(baseline['Timestamp']).to_numpy())
+    np.testing.assert_array_equal(view['Gold_price'], baseline['Gold Price'].to_numpy(dtype='f8'))
+
+    exported = tmp_path / 'export.csv'
+    store.export_csv(str(exported))
+    frame = pd.read_csv(exported)
+    assert list(frame.columns) == ['timestamp'] + COLUMNS
+    assert list(frame['timestamp']) == list(baseline['Timestamp'])
+    assert format_epoch(view['ts'][0]) == baseline['Timestamp'][0]
+
+    again = PriceStore(str(tmp_path / 'again.bin'), COLUMNS, capacity=1000)
+    again.import_csv(str(exported))   # schema ใหม่ของ export อ่านกลับได้ข้อมูลเดิม
+    np.testing.assert_array_equal(again.view(), view)
+    again.close()
+    store.close()
+
+
+def test_import_csv_keeps_only_the_newest_capacity_rows(path):
+    store = PriceStore(path, COLUMNS, capacity=30)
+    store.import_csv(BASELINE_CSV)
+    baseline = pd.read_csv(BASELINE_CSV)
+    np.testing.assert_array_equal(store.view()['BTC_price'], baseline['BTC Price'].to_numpy(dtype='f8')[-30:])
+    store.close()
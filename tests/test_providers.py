@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import providers
+from providers import BinanceProvider, PriceRouter, HEDGE_MIN_SAMPLES
+from watchlist import Asset
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """ticker/price แบบ Binance: ตอบหลังรอ server.delay วินาที ด้วย server.status / server.prices"""
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.delay)
+        if server.status != 200:
+            self.send_response(server.status)
+            self.end_headers()
+            return
+        symbols = json.loads(parse_qs(urlparse(self.path).query)['symbols'][0])
+        rows = [{'symbol': s, 'price': str(server.prices[s])} for s in symbols if s in server.prices]
+        body = json.dumps(rows).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    """สร้าง stub server บน port สุ่ม คืน (provider ที่ชี้ไปที่ server, server)"""
+    servers = []
+
+    def make(name, prices, delay=0.0, status=200):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        server.daemon_threads = True
+        server.prices, server.delay, server.status = prices, delay, status
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        provider = BinanceProvider(f'http://127.0.0.1:{server.server_port}', timeout=5)
+        provider.name = name
+        return provider
+
+    yield make
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+ASSETS = [
+    Asset('BTC', 'Bitcoin', sources={'primary': 'BTCUSDT', 'backup': 'BTCUSDT'}),
+    Asset('Gold', 'ทองคำ', sources={'primary': 'PAXGUSDT', 'backup': 'PAXGUSDT'}),
+]
+
+
+def test_slow_primary_fires_hedge(stub, monkeypatch):
+    monkeypatch.setattr(providers, 'HEDGE_DEFAULT', 0.1)
+    primary = stub('primary', {'BTCUSDT': 100.0, 'PAXGUSDT': 2600.0}, delay=1.5)
+    backup = stub('backup', {'BTCUSDT': 101.0, 'PAXGUSDT': 2601.0})
+    router = PriceRouter([primary, backup], timeout=5)
+
+    started = time.monotonic()
+    quotes = router.quote(ASSETS)
+    assert time.monotonic() - started < 1.0   # ไม่ต้องรอแหล่งหลักที่ช้า
+    assert quotes == {'BTC': 101.0, 'Gold': 2601.0}
+    assert backup.stats.hedged == 1
+    assert backup.stats.wins == 2 and primary.stats.wins == 0
+
+
+def test_primary_error_falls_back_without_waiting_for_hedge(stub, monkeypatch):
+    monkeypatch.setattr(providers, 'HEDGE_DEFAULT', 3.0)
+    primary = stub('primary', {}, status=500)
+    backup = stub('backup', {'BTCUSDT': 101.0, 'PAXGUSDT': 2601.0})
+    router = PriceRouter([primary, backup], timeout=5)
+
+    started = time.monotonic()
+    quotes = router.quote(ASSETS)
+    assert time.monotonic() - started < 2.0   # error -> ยิงแหล่งถัดไปทันที ไม่รอครบ hedge delay
+    assert quotes == {'BTC': 101.0, 'Gold': 2601.0}
+    assert primary.stats.errors == 1
+    assert backup.stats.wins == 2
+
+
+def test_first_valid_quote_wins_and_late_results_are_ignored(stub, monkeypatch):
+    monkeypatch.setattr(providers, 'HEDGE_DEFAULT', 0.1)
+    # แหล่งหลักตอบช้า, แหล่งสำรองตอบก่อนแต่ราคาทองใช้ไม่ได้ (0) -> ทองต้องรอราคาจากแหล่งหลัก
+    primary = stub('primary', {'BTCUSDT': 100.0, 'PAXGUSDT': 2600.0}, delay=0.5)
+    backup = stub('backup', {'BTCUSDT': 101.0, 'PAXGUSDT': 0})
+    router = PriceRouter([primary, backup], timeout=5)
+
+    quotes = router.quote(ASSETS)
+    assert quotes == {'BTC': 101.0, 'Gold': 2600.0}
+    assert backup.stats.wins == 1 and primary.stats.wins == 1
+
+    # รอบถัดไป: แหล่งสำรองได้ครบก่อน -> ราคาจากแหล่งหลักที่มาทีหลังไม่ถูกใช้
+    fast = stub('backup', {'BTCUSDT': 102.0, 'PAXGUSDT': 2602.0})
+    router = PriceRouter([primary, fast], timeout=5)
+    quotes = router.quote(ASSETS)
+    assert quotes == {'BTC': 102.0, 'Gold': 2602.0}
+    time.sleep(0.7)   # ให้แหล่งหลักตอบกลับมาจริง
+    assert quotes == {'BTC': 102.0, 'Gold': 2602.0}
+    assert primary.stats.wins == 1   # ไม่เพิ่มจากรอบแรก
+    assert primary.stats.requests == 2
+
+
+def test_cache_hits_are_not_recorded_as_upstream_latency(tmp_path, monkeypatch):
+    import watchlist
+    from providers import CoinGeckoProvider, HEDGE_DEFAULT
+    from response_cache import ResponseCache
+
+    calls = []
+
+    def fetch_simple_prices(ids, **kwargs):
+        calls.append(list(ids))
+        time.sleep(0.05)
+        return {i: 1.0 for i in ids}
+
+    monkeypatch.setattr(watchlist, 'fetch_simple_prices', fetch_simple_prices)
+    provider = CoinGeckoProvider(ResponseCache(str(tmp_path / 'cache.sqlite')), ttl=60)
+
+    assert provider.timed_fetch(['bitcoin', 'pax-gold']) == {'bitcoin': 1.0, 'pax-gold': 1.0}
+    assert calls == [['bitcoin', 'pax-gold']] and provider.stats.requests == 1
+    for _ in range(HEDGE_MIN_SAMPLES * 2):
+        assert provider.timed_fetch(['pax-gold', 'bitcoin']) == {'bitcoin': 1.0, 'pax-gold': 1.0}
+    assert len(calls) == 1
+    stats = provider.stats.as_dict()
+    assert stats['requests'] == 1 and stats['cached'] == HEDGE_MIN_SAMPLES * 2
+    assert list(provider.stats.latencies) == [pytest.approx(0.05, abs=0.04)]
+    assert provider.hedge_delay() == HEDGE_DEFAULT   # cache hit ไม่ดึง p95 ลง
+
+    provider.timed_fetch(['ethereum'])   # id ชุดใหม่: ยิงจริง
+    assert calls[-1] == ['ethereum'] and provider.stats.requests == 2
+
+
+def test_stats_counters_are_exact_under_concurrent_updates():
+    from providers import ProviderStats
+
+    stats = ProviderStats()
+
+    def work():
+        for _ in range(2000):
+            stats.record_hedge()
+            stats.record_wins(2)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stats.hedged == 16000 and stats.wins == 32000
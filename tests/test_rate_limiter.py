@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+
+import rate_limiter
+from rate_limiter import (RequestScheduler, TokenBucket, PRIORITY_BACKGROUND, PRIORITY_LIVE_PRICE,
+                          PRIORITY_MARKETS)
+
+
+class FakeClock:
+    """แทน time.monotonic ของ rate_limiter: เวลาเดินเมื่อเทสต์สั่งเท่านั้น"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """http_get ปลอม: บันทึก url ที่ถูกยิงตามลำดับ, ตอบด้วย upstream.responses (ถ้ามี) / รอ upstream.gate"""
+    class Upstream:
+        calls = []
+        responses = []
+        gate = threading.Event()
+
+    Upstream.gate.set()
+
+    def http_get(url, params=None, timeout=None):
+        Upstream.calls.append(url)
+        Upstream.gate.wait(5)
+        return Upstream.responses.pop(0) if Upstream.responses else FakeResponse()
+
+    monkeypatch.setattr(rate_limiter, 'http_get', http_get)
+    return Upstream
+
+
+def advance(scheduler, clock, seconds):
+    clock.now += seconds
+    with scheduler._cond:
+        scheduler._cond.notify_all()   # ปลุก dispatcher ที่รอ token ด้วยเวลาจริงอยู่
+
+
+def settle(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.005)
+    time.sleep(0.02)   # เผื่อ dispatcher ยิงเกินจากที่ควร ให้เทสต์จับได้
+
+
+def test_token_bucket_rate_and_burst(clock):
+    bucket = TokenBucket(10 / 60.0, 5)
+    for _ in range(5):
+        assert bucket.wait_time() == 0
+        bucket.take()
+    assert bucket.wait_time() == pytest.approx(6.0)
+    clock.now += 6
+    assert bucket.wait_time() == 0
+    clock.now += 600   # เติมได้ไม่เกิน burst
+    bucket._refill()
+    assert bucket.tokens == 5
+
+
+def test_scheduler_allows_burst_then_ten_per_minute(clock, upstream):
+    scheduler = RequestScheduler(rate_per_min=10, burst=5)
+    futures = [scheduler.request(f'http://api/{i}', timeout=1000) for i in range(8)]
+    settle(lambda: len(upstream.calls) >= 5)
+    assert len(upstream.calls) == 5 and scheduler.queue_depth() == 3
+
+    advance(scheduler, clock, 5.9)
+    time.sleep(0.05)
+    assert len(upstream.calls) == 5
+    advance(scheduler, clock, 0.1)     # ครบ 6 วินาที = 1 token
+    settle(lambda: len(upstream.calls) >= 6)
+    assert len(upstream.calls) == 6
+    advance(scheduler, clock, 12)
+    settle(lambda: len(upstream.calls) >= 8)
+    assert all(f.result(1).status_code == 200 for f in futures)
+    assert scheduler.metrics['requests'] == 8 and scheduler.metrics['throttled'] >= 2
+
+
+def test_identical_concurrent_requests_share_one_call(clock, upstream):
+    upstream.gate.clear()
+    scheduler = RequestScheduler()
+    first = scheduler.request('http://api/price', {'ids': 'bitcoin', 'vs': 'usd'})
+    second = scheduler.request('http://api/price', {'vs': 'usd', 'ids': 'bitcoin'})   # ลำดับ params ต่างกันได้
+    other = scheduler.request('http://api/price', {'ids': 'ethereum', 'vs': 'usd'})
+    assert first is second and first is not other
+    upstream.gate.set()
+    first.result(2), other.result(2)
+    assert upstream.calls.count('http://api/price') == 2
+    assert scheduler.metrics['coalesced'] == 1
+
+    third = scheduler.request('http://api/price', {'ids': 'bitcoin', 'vs': 'usd'})   # เสร็จไปแล้ว: ยิงใหม่
+    assert third is not first
+    third.result(2)
+
+
+def test_queue_is_served_by_priority(clock, upstream):
+    scheduler = RequestScheduler(rate_per_min=10, burst=5)
+    scheduler.bucket.drain()
+    scheduler.request('http://api/background', priority=PRIORITY_BACKGROUND, timeout=1000)
+    scheduler.request('http://api/markets', priority=PRIORITY_MARKETS, timeout=1000)
+    scheduler.request('http://api/live', priority=PRIORITY_LIVE_PRICE, timeout=1000)
+    for n in (1, 2, 3):
+        advance(scheduler, clock, 6)
+        settle(lambda: len(upstream.calls) >= n)
+    assert upstream.calls == ['http://api/live', 'http://api/markets', 'http://api/background']
+
+
+def test_429_pauses_for_retry_after(clock, upstream):
+    upstream.responses.append(FakeResponse(429, {'Retry-After': '30'}))
+    scheduler = RequestScheduler(rate_per_min=10, burst=5)
+    assert scheduler.request('http://api/a').result(2).status_code == 429
+    assert scheduler.metrics['rate_limited'] == 1
+
+    later = scheduler.request('http://api/b', timeout=1000)
+    advance(scheduler, clock, 29)   # มี token แล้ว แต่ยังอยู่ในช่วงหยุด
+    time.sleep(0.05)
+    assert upstream.calls == ['http://api/a']
+    advance(scheduler, clock, 1.5)
+    assert later.result(2).status_code == 200
+    assert upstream.calls == ['http://api/a', 'http://api/b']
+
+
+def test_requests_whose_callers_gave_up_are_dropped_without_a_token(clock, upstream):
+    scheduler = RequestScheduler(rate_per_min=10, burst=5)
+    scheduler.bucket.drain()
+    expired = scheduler.request('http://api/slow', timeout=3)
+    kept = scheduler.request('http://api/slow', timeout=100)      # ผู้รอคนที่สองยืด deadline ของ key เดียวกัน
+    gone = scheduler.request('http://api/gone', timeout=3)
+    assert expired is kept
+
+    advance(scheduler, clock, 12)   # 2 token: /slow ยังมีคนรอ -> ยิง, /gone หมดเวลาไปแล้ว -> ทิ้ง
+    assert kept.result(2).status_code == 200
+    with pytest.raises(TimeoutError, match='expired'):
+        gone.result(2)
+    assert upstream.calls == ['http://api/slow']
+    assert scheduler.metrics['expired'] == 1 and scheduler.metrics['requests'] == 1
+    assert scheduler.bucket.wait_time() == 0   # token ที่สองยังอยู่ (ไม่ถูกใช้กับ request ที่ทิ้ง)
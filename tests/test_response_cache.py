@@ -0,0 +1,103 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+ITEM = 'x' * 100   # JSON '"xxx..."' = 102 bytes
+
+
+class FakeClock:
+    """แทน time.time ของ response_cache: fetched_at / accessed_at เดินเมื่อเทสต์สั่งเท่านั้น"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return ResponseCache(str(tmp_path / 'cache.sqlite'), max_bytes=350, max_age=3600)
+
+
+def test_round_trip_is_json(cache, clock):
+    value = {'coins': [{'id': 'bitcoin', 'price': 60000.5}], 'fng': (42, 'Fear'), 1: 'ไทย 🚀'}
+    cache.set('k', value, fetched_at=clock.now - 30)
+    got, fetched_at = cache.get('k')
+    # tuple -> list, key ของ dict -> str (เอกสารของ ResponseCache)
+    assert got == {'coins': [{'id': 'bitcoin', 'price': 60000.5}], 'fng': [42, 'Fear'], '1': 'ไทย 🚀'}
+    assert fetched_at == clock.now - 30
+    assert cache.metrics['hits'] == 1 and cache.metrics['writes'] == 1
+
+
+def test_survives_reopen(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite')
+    ResponseCache(path).set('k', [1, 2, 3])
+    assert ResponseCache(path).get('k') == ([1, 2, 3], clock.now)
+
+
+def test_missing_key_is_a_miss(cache):
+    assert cache.get('nope') is None
+    assert cache.metrics['misses'] == 1
+
+
+def test_non_json_value_is_not_stored(cache):
+    cache.set('k', object())
+    assert cache.get('k') is None
+    assert cache.metrics['errors'] == 1 and cache.metrics['writes'] == 0
+
+
+def test_legacy_pickle_row_reads_as_miss(cache, clock):
+    cache._db.execute('INSERT INTO responses VALUES (?, ?, ?, ?, ?)',
+                      ('old', b'\x80\x04K\x01.', 5, clock.now, clock.now))
+    assert cache.get('old') is None
+    assert cache.metrics['errors'] == 1
+
+
+def test_evicts_least_recently_accessed_over_max_bytes(cache, clock):
+    for key in 'abc':
+        cache.set(key, ITEM)
+        clock.now += 1
+    assert tuple(cache.size()) == (3, 306)
+    cache.get('a')          # a ถูกใช้ล่าสุด -> b เก่าที่สุด
+    clock.now += 1
+    cache.set('d', ITEM)    # 408 bytes > 350 -> ลบ 1 key
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in 'acd')
+    assert cache.metrics['evictions'] == 1
+    assert tuple(cache.size()) == (3, 306)
+
+
+def test_value_larger_than_max_bytes_is_skipped(cache):
+    cache.set('a', ITEM)
+    cache.set('big', 'x' * 400)
+    assert cache.get('big') is None
+    assert cache.get('a') is not None and cache.metrics['evictions'] == 0
+
+
+def test_expires_after_max_age(cache, clock):
+    cache.set('k', ITEM)
+    clock.now += 3600
+    assert cache.get('k') is not None     # อายุเท่ากับ max_age ยังใช้ได้
+    clock.now += 1
+    assert cache.get('k') is None
+    assert tuple(cache.size()) == (0, 0)  # ของหมดอายุถูกลบตอนอ่าน
+
+
+def test_age_counts_from_fetched_at_not_write_time(cache, clock):
+    cache.set('k', ITEM, fetched_at=clock.now - 3601)
+    assert cache.get('k') is None
+
+
+def test_size_reports_zero_on_sqlite_error(cache):
+    cache._db.close()
+    assert cache.size() == (0, 0)
+    assert cache.metrics['errors'] == 1
@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+
+from price_store import PriceStore
+from retention import RetentionEngine, merge_ohlc
+
+ASSETS = ['BTC_price', 'ETH_price']
+START = 1_700_000_000 - 1_700_000_000 % 86400   # เที่ยงคืน UTC: ขอบ bucket ทุกชั้นตรงกัน
+
+
+def random_ticks(n, step=30, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = START + np.cumsum(rng.integers(1, 2 * step, size=n))   # ระยะห่างไม่เท่ากัน
+    prices = 100 * np.cumprod(1 + rng.normal(0, 0.003, size=(n, len(ASSETS))), axis=0)
+    return ts, prices
+
+
+def run(engine, ts, prices):
+    for t, row in zip(ts, prices):
+        engine.add_tick(t, dict(zip(ASSETS, row)))
+
+
+def reference_bars(ts, values, seconds):
+    """OHLC แบบตรงไปตรงมา: values shape (n, assets, 4) -> {เวลาเริ่ม: ohlc}"""
+    bars = {}
+    for t, v in zip(ts, values):
+        start = int(t) - int(t) % seconds
+        bars[start] = merge_ohlc(bars.get(start), v)
+    return bars
+
+
+def tier_bars(tier, include_partial=True):
+    view = tier.store.view()
+    bars = dict(zip(view['ts'].tolist(), tier.records_ohlc(view)))
+    if include_partial and tier.partial is not None:
+        bars[tier.partial_start] = tier.partial
+    return bars
+
+
+def assert_same_bars(actual, expected):
+    assert sorted(actual) == sorted(expected)
+    for start in expected:
+        np.testing.assert_allclose(actual[start], expected[start], rtol=0, atol=0)
+
+
+@pytest.fixture
+def prefix(tmp_path):
+    return str(tmp_path / 'rollup')
+
+
+def test_every_tier_is_the_aggregate_of_the_tier_below(prefix):
+    ts, prices = random_ticks(12_000)   # ~4 วัน: ทุกชั้นมีแท่งที่ปิดแล้วหลายแท่ง
+    engine = RetentionEngine(prefix, ASSETS)
+    run(engine, ts, prices)
+
+    raw = np.repeat(prices[:, :, None], 4, axis=2)
+    assert_same_bars(tier_bars(engine.tiers[0]), reference_bars(ts, raw, 60))
+    for lower, upper in zip(engine.tiers, engine.tiers[1:]):
+        below = tier_bars(lower, include_partial=False)   # ชั้นบนรับเฉพาะแท่งที่ชั้นล่างปิดแล้ว
+        starts = np.array(sorted(below))
+        assert_same_bars(tier_bars(upper), reference_bars(starts, [below[s] for s in starts], upper.seconds))
+        assert len(upper.store) >= 1
+
+    # ตรวจค่าจริงของ 1d กับ tick ดิบโดยตรง (ไม่ผ่านชั้นกลาง)
+    day = engine.by_name['1d']
+    first_day = tier_bars(day)[START]
+    in_day = ts < START + 86400
+    np.testing.assert_array_equal(first_day[:, 0], prices[in_day][0])
+    np.testing.assert_array_equal(first_day[:, 1], prices[in_day].max(axis=0))
+    np.testing.assert_array_equal(first_day[:, 2], prices[in_day].min(axis=0))
+    np.testing.assert_array_equal(first_day[:, 3], prices[in_day][-1])
+
+
+def test_bucket_boundaries(prefix):
+    engine = RetentionEngine(prefix, ASSETS)
+    minute = engine.by_name['1m']
+    assert engine.add_tick(START, {'BTC_price': 1.0, 'ETH_price': 1.0}) == []
+    assert engine.add_tick(START + 59, {'BTC_price': 3.0, 'ETH_price': 1.0}) == []   # ยังอยู่ bucket เดิม
+    closed = engine.add_tick(START + 60, {'BTC_price': 2.0, 'ETH_price': 1.0})       # ขอบพอดี = bucket ใหม่
+    assert [(tier.name, start) for tier, start, _ in closed] == [('1m', START)]
+    np.testing.assert_array_equal(closed[0][2][0], [1.0, 3.0, 1.0, 3.0])
+    assert minute.partial_start == START + 60 and len(minute.store) == 1
+
+    # ข้ามไปวันถัดไป: 1m ปิดแท่ง START + 60 ซึ่งยังอยู่ใน bucket START ของ 5m (ชั้นบนยังไม่ปิด)
+    closed = engine.add_tick(START + 86400, {'BTC_price': 5.0, 'ETH_price': 1.0})
+    assert [(tier.name, start) for tier, start, _ in closed] == [('1m', START + 60)]
+    five = engine.by_name['5m']
+    assert five.partial_start == START
+    np.testing.assert_array_equal(five.partial[0], [1.0, 3.0, 1.0, 2.0])
+
+    # แท่ง 1m ของวันใหม่ปิด -> 5m ของวันเก่าปิดตาม (cascade) และกลายเป็นแท่งแรกของ 1h
+    closed = engine.add_tick(START + 86400 + 60, {'BTC_price': 6.0, 'ETH_price': 1.0})
+    assert [(tier.name, start) for tier, start, _ in closed] == [('1m', START + 86400), ('5m', START)]
+    np.testing.assert_array_equal(closed[-1][2][0], [1.0, 3.0, 1.0, 2.0])
+    assert [t.partial_start for t in engine.tiers] == [START + 86400 + 60, START + 86400, START, None]
+
+
+def test_missing_prices_do_not_break_ohlc(prefix):
+    engine = RetentionEngine(prefix, ASSETS)
+    engine.add_tick(START, {'BTC_price': 10.0})        # ETH ยังไม่มีราคา
+    engine.add_tick(START + 1, {'BTC_price': 12.0, 'ETH_price': 5.0})
+    engine.add_tick(START + 2, {'BTC_price': np.nan, 'ETH_price': 4.0})
+    partial = engine.by_name['1m'].partial
+    np.testing.assert_array_equal(partial[0], [10.0, 12.0, 10.0, 12.0])
+    np.testing.assert_array_equal(partial[1], [5.0, 5.0, 4.0, 4.0])
+
+
+def test_rebuild_after_restart_matches_incremental(tmp_path):
+    ts, prices = random_ticks(8_000, seed=5)
+    cut = 5_123
+    columns = {'ts': ts, **{a: prices[:, i] for i, a in enumerate(ASSETS)}}
+
+    incremental = RetentionEngine(str(tmp_path / 'a'), ASSETS)
+    run(incremental, ts, prices)
+
+    # process ที่สองตายกลางทาง: แท่งที่ปิดแล้วอยู่บนดิสก์ แท่งที่ยังไม่ปิดหายไปกับหน่วยความจำ
+    crashed = RetentionEngine(str(tmp_path / 'b'), ASSETS)
+    run(crashed, ts[:cut], prices[:cut])
+    for tier in crashed.tiers:
+        tier.store.close()
+    raw = PriceStore(str(tmp_path / 'raw.bin'), ASSETS, capacity=len(ts))
+    raw.extend({k: v[:cut] for k, v in columns.items()})
+
+    restarted = RetentionEngine(str(tmp_path / 'b'), ASSETS)
+    restarted.rebuild(raw.view())
+    run(restarted, ts[cut:], prices[cut:])
+    for a, b in zip(incremental.tiers, restarted.tiers):
+        assert_same_bars(tier_bars(b), tier_bars(a))
+
+
+def test_rebuild_from_scratch_matches_incremental(tmp_path):
+    ts, prices = random_ticks(3_000, seed=9)
+    incremental = RetentionEngine(str(tmp_path / 'a'), ASSETS)
+    run(incremental, ts, prices)
+
+    raw = PriceStore(str(tmp_path / 'raw.bin'), ASSETS, capacity=len(ts))
+    raw.extend({'ts': ts, **{a: prices[:, i] for i, a in enumerate(ASSETS)}})
+    rebuilt = RetentionEngine(str(tmp_path / 'b'), ASSETS)
+    rebuilt.rebuild(raw.view())
+    # rebuild ไม่ cascade: ชั้นบนอ่านจากแท่งที่ชั้นล่างปิดไว้ -> แท่งที่ปิดแล้ว + แท่งปัจจุบันตรงกันทุกชั้น
+    for a, b in zip(incremental.tiers, rebuilt.tiers):
+        assert_same_bars(tier_bars(b), tier_bars(a))
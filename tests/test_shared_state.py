@@ -0,0 +1,148 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from price_store import PriceStore
+from shared_state import LeaderLease, SharedState, LEADER_LEASE, replica_path
+
+COLUMNS = ['BTC_price', 'ETH_price']
+
+
+@pytest.fixture
+def shared_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)   # replicas/<REPLICA_ID> สร้างใต้โฟลเดอร์ทำงาน
+    return str(tmp_path / 'shared.sqlite')
+
+
+def open_replica(shared_file, replica_id):
+    state = SharedState(shared_file, owner=replica_id)
+    store = PriceStore(replica_path('crypto_prices.bin', shared_file, replica_id, None), COLUMNS, capacity=50)
+    return state, store
+
+
+def test_replica_path_is_unchanged_without_shared_state():
+    assert replica_path('crypto_prices.bin', None, 'a') == 'crypto_prices.bin'
+
+
+def test_replica_path_separates_replicas(shared_file):
+    a = replica_path('crypto_prices.bin', shared_file, 'host-1', None)
+    b = replica_path('crypto_prices.bin', shared_file, 'host-2', None)
+    assert a != b and os.path.basename(a) == os.path.basename(b) == 'crypto_prices.bin'
+    assert replica_path('alerts.jsonl', shared_file, 'x/../y', None) == os.path.join('replicas', 'x_.._y', 'alerts.jsonl')
+    assert replica_path('alerts.jsonl', shared_file, 'a', 'data/a') == os.path.join('data/a', 'alerts.jsonl')
+
+
+def test_two_replicas_in_one_directory_keep_their_own_stores(shared_file):
+    leader_state, leader_store = open_replica(shared_file, 'leader')
+    follower_state, follower_store = open_replica(shared_file, 'follower')
+    assert leader_store.path != follower_store.path
+
+    for i in range(70):   # เกิน capacity: ring buffer ของทั้งสองฝั่งวนรอบ
+        ts = 1_700_000_000 + 30 * i
+        prices = {'BTC_price': 60000.0 + i, 'ETH_price': 3000.0 + i}
+        leader_store.append(ts, prices)
+        leader_state.publish_tick(ts, prices)
+        last = follower_store.last()
+        for tick_ts, tick in follower_state.pull(None if last is None else int(last['ts']), {})['ticks']:
+            follower_store.append(tick_ts, tick)
+
+    np.testing.assert_array_equal(leader_store.view(), follower_store.view())
+    for store in (leader_store, follower_store):
+        view = store.view()
+        assert len(view) == 50 and (np.diff(view['ts']) == 30).all()
+        assert view['BTC_price'][-1] == 60069.0
+        store.close()
+
+
+# ---------- leases / pull / generation / rules ----------
+@pytest.fixture
+def replicas(tmp_path):
+    path = str(tmp_path / 'state.sqlite')
+    return SharedState(path, owner='a'), SharedState(path, owner='b')
+
+
+def tick(i):
+    return 1_700_000_000 + 30 * i, {'BTC_price': 60000.0 + i}
+
+
+def test_lease_expires_and_another_owner_takes_over(replicas):
+    a, b = replicas
+    lease_a, lease_b = LeaderLease(a, ttl=0.2), LeaderLease(b, ttl=0.2)
+    assert lease_a.refresh() == (True, True)
+    assert lease_a.refresh() == (True, False)    # ต่ออายุ ไม่ได้เพิ่งได้สิทธิ์
+    assert lease_b.refresh() == (False, False)   # ยังไม่หมดอายุ: แย่งไม่ได้
+    assert a.holder(LEADER_LEASE) == b.holder(LEADER_LEASE) == 'a'
+
+    time.sleep(0.3)   # a หยุดต่ออายุ (crash)
+    assert a.holder(LEADER_LEASE) is None
+    assert lease_b.refresh() == (True, True)
+    assert lease_a.refresh() == (False, False)
+    assert lease_a.is_leader is False and lease_a.changes == 2
+
+
+def test_release_hands_over_immediately(replicas):
+    a, b = replicas
+    lease_a, lease_b = LeaderLease(a, ttl=60), LeaderLease(b, ttl=60)
+    lease_a.refresh()
+    lease_a.release()
+    assert lease_b.refresh() == (True, True)
+
+
+def test_pull_returns_only_ticks_after_cursor(replicas):
+    leader, follower = replicas
+    for i in range(5):
+        leader.publish_tick(*tick(i))
+    first = follower.pull(None, {})
+    assert [ts for ts, _ in first['ticks']] == [tick(i)[0] for i in range(5)]
+
+    cursor = first['ticks'][-1][0]
+    assert follower.pull(cursor, {})['ticks'] == []
+    leader.publish_tick(*tick(5))
+    leader.publish_tick(*tick(6))
+    changes = follower.pull(cursor, {})
+    assert changes['ticks'] == [tick(5), tick(6)] and not changes['resync']
+
+
+def test_pull_returns_bars_after_cursor_per_tier(replicas):
+    leader, follower = replicas
+    ohlc = np.arange(4, dtype='<f8')
+    leader.publish_tick(*tick(0), closed=[('1m', 60, ohlc, 3600), ('1m', 120, ohlc, 3600), ('5m', 300, ohlc, 86400)])
+    bars = follower.pull(None, {'1m': 60, '5m': None})['bars']
+    assert [ts for ts, _ in bars['1m']] == [120] and [ts for ts, _ in bars['5m']] == [300]
+    np.testing.assert_array_equal(np.frombuffer(bars['5m'][0][1], dtype='<f8'), ohlc)
+
+
+def test_generation_bump_forces_full_resync(replicas):
+    leader, follower = replicas
+    for i in range(3):
+        leader.publish_tick(*tick(i))
+    leader.publish_history([], COLUMNS)          # ไม่มีอะไรเพิ่ม: generation ไม่เปลี่ยน
+    assert follower.pull(None, {})['resync'] is False
+
+    history = np.zeros(2, dtype=[('ts', '<i8'), ('BTC_price', '<f8'), ('ETH_price', '<f8')])
+    history['ts'] = [tick(-2)[0], tick(-1)[0]]
+    assert leader.publish_history(history, COLUMNS) == 2
+    changes = follower.pull(tick(2)[0], {'1m': 999})
+    assert changes['resync'] and changes['generation'] == 1
+    assert [ts for ts, _ in changes['ticks']] == [tick(i)[0] for i in range(-2, 3)]   # ทั้งชุด ไม่ใช่แค่หลัง cursor
+    assert follower.pull(tick(2)[0], {})['resync'] is False                           # sync แล้ว: กลับเป็นปกติ
+
+    leader.reset()
+    changes = follower.pull(tick(2)[0], {})
+    assert changes['resync'] and changes['ticks'] == [] and follower.metrics['resyncs'] == 2
+
+
+def test_rules_version_propagates_between_replicas(replicas):
+    a, b = replicas
+    assert a.rules_version() == 0
+    a.seed_rules([{'id': 'r1', 'owner': 'x'}])
+    b.seed_rules([{'id': 'other', 'owner': 'y'}])   # มีกฎแล้ว: seed ครั้งที่สองไม่มีผล
+    assert b.load_rules() == (1, [{'id': 'r1', 'owner': 'x'}])
+
+    b.save_rule({'id': 'r2', 'owner': 'y'})
+    assert a.rules_version() == 2
+    b.delete_rule('r1')
+    version, rules = a.load_rules()
+    assert version == 3 and rules == [{'id': 'r2', 'owner': 'y'}]
@@ -0,0 +1,102 @@
+import json
+
+from tick_hub import TickHub, STREAM_RETRY_MS
+
+
+def events(frames):
+    """bytes ของ text/event-stream -> [(event, id, data)]"""
+    out = []
+    for frame in frames:
+        fields = dict(line.split(': ', 1) for line in frame.decode('utf-8').strip().split('\n') if ': ' in line)
+        if 'event' in fields:
+            out.append((fields['event'], fields.get('id'), json.loads(fields['data'])))
+    return out
+
+
+def take(stream, n):
+    return [next(stream) for _ in range(n)]
+
+
+def test_stream_starts_with_retry_hint():
+    stream = TickHub().subscribe()
+    assert next(stream) == f'retry: {STREAM_RETRY_MS}\n\n'.encode()
+
+
+def test_publish_fans_out_to_every_subscriber():
+    hub = TickHub()
+    streams = [hub.subscribe() for _ in range(3)]
+    for s in streams:
+        next(s)   # retry
+    assert len(hub) == 3
+    hub.publish(100, {'BTC': 1.5})
+    hub.publish(130, {'BTC': 'ไทย'})
+    for s in streams:
+        assert events(take(s, 2)) == [('tick', '100', {'BTC': 1.5}), ('tick', '130', {'BTC': 'ไทย'})]
+    assert hub.metrics['published'] == 2 and hub.metrics['sent'] == 6
+
+
+def test_reconnect_replays_missed_ticks():
+    hub = TickHub(replay=3)
+    for ts in (100, 130, 160, 190):
+        hub.publish(ts, {'ts': ts})
+    # เก็บแค่ 3 frame ล่าสุด, ส่งเฉพาะที่ใหม่กว่า since
+    assert [e[1] for e in events(take(hub.subscribe(since=130), 3)[1:])] == ['160', '190']
+    assert len(events(take(hub.subscribe(), 4)[1:])) == 3
+    # EventSource ต่อใหม่ส่ง Last-Event-ID (LiveServer ใส่เป็น query['last_event_id'])
+    status, content_type, stream = hub.handle_stream({'last_event_id': '160'})
+    assert (status, content_type) == (200, 'text/event-stream')
+    assert events(take(stream, 2)[1:]) == [('tick', '190', {'ts': 190})]
+
+
+def test_reset_clears_replay_and_notifies():
+    hub = TickHub(heartbeat=0.01)
+    stream = hub.subscribe()
+    next(stream)
+    hub.publish(100, {})
+    hub.clear()
+    assert [e[0] for e in events(take(stream, 2))] == ['tick', 'reset']
+    assert take(hub.subscribe(), 2)[1] == b': ping\n\n'   # ผู้ฟังใหม่ไม่ได้ tick ก่อน reset
+
+
+def test_slow_subscriber_is_dropped_without_blocking_others():
+    hub = TickHub(heartbeat=0.01, queue_size=2)
+    slow, fast = hub.subscribe(), hub.subscribe()
+    next(slow), next(fast)
+    for ts in (1, 2, 3):
+        hub.publish(ts, {'ts': ts})
+        assert events([next(fast)])[0][1] == str(ts)
+    assert hub.metrics['dropped'] == 1 and len(hub) == 1
+    # ตัวที่ถูกตัดได้ของที่ค้างในคิวก่อน แล้ว stream จบ (browser ต่อใหม่พร้อม Last-Event-ID)
+    assert [e[1] for e in events(list(slow))] == ['1', '2']
+    hub.publish(4, {'ts': 4})
+    assert events([next(fast)])[0][1] == '4'
+
+
+def test_closed_stream_unsubscribes():
+    hub = TickHub()
+    stream = hub.subscribe()
+    next(stream)
+    stream.close()
+    assert len(hub) == 0
+    hub.publish(1, {})
+    assert hub.metrics['dropped'] == 0 and hub.metrics['sent'] == 0
+
+
+def test_idle_stream_sends_heartbeat():
+    hub = TickHub(heartbeat=0.01)
+    stream = hub.subscribe()
+    next(stream)
+    assert next(stream) == b': ping\n\n'
+
+
+def test_tick_feed_pushes_one_entry_per_tick():
+    from live_chart import TickFeed
+    hub = TickHub()
+    stream = hub.subscribe()
+    next(stream)
+    feed = TickFeed(['BTC_price'], hub=hub, classify=lambda price, ma, rsi: (f'{ma}/{rsi}', 'cls'))
+    feed.publish(100, {'BTC_price': 10.0}, {'BTC_price': {'MA20': float('nan'), 'RSI': float('nan'), 'Change': 1.0}})
+    (event, event_id, data), = events([next(stream)])
+    # NaN -> null และสัญญาณใช้ MA = ราคา / RSI = 50 แบบเดียวกับ analyze_trend()
+    assert (event, event_id, data['ts']) == ('tick', '100', 100)
+    assert data['BTC_price'] == [10.0, None, 1.0, None, '10.0/50', 'cls']
@@ -0,0 +1,114 @@
+# ========================================
+# TICK HUB (SERVER-SENT EVENTS FAN-OUT)
+# ========================================
+import json
+import queue
+import threading
+from collections import deque
+
+STREAM_HEARTBEAT = 15    # วินาที: ส่ง comment ว่างเมื่อไม่มี tick (กัน proxy ตัด + รู้ว่า browser ปิดไปแล้ว)
+STREAM_QUEUE_SIZE = 32   # frame ที่รอส่งได้ต่อผู้ฟัง ก่อนถูกตัดว่าอ่านไม่ทัน
+STREAM_REPLAY = 64       # frame ล่าสุดที่เก็บไว้ส่งซ้ำให้ผู้ฟังที่ต่อใหม่ (Last-Event-ID / since)
+STREAM_RETRY_MS = 3000   # EventSource ต่อใหม่เองหลังหลุดกี่มิลลิวินาที
+
+
+def sse_frame(event, data, event_id=None):
+    """1 event ในรูปแบบ text/event-stream (data เป็น JSON บรรทัดเดียว)"""
+    head = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{head}event: {event}\ndata: {json.dumps(data, separators=(",", ":"), ensure_ascii=False)}\n\n'.encode('utf-8')
+
+
+class _Subscriber:
+    __slots__ = ('queue', 'closed')
+
+    def __init__(self, size):
+        self.queue = queue.Queue(maxsize=size)
+        self.closed = False
+
+
+class TickHub:
+    """
+    📣 fan-out ของ tick ใหม่ไปยังทุก browser ที่เปิด /stream (Server-Sent Events)
+    - collector publish 1 ครั้งต่อ tick -> serialize ครั้งเดียว แล้วใส่คิวของผู้ฟังแต่ละคน
+      ต้นทุนต่อ tick = O(ผู้ฟัง) การส่งข้อความ ไม่มี script rerun ของ Streamlit
+    - ผู้ฟังที่อ่านไม่ทัน (คิวเต็ม) ถูกตัดออก ไม่ทำให้ collector ช้าตาม
+      EventSource ต่อใหม่เอง พร้อม Last-Event-ID -> ได้ tick ที่พลาดไปจาก replay
+    """
+
+    def __init__(self, heartbeat=STREAM_HEARTBEAT, queue_size=STREAM_QUEUE_SIZE, replay=STREAM_REPLAY):
+        self.heartbeat = heartbeat
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._recent = deque(maxlen=replay)   # (ts, frame)
+        self.metrics = {'published': 0, 'sent': 0, 'dropped': 0, 'connections': 0}
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def publish(self, ts, payload):
+        """ส่ง tick (dict ที่ serialize เป็น JSON ได้) ให้ผู้ฟังทุกคน - เรียกจาก thread ของ collector"""
+        self._broadcast(sse_frame('tick', payload, event_id=int(ts)), int(ts))
+
+    def clear(self):
+        """ล้าง replay แล้วบอกทุก browser ให้ล้างกราฟ (หลัง Reset Data)"""
+        with self._lock:
+            self._recent.clear()
+        self._broadcast(sse_frame('reset', {}), None)
+
+    def _broadcast(self, frame, ts):
+        with self._lock:
+            if ts is not None:
+                self._recent.append((ts, frame))
+            subscribers = list(self._subscribers)
+            self.metrics['published'] += 1
+        sent = 0
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(frame)
+                sent += 1
+            except queue.Full:
+                self._drop(sub)
+        with self._lock:
+            self.metrics['sent'] += sent
+
+    def _remove(self, sub):
+        sub.closed = True
+        with self._lock:
+            present = sub in self._subscribers
+            self._subscribers.discard(sub)
+        return present
+
+    def _drop(self, sub):
+        if self._remove(sub):
+            with self._lock:
+                self.metrics['dropped'] += 1
+
+    def subscribe(self, since=0):
+        """iterator ของ bytes สำหรับ response แบบ stream ของ LiveServer (จบเมื่อถูกตัด / browser ปิด)"""
+        sub = _Subscriber(self.queue_size)
+        with self._lock:
+            backlog = [frame for ts, frame in self._recent if ts > since]
+            self._subscribers.add(sub)
+            self.metrics['connections'] += 1
+        return self._stream(sub, backlog)
+
+    def _stream(self, sub, backlog):
+        try:
+            yield f'retry: {STREAM_RETRY_MS}\n\n'.encode('utf-8')
+            for frame in backlog:
+                yield frame
+            while True:
+                try:
+                    yield sub.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    if sub.closed:
+                        return   # อ่านไม่ทันจนถูกตัด: ส่งของที่ค้างในคิวหมดแล้ว ให้ browser ต่อใหม่
+                    yield b': ping\n\n'
+        finally:
+            self._remove(sub)
+
+    def handle_stream(self, query):
+        """GET /stream?since=<epoch> (EventSource ส่ง Last-Event-ID มาเองตอนต่อใหม่)"""
+        since = max(int(query.get('since') or 0), int(query.get('last_event_id') or 0))
+        return 200, 'text/event-stream', self.subscribe(since)
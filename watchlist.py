@@ -0,0 +1,148 @@
+# ========================================
+# WATCHLIST (รายการสินทรัพย์ที่ติดตาม + ดึงราคาแบบ BATCH)
+# ========================================
+import json
+import os
+import time
+
+from rate_limiter import get_coingecko_scheduler, COINGECKO_API_URL, PRIORITY_LIVE_PRICE
+
+WATCHLIST_FILE = os.environ.get('WATCHLIST_FILE', 'watchlist.json')
+SIMPLE_PRICE_URL = f'{COINGECKO_API_URL}/simple/price'
+MAX_IDS_CHARS = 1500   # ความยาวรวมของ ids ต่อ 1 request (URL ทั้งเส้นต้องไม่เกิน ~2000 ตัวอักษร)
+
+
+class Asset:
+    """สินทรัพย์ 1 ตัวบนกระดาน: column ใน store = '<symbol>_price'"""
+
+    def __init__(self, symbol, name, icon='🪙', coingecko_id=None, source='coingecko', seed=None, sources=None):
+        self.symbol = symbol
+        self.name = name
+        self.icon = icon
+        self.coingecko_id = coingecko_id
+        self.source = source   # 'coingecko' (มีแหล่งราคาจริง) หรือ 'simulated' (ยังไม่มี feed จริง)
+        self.seed = seed       # ราคาเริ่มต้นของการสุ่ม ถ้ายังไม่เคยมีราคาเลย
+        self.sources = dict(sources or {})   # แหล่งราคาสำรอง: ชื่อ provider -> id ของสินทรัพย์ในแหล่งนั้น
+
+    @property
+    def provider_ids(self):
+        """ชื่อ provider -> id ของสินทรัพย์นี้ (CoinGecko เป็นแหล่งหลักเสมอถ้ามี coingecko_id)"""
+        if self.source == 'simulated':
+            return {}
+        ids = {'coingecko': self.coingecko_id} if self.coingecko_id else {}
+        ids.update(self.sources)
+        return ids
+
+    @property
+    def column(self):
+        return f'{self.symbol}_price'
+
+    @property
+    def title(self):
+        return f'{self.name} ({self.symbol})'
+
+
+# ค่าเริ่มต้น = สามสินทรัพย์เดิมของกระดาน (✨ FIX 1: seed ใกล้เคียงราคาจริง แก้กราฟแบน)
+# ทองคำใช้ PAX Gold (1 token = ทอง 1 ทรอยออนซ์) เป็น feed จริงแทนการสุ่ม
+DEFAULT_WATCHLIST = [
+    Asset('BTC', 'Bitcoin', '🟠', 'bitcoin', seed=90000.0, sources={'binance': 'BTCUSDT'}),
+    Asset('ETH', 'Ethereum', '🔵', 'ethereum', seed=3000.0, sources={'binance': 'ETHUSDT'}),
+    Asset('Gold', 'ทองคำ', '🟡', 'pax-gold', seed=2600.0, sources={'binance': 'PAXGUSDT'}),
+]
+
+
+def load_watchlist(path=WATCHLIST_FILE):
+    """
+    อ่าน watchlist จากไฟล์ JSON (list ของ {"symbol", "name", "icon", "id", "source", "seed", "sources"})
+    ไม่มีไฟล์หรือไฟล์เสีย -> ใช้ DEFAULT_WATCHLIST (DON'T CRASH!)
+    """
+    if not os.path.exists(path):
+        return list(DEFAULT_WATCHLIST)
+    try:
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+        assets = [
+            Asset(e['symbol'], e.get('name', e['symbol']), e.get('icon', '🪙'), e.get('id'),
+                  e.get('source', 'coingecko'), e.get('seed'), e.get('sources'))
+            for e in entries
+        ]
+    except (OSError, ValueError, KeyError, TypeError):
+        return list(DEFAULT_WATCHLIST)
+    # symbol ซ้ำ = column ซ้ำใน store -> เก็บตัวแรก
+    unique = {}
+    for asset in assets:
+        unique.setdefault(asset.column, asset)
+    return list(unique.values()) or list(DEFAULT_WATCHLIST)
+
+
+def chunk_ids(ids, max_chars=MAX_IDS_CHARS):
+    """แบ่ง coin id เป็นกลุ่มที่ความยาว ids=a,b,c (comma ถูก encode เป็น %2C) ไม่เกิน max_chars"""
+    chunks, current, length = [], [], 0
+    for coin_id in ids:
+        extra = len(coin_id) + (3 if current else 0)
+        if current and length + extra > max_chars:
+            chunks.append(current)
+            current, length = [], 0
+            extra = len(coin_id)
+        current.append(coin_id)
+        length += extra
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def fetch_simple_prices(ids, vs_currency='usd', priority=PRIORITY_LIVE_PRICE, timeout=10):
+    """
+    ราคาล่าสุดของ coin ทั้งหมดด้วย simple/price แบบ batch (1 request ต่อ chunk ไม่ใช่ต่อเหรียญ)
+    ทุก chunk เข้าคิวของ scheduler พร้อมกัน -> คืน dict coin id -> ราคา (เฉพาะตัวที่ได้ราคา)
+    """
+    scheduler = get_coingecko_scheduler()
+    futures = [
+        scheduler.request(SIMPLE_PRICE_URL, {'ids': ','.join(chunk), 'vs_currencies': vs_currency},
+                          priority=priority, timeout=timeout)
+        for chunk in chunk_ids(sorted(set(ids)))
+    ]
+    prices = {}
+    for future in futures:
+        try:
+            response = future.result(timeout=timeout)
+        except Exception:
+            continue   # chunk นี้ล้มเหลว: ตัวที่ขาดไปให้ผู้เรียกใช้ fallback เอง
+        if response.status_code != 200:
+            continue
+        for coin_id, quote in response.json().items():
+            price = quote.get(vs_currency) if isinstance(quote, dict) else None
+            if isinstance(price, (int, float)):
+                prices[coin_id] = float(price)
+    return prices
+
+
+QUOTES_CACHE_KEY = 'simple_price'
+
+
+def cached_quotes(ids, cache=None, ttl=0):
+    """ราคาของ id ชุดเดียวกันใน ResponseCache ที่อายุไม่เกิน ttl วินาที (ไม่มี = None) - ไม่ยิง API"""
+    if cache is None or ttl <= 0:
+        return None
+    cached = cache.get(QUOTES_CACHE_KEY)
+    if cached is None:
+        return None
+    (cached_ids, quotes), fetched_at = cached   # JSON: tuple (ids, quotes) กลับมาเป็น list
+    if cached_ids == sorted(set(ids)) and time.time() - fetched_at <= ttl:
+        return quotes
+    return None
+
+
+def fetch_quotes(ids, cache=None, ttl=0, **kwargs):
+    """
+    fetch_simple_prices() ผ่าน ResponseCache บนดิสก์: ถ้ามีราคาของ id ชุดเดียวกันที่อายุไม่เกิน ttl วินาที
+    ใช้ของเดิม (เช่น restart / crash วนซ้ำ) ไม่ยิง API ซ้ำ - ดึงสำเร็จแล้วบันทึกทับเสมอ
+    """
+    quotes = cached_quotes(ids, cache, ttl)
+    if quotes is not None:
+        return quotes
+    ids = sorted(set(ids))
+    quotes = fetch_simple_prices(ids, **kwargs)
+    if cache is not None and quotes:
+        cache.set(QUOTES_CACHE_KEY, (ids, quotes))
+    return quotes